@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
@@ -7,6 +7,15 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardButton
 import aiosqlite
 
+from audit import audit
+from callback_data import (
+    BACK_TO_MENU, BRANCH_INFO, CONFIRM_DELETE_BRANCH, CONFIRM_DELETE_GROUP, CONFIRM_DELETE_TRAINER,
+    DELETE_BRANCH, DELETE_GROUP, DELETE_TRAINER, EDIT_BRANCH, EDIT_BRANCH_ADDRESS_ONLY, EDIT_GROUP,
+    EDIT_GROUP_TRAINER_ONLY, EDIT_TRAINER, EDIT_TRAINER_BRANCH_ONLY, GROUP_INFO, MT_BRANCHES,
+    MT_GROUPS, MT_TRAINERS, SELECT_EDIT_BRANCH, SELECT_EDIT_GROUP_TRAINER, TRAINER_INFO,
+    VIEW_GROUPS
+)
+from callback_dispatch import callbacks
 from config import ROLE_MAIN_TRAINER
 from database import db
 from keyboards import get_back_button, get_main_trainer_menu
@@ -24,13 +33,12 @@ async def is_main_trainer(telegram_id: int) -> bool:
 
 # РЕДАКТИРОВАНИЕ И УДАЛЕНИЕ ФИЛИАЛОВ
 
-@admin_edit_router.callback_query(F.data.startswith("branch_info_"))
-async def branch_info_with_actions(callback: CallbackQuery):
+@callbacks.route(BRANCH_INFO)
+async def branch_info_with_actions(callback: CallbackQuery, branch_id: int):
     """Информация о филиале с кнопками редактирования"""
-    branch_id = int(callback.data.split("_")[2])
     is_main = await is_main_trainer(callback.from_user.id)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         async with conn.execute("SELECT * FROM branches WHERE id = ?", (branch_id,)) as cursor:
@@ -66,26 +74,25 @@ async def branch_info_with_actions(callback: CallbackQuery):
     keyboard = InlineKeyboardBuilder()
 
     # Кнопка редактирования доступна всем
-    keyboard.row(InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"edit_branch_{branch_id}"))
+    keyboard.row(InlineKeyboardButton(text="✏️ Редактировать", callback_data=EDIT_BRANCH.pack(branch_id)))
 
     # Кнопка удаления только для главного тренера
     if is_main:
-        keyboard.row(InlineKeyboardButton(text="🗑 Удалить", callback_data=f"delete_branch_{branch_id}"))
+        keyboard.row(InlineKeyboardButton(text="🗑 Удалить", callback_data=DELETE_BRANCH.pack(branch_id)))
 
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="mt_branches"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_BRANCHES.pack()))
 
     await callback.message.edit_text(text, reply_markup=keyboard.as_markup())
 
 
 # РЕДАКТИРОВАНИЕ И УДАЛЕНИЕ ТРЕНЕРОВ
 
-@admin_edit_router.callback_query(F.data.startswith("trainer_info_"))
-async def trainer_info_with_actions(callback: CallbackQuery):
+@callbacks.route(TRAINER_INFO)
+async def trainer_info_with_actions(callback: CallbackQuery, trainer_id: int):
     """Информация о тренере с кнопками редактирования"""
-    trainer_id = int(callback.data.split("_")[2])
     is_main = await is_main_trainer(callback.from_user.id)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         async with conn.execute(
@@ -126,26 +133,25 @@ async def trainer_info_with_actions(callback: CallbackQuery):
     keyboard = InlineKeyboardBuilder()
 
     # Кнопка редактирования доступна всем
-    keyboard.row(InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"edit_trainer_{trainer_id}"))
+    keyboard.row(InlineKeyboardButton(text="✏️ Редактировать", callback_data=EDIT_TRAINER.pack(trainer_id)))
 
     # Кнопка удаления только для главного тренера
     if is_main:
-        keyboard.row(InlineKeyboardButton(text="🗑 Удалить", callback_data=f"delete_trainer_{trainer_id}"))
+        keyboard.row(InlineKeyboardButton(text="🗑 Удалить", callback_data=DELETE_TRAINER.pack(trainer_id)))
 
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="mt_trainers"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_TRAINERS.pack()))
 
     await callback.message.edit_text(text, reply_markup=keyboard.as_markup())
 
 
 # РЕДАКТИРОВАНИЕ И УДАЛЕНИЕ ГРУПП
 
-@admin_edit_router.callback_query(F.data.startswith("group_info_"))
-async def group_info_with_actions(callback: CallbackQuery):
+@callbacks.route(GROUP_INFO)
+async def group_info_with_actions(callback: CallbackQuery, group_id: int):
     """Информация о группе с кнопками редактирования"""
-    group_id = int(callback.data.split("_")[2])
     is_main = await is_main_trainer(callback.from_user.id)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT g.*, b.name as branch_name, t.full_name as trainer_name,
@@ -181,22 +187,22 @@ async def group_info_with_actions(callback: CallbackQuery):
     keyboard = InlineKeyboardBuilder()
 
     # Кнопка редактирования доступна всем
-    keyboard.row(InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"edit_group_{group_id}"))
+    keyboard.row(InlineKeyboardButton(text="✏️ Редактировать", callback_data=EDIT_GROUP.pack(group_id)))
 
     # Кнопка удаления только для главного тренера
     if is_main:
-        keyboard.row(InlineKeyboardButton(text="🗑 Удалить", callback_data=f"delete_group_{group_id}"))
+        keyboard.row(InlineKeyboardButton(text="🗑 Удалить", callback_data=DELETE_GROUP.pack(group_id)))
 
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="view_groups"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=VIEW_GROUPS.pack()))
 
     await callback.message.edit_text(text, reply_markup=keyboard.as_markup())
 
 
 # Добавляем обработчик для просмотра групп с возможностью редактирования
-@admin_edit_router.callback_query(F.data == "view_groups")
+@callbacks.route(VIEW_GROUPS)
 async def view_groups_with_edit(callback: CallbackQuery):
     """Просмотр всех групп с возможностью редактирования"""
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT g.*, b.name as branch_name, t.full_name as trainer_name,
@@ -222,10 +228,10 @@ async def view_groups_with_edit(callback: CallbackQuery):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"👥 {group['name']} ({group['branch_name']}, {group['children_count']} детей)",
-                callback_data=f"group_info_{group['id']}"
+                callback_data=GROUP_INFO.pack(group['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="mt_groups"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_GROUPS.pack()))
 
     await callback.message.edit_text(
         "👥 Все группы (нажмите для редактирования):",
@@ -234,12 +240,11 @@ async def view_groups_with_edit(callback: CallbackQuery):
 
 
 # РЕДАКТИРОВАНИЕ ФИЛИАЛОВ
-@admin_edit_router.callback_query(F.data.startswith("edit_branch_"))
-async def edit_branch_start(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(EDIT_BRANCH)
+async def edit_branch_start(callback: CallbackQuery, branch_id: int, state: FSMContext):
     """Начало редактирования филиала"""
-    branch_id = int(callback.data.split("_")[2])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT * FROM branches WHERE id = ?", (branch_id,)) as cursor:
             branch = await cursor.fetchone()
@@ -252,8 +257,8 @@ async def edit_branch_start(callback: CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.editing_branch_name)
 
     keyboard = InlineKeyboardBuilder()
-    keyboard.row(InlineKeyboardButton(text="📍 Изменить адрес", callback_data="edit_branch_address_only"))
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=f"branch_info_{branch_id}"))
+    keyboard.row(InlineKeyboardButton(text="📍 Изменить адрес", callback_data=EDIT_BRANCH_ADDRESS_ONLY.pack()))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BRANCH_INFO.pack(branch_id)))
 
     await callback.message.edit_text(
         f"✏️ Редактирование филиала\n\n"
@@ -281,7 +286,7 @@ async def process_edit_branch_name(message: Message, state: FSMContext):
     )
 
 
-@admin_edit_router.callback_query(F.data == "edit_branch_address_only", StateFilter(AdminStates.editing_branch_name))
+@callbacks.route(EDIT_BRANCH_ADDRESS_ONLY, state=AdminStates.editing_branch_name)
 async def edit_branch_address_only(callback: CallbackQuery, state: FSMContext):
     """Редактирование только адреса филиала"""
     data = await state.get_data()
@@ -306,12 +311,16 @@ async def process_edit_branch_address(message: Message, state: FSMContext):
     final_name = data.get('new_name', data['current_name'])
 
     # Обновляем филиал
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         await conn.execute(
             "UPDATE branches SET name = ?, address = ? WHERE id = ?",
             (final_name, new_address, data['editing_branch_id'])
         )
         await conn.commit()
+        audit.record(
+            "branch_updated", f"Branch: {data['editing_branch_id']}, Name: {final_name}, Address: {new_address}",
+            telegram_id=message.from_user.id
+        )
 
     await message.answer(
         f"✅ Филиал обновлен!\n\n"
@@ -324,12 +333,11 @@ async def process_edit_branch_address(message: Message, state: FSMContext):
 
 
 # РЕДАКТИРОВАНИЕ ТРЕНЕРОВ
-@admin_edit_router.callback_query(F.data.startswith("edit_trainer_"))
-async def edit_trainer_start(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(EDIT_TRAINER)
+async def edit_trainer_start(callback: CallbackQuery, trainer_id: int, state: FSMContext):
     """Начало редактирования тренера"""
-    trainer_id = int(callback.data.split("_")[2])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT t.*, b.name as branch_name 
@@ -351,8 +359,8 @@ async def edit_trainer_start(callback: CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.editing_trainer_name)
 
     keyboard = InlineKeyboardBuilder()
-    keyboard.row(InlineKeyboardButton(text="🏢 Изменить филиал", callback_data="edit_trainer_branch_only"))
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=f"trainer_info_{trainer_id}"))
+    keyboard.row(InlineKeyboardButton(text="🏢 Изменить филиал", callback_data=EDIT_TRAINER_BRANCH_ONLY.pack()))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=TRAINER_INFO.pack(trainer_id)))
 
     await callback.message.edit_text(
         f"✏️ Редактирование тренера\n\n"
@@ -373,7 +381,7 @@ async def process_edit_trainer_name(message: Message, state: FSMContext):
     await state.set_state(AdminStates.editing_trainer_branch)
 
     # Получаем все филиалы
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT id, name FROM branches ORDER BY name") as cursor:
             branches = await cursor.fetchall()
@@ -383,10 +391,10 @@ async def process_edit_trainer_name(message: Message, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"🏢 {branch['name']}",
-                callback_data=f"select_edit_branch_{branch['id']}"
+                callback_data=SELECT_EDIT_BRANCH.pack(branch['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await message.answer(
         f"✏️ Тренер: {new_name}\n\n"
@@ -395,13 +403,13 @@ async def process_edit_trainer_name(message: Message, state: FSMContext):
     )
 
 
-@admin_edit_router.callback_query(F.data == "edit_trainer_branch_only", StateFilter(AdminStates.editing_trainer_name))
+@callbacks.route(EDIT_TRAINER_BRANCH_ONLY, state=AdminStates.editing_trainer_name)
 async def edit_trainer_branch_only(callback: CallbackQuery, state: FSMContext):
     """Редактирование только филиала тренера"""
     await state.set_state(AdminStates.editing_trainer_branch)
 
     # Получаем все филиалы
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT id, name FROM branches ORDER BY name") as cursor:
             branches = await cursor.fetchall()
@@ -411,10 +419,10 @@ async def edit_trainer_branch_only(callback: CallbackQuery, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"🏢 {branch['name']}",
-                callback_data=f"select_edit_branch_{branch['id']}"
+                callback_data=SELECT_EDIT_BRANCH.pack(branch['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         f"✏️ Изменение филиала тренера\n\n"
@@ -423,24 +431,26 @@ async def edit_trainer_branch_only(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@admin_edit_router.callback_query(F.data.startswith("select_edit_branch_"),
-                                  StateFilter(AdminStates.editing_trainer_branch))
-async def select_edit_trainer_branch(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_EDIT_BRANCH, state=AdminStates.editing_trainer_branch)
+async def select_edit_trainer_branch(callback: CallbackQuery, branch_id: int, state: FSMContext):
     """Выбор нового филиала для тренера"""
-    branch_id = int(callback.data.split("_")[3])
     data = await state.get_data()
 
     # Определяем имя: новое или старое
     final_name = data.get('new_name', data['current_name'])
 
     # Обновляем тренера
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         await conn.execute(
             "UPDATE trainers SET full_name = ?, branch_id = ? WHERE id = ?",
             (final_name, branch_id, data['editing_trainer_id'])
         )
         await conn.commit()
+        audit.record(
+            "trainer_updated", f"Trainer: {data['editing_trainer_id']}, Name: {final_name}, Branch: {branch_id}",
+            telegram_id=callback.from_user.id
+        )
 
         async with conn.execute("SELECT name FROM branches WHERE id = ?", (branch_id,)) as cursor:
             branch = await cursor.fetchone()
@@ -456,12 +466,11 @@ async def select_edit_trainer_branch(callback: CallbackQuery, state: FSMContext)
 
 
 # РЕДАКТИРОВАНИЕ ГРУПП
-@admin_edit_router.callback_query(F.data.startswith("edit_group_"))
-async def edit_group_start(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(EDIT_GROUP)
+async def edit_group_start(callback: CallbackQuery, group_id: int, state: FSMContext):
     """Начало редактирования группы"""
-    group_id = int(callback.data.split("_")[2])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT g.*, b.name as branch_name, t.full_name as trainer_name 
@@ -485,8 +494,8 @@ async def edit_group_start(callback: CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.editing_group_name)
 
     keyboard = InlineKeyboardBuilder()
-    keyboard.row(InlineKeyboardButton(text="👨‍🏫 Изменить тренера", callback_data="edit_group_trainer_only"))
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=f"group_info_{group_id}"))
+    keyboard.row(InlineKeyboardButton(text="👨‍🏫 Изменить тренера", callback_data=EDIT_GROUP_TRAINER_ONLY.pack()))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=GROUP_INFO.pack(group_id)))
 
     await callback.message.edit_text(
         f"✏️ Редактирование группы\n\n"
@@ -508,7 +517,7 @@ async def process_edit_group_name(message: Message, state: FSMContext):
     await state.set_state(AdminStates.editing_group_trainer)
 
     # Получаем тренеров текущего филиала
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT id, full_name FROM trainers WHERE branch_id = ? ORDER BY full_name",
@@ -521,10 +530,10 @@ async def process_edit_group_name(message: Message, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"👨‍🏫 {trainer['full_name']}",
-                callback_data=f"select_edit_group_trainer_{trainer['id']}"
+                callback_data=SELECT_EDIT_GROUP_TRAINER.pack(trainer['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await message.answer(
         f"✏️ Группа: {new_name}\n\n"
@@ -533,14 +542,14 @@ async def process_edit_group_name(message: Message, state: FSMContext):
     )
 
 
-@admin_edit_router.callback_query(F.data == "edit_group_trainer_only", StateFilter(AdminStates.editing_group_name))
+@callbacks.route(EDIT_GROUP_TRAINER_ONLY, state=AdminStates.editing_group_name)
 async def edit_group_trainer_only(callback: CallbackQuery, state: FSMContext):
     """Редактирование только тренера группы"""
     data = await state.get_data()
     await state.set_state(AdminStates.editing_group_trainer)
 
     # Получаем тренеров текущего филиала
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT id, full_name FROM trainers WHERE branch_id = ? ORDER BY full_name",
@@ -553,10 +562,10 @@ async def edit_group_trainer_only(callback: CallbackQuery, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"👨‍🏫 {trainer['full_name']}",
-                callback_data=f"select_edit_group_trainer_{trainer['id']}"
+                callback_data=SELECT_EDIT_GROUP_TRAINER.pack(trainer['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         f"✏️ Изменение тренера группы\n\n"
@@ -565,24 +574,26 @@ async def edit_group_trainer_only(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@admin_edit_router.callback_query(F.data.startswith("select_edit_group_trainer_"),
-                                  StateFilter(AdminStates.editing_group_trainer))
-async def select_edit_group_trainer(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_EDIT_GROUP_TRAINER, state=AdminStates.editing_group_trainer)
+async def select_edit_group_trainer(callback: CallbackQuery, trainer_id: int, state: FSMContext):
     """Выбор нового тренера для группы"""
-    trainer_id = int(callback.data.split("_")[4])
     data = await state.get_data()
 
     # Определяем название: новое или старое
     final_name = data.get('new_name', data['current_name'])
 
     # Обновляем группу
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         await conn.execute(
             "UPDATE groups_table SET name = ?, trainer_id = ? WHERE id = ?",
             (final_name, trainer_id, data['editing_group_id'])
         )
         await conn.commit()
+        audit.record(
+            "group_updated", f"Group: {data['editing_group_id']}, Name: {final_name}, Trainer: {trainer_id}",
+            telegram_id=callback.from_user.id
+        )
 
         async with conn.execute("SELECT full_name FROM trainers WHERE id = ?", (trainer_id,)) as cursor:
             trainer = await cursor.fetchone()
@@ -600,16 +611,15 @@ async def select_edit_group_trainer(callback: CallbackQuery, state: FSMContext):
 # ФУНКЦИИ УДАЛЕНИЯ (ТОЛЬКО ДЛЯ ГЛАВНОГО ТРЕНЕРА)
 
 # Удаление филиала
-@admin_edit_router.callback_query(F.data.startswith("delete_branch_"))
-async def delete_branch_confirm(callback: CallbackQuery):
+@callbacks.route(DELETE_BRANCH)
+async def delete_branch_confirm(callback: CallbackQuery, branch_id: int):
     """Подтверждение удаления филиала (только для главного тренера)"""
     if not await is_main_trainer(callback.from_user.id):
         await callback.answer("❌ Нет прав на удаление", show_alert=True)
         return
 
-    branch_id = int(callback.data.split("_")[2])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT name FROM branches WHERE id = ?", (branch_id,)) as cursor:
             branch = await cursor.fetchone()
@@ -626,8 +636,8 @@ async def delete_branch_confirm(callback: CallbackQuery):
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="✅ Да, удалить", callback_data=f"confirm_delete_branch_{branch_id}"),
-        InlineKeyboardButton(text="❌ Отмена", callback_data=f"branch_info_{branch_id}")
+        InlineKeyboardButton(text="✅ Да, удалить", callback_data=CONFIRM_DELETE_BRANCH.pack(branch_id)),
+        InlineKeyboardButton(text="❌ Отмена", callback_data=BRANCH_INFO.pack(branch_id))
     )
 
     warning = ""
@@ -641,16 +651,15 @@ async def delete_branch_confirm(callback: CallbackQuery):
     )
 
 
-@admin_edit_router.callback_query(F.data.startswith("confirm_delete_branch_"))
-async def confirm_delete_branch(callback: CallbackQuery):
+@callbacks.route(CONFIRM_DELETE_BRANCH)
+async def confirm_delete_branch(callback: CallbackQuery, branch_id: int):
     """Подтверждённое удаление филиала"""
     if not await is_main_trainer(callback.from_user.id):
         await callback.answer("❌ Нет прав на удаление", show_alert=True)
         return
 
-    branch_id = int(callback.data.split("_")[3])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT name FROM branches WHERE id = ?", (branch_id,)) as cursor:
             branch = await cursor.fetchone()
@@ -658,6 +667,8 @@ async def confirm_delete_branch(callback: CallbackQuery):
         if branch:
             await conn.execute("DELETE FROM branches WHERE id = ?", (branch_id,))
             await conn.commit()
+            audit.record("branch_deleted", f"Branch: {branch_id}, Name: {branch['name']}",
+                         telegram_id=callback.from_user.id)
 
     await callback.message.edit_text(
         f"✅ Филиал '{branch['name']}' успешно удален!",
@@ -666,16 +677,15 @@ async def confirm_delete_branch(callback: CallbackQuery):
 
 
 # Удаление тренера
-@admin_edit_router.callback_query(F.data.startswith("delete_trainer_"))
-async def delete_trainer_confirm(callback: CallbackQuery):
+@callbacks.route(DELETE_TRAINER)
+async def delete_trainer_confirm(callback: CallbackQuery, trainer_id: int):
     """Подтверждение удаления тренера (только для главного тренера)"""
     if not await is_main_trainer(callback.from_user.id):
         await callback.answer("❌ Нет прав на удаление", show_alert=True)
         return
 
-    trainer_id = int(callback.data.split("_")[2])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT full_name FROM trainers WHERE id = ?", (trainer_id,)) as cursor:
             trainer = await cursor.fetchone()
@@ -689,8 +699,8 @@ async def delete_trainer_confirm(callback: CallbackQuery):
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="✅ Да, удалить", callback_data=f"confirm_delete_trainer_{trainer_id}"),
-        InlineKeyboardButton(text="❌ Отмена", callback_data=f"trainer_info_{trainer_id}")
+        InlineKeyboardButton(text="✅ Да, удалить", callback_data=CONFIRM_DELETE_TRAINER.pack(trainer_id)),
+        InlineKeyboardButton(text="❌ Отмена", callback_data=TRAINER_INFO.pack(trainer_id))
     )
 
     warning = ""
@@ -704,16 +714,15 @@ async def delete_trainer_confirm(callback: CallbackQuery):
     )
 
 
-@admin_edit_router.callback_query(F.data.startswith("confirm_delete_trainer_"))
-async def confirm_delete_trainer(callback: CallbackQuery):
+@callbacks.route(CONFIRM_DELETE_TRAINER)
+async def confirm_delete_trainer(callback: CallbackQuery, trainer_id: int):
     """Подтверждённое удаление тренера"""
     if not await is_main_trainer(callback.from_user.id):
         await callback.answer("❌ Нет прав на удаление", show_alert=True)
         return
 
-    trainer_id = int(callback.data.split("_")[3])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT full_name FROM trainers WHERE id = ?", (trainer_id,)) as cursor:
             trainer = await cursor.fetchone()
@@ -721,6 +730,8 @@ async def confirm_delete_trainer(callback: CallbackQuery):
         if trainer:
             await conn.execute("DELETE FROM trainers WHERE id = ?", (trainer_id,))
             await conn.commit()
+            audit.record("trainer_deleted", f"Trainer: {trainer_id}, Name: {trainer['full_name']}",
+                         telegram_id=callback.from_user.id)
 
     await callback.message.edit_text(
         f"✅ Тренер '{trainer['full_name']}' успешно удален!",
@@ -729,16 +740,15 @@ async def confirm_delete_trainer(callback: CallbackQuery):
 
 
 # Удаление группы
-@admin_edit_router.callback_query(F.data.startswith("delete_group_"))
-async def delete_group_confirm(callback: CallbackQuery):
+@callbacks.route(DELETE_GROUP)
+async def delete_group_confirm(callback: CallbackQuery, group_id: int):
     """Подтверждение удаления группы (только для главного тренера)"""
     if not await is_main_trainer(callback.from_user.id):
         await callback.answer("❌ Нет прав на удаление", show_alert=True)
         return
 
-    group_id = int(callback.data.split("_")[2])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT name FROM groups_table WHERE id = ?", (group_id,)) as cursor:
             group = await cursor.fetchone()
@@ -755,8 +765,8 @@ async def delete_group_confirm(callback: CallbackQuery):
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="✅ Да, удалить", callback_data=f"confirm_delete_group_{group_id}"),
-        InlineKeyboardButton(text="❌ Отмена", callback_data=f"group_info_{group_id}")
+        InlineKeyboardButton(text="✅ Да, удалить", callback_data=CONFIRM_DELETE_GROUP.pack(group_id)),
+        InlineKeyboardButton(text="❌ Отмена", callback_data=GROUP_INFO.pack(group_id))
     )
 
     warning = ""
@@ -771,16 +781,15 @@ async def delete_group_confirm(callback: CallbackQuery):
     )
 
 
-@admin_edit_router.callback_query(F.data.startswith("confirm_delete_group_"))
-async def confirm_delete_group(callback: CallbackQuery):
+@callbacks.route(CONFIRM_DELETE_GROUP)
+async def confirm_delete_group(callback: CallbackQuery, group_id: int):
     """Подтверждённое удаление группы"""
     if not await is_main_trainer(callback.from_user.id):
         await callback.answer("❌ Нет прав на удаление", show_alert=True)
         return
 
-    group_id = int(callback.data.split("_")[3])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT name FROM groups_table WHERE id = ?", (group_id,)) as cursor:
             group = await cursor.fetchone()
@@ -788,6 +797,8 @@ async def confirm_delete_group(callback: CallbackQuery):
         if group:
             await conn.execute("DELETE FROM groups_table WHERE id = ?", (group_id,))
             await conn.commit()
+            audit.record("group_deleted", f"Group: {group_id}, Name: {group['name']}",
+                         telegram_id=callback.from_user.id)
 
     await callback.message.edit_text(
         f"✅ Группа '{group['name']}' успешно удалена!",
@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
@@ -7,6 +7,15 @@ from aiogram.types import InlineKeyboardButton
 import aiosqlite
 from datetime import datetime
 from datetime import date, timedelta
+from callback_data import (
+    ADD_BRANCH, ADD_CHILD, ADD_GROUP, ADD_TRAINER, BACK_TO_MENU, BRANCH_INFO, CHILD_INFO,
+    CHILD_INFO_READONLY, MT_BRANCHES, MT_GROUPS, MT_REPORTS, MT_TRAINERS, REPORT_ANALYTICS,
+    REPORT_EXPORT, REPORT_FINANCE, REPORT_MONTH, REPORT_PDF, REPORT_RANGE, REPORT_TODAY,
+    REPORT_WEEK, SELECT_BRANCH, SELECT_CHILD_GROUP, SELECT_CHILD_PARENT, SELECT_GROUP_BRANCH,
+    SELECT_GROUP_TRAINER, TRAINER_INFO, VIEW_CHILDREN, VIEW_GROUPS
+)
+from audit import audit
+from callback_dispatch import callbacks
 from config import ROLE_MAIN_TRAINER, ROLE_TRAINER, ROLE_PARENT, ROLE_CASHIER
 from database import db
 from keyboards import get_back_button, get_main_trainer_menu
@@ -17,7 +26,7 @@ admin_router = Router()
 
 # УПРАВЛЕНИЕ ФИЛИАЛАМИ
 
-@admin_router.callback_query(F.data == "mt_branches")
+@callbacks.route(MT_BRANCHES)
 async def manage_branches(callback: CallbackQuery):
     """Управление филиалами"""
     branches = await db.get_all_branches()
@@ -28,14 +37,14 @@ async def manage_branches(callback: CallbackQuery):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"🏢 {branch['name']}",
-                callback_data=f"branch_info_{branch['id']}"
+                callback_data=BRANCH_INFO.pack(branch['id'])
             )
         )
 
     keyboard.row(
-        InlineKeyboardButton(text="➕ Добавить филиал", callback_data="add_branch")
+        InlineKeyboardButton(text="➕ Добавить филиал", callback_data=ADD_BRANCH.pack())
     )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         "🏢 Управление филиалами:",
@@ -43,7 +52,7 @@ async def manage_branches(callback: CallbackQuery):
     )
 
 
-@admin_router.callback_query(F.data == "add_branch")
+@callbacks.route(ADD_BRANCH)
 async def add_branch_start(callback: CallbackQuery, state: FSMContext):
     """Начало добавления филиала"""
     await state.set_state(AdminStates.creating_branch_name)
@@ -77,6 +86,8 @@ async def process_branch_address(message: Message, state: FSMContext):
 
     # Создаём филиал
     branch_id = await db.create_branch(data['branch_name'], address)
+    audit.record("branch_created", f"Branch: {branch_id}, Name: {data['branch_name']}, Address: {address}",
+                 telegram_id=message.from_user.id)
 
     await message.answer(
         f"✅ Филиал создан!\n\n"
@@ -91,7 +102,7 @@ async def process_branch_address(message: Message, state: FSMContext):
 
 # УПРАВЛЕНИЕ ТРЕНЕРАМИ
 
-@admin_router.callback_query(F.data == "mt_trainers")
+@callbacks.route(MT_TRAINERS)
 async def manage_trainers(callback: CallbackQuery):
     """Управление тренерами"""
     trainers = await db.get_all_trainers()
@@ -103,14 +114,14 @@ async def manage_trainers(callback: CallbackQuery):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"{status} {trainer['full_name']} ({trainer['branch_name']})",
-                callback_data=f"trainer_info_{trainer['id']}"
+                callback_data=TRAINER_INFO.pack(trainer['id'])
             )
         )
 
     keyboard.row(
-        InlineKeyboardButton(text="➕ Добавить тренера", callback_data="add_trainer")
+        InlineKeyboardButton(text="➕ Добавить тренера", callback_data=ADD_TRAINER.pack())
     )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         "👨‍🏫 Управление тренерами:\n\n"
@@ -120,7 +131,7 @@ async def manage_trainers(callback: CallbackQuery):
     )
 
 
-@admin_router.callback_query(F.data == "add_trainer")
+@callbacks.route(ADD_TRAINER)
 async def add_trainer_start(callback: CallbackQuery, state: FSMContext):
     """Начало добавления тренера"""
     await state.set_state(AdminStates.creating_trainer_name)
@@ -155,10 +166,10 @@ async def process_trainer_name(message: Message, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"🏢 {branch['name']}",
-                callback_data=f"select_branch_{branch['id']}"
+                callback_data=SELECT_BRANCH.pack(branch['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await message.answer(
         f"👨‍🏫 Тренер: {trainer_name}\n\n"
@@ -167,16 +178,17 @@ async def process_trainer_name(message: Message, state: FSMContext):
     )
 
 
-@admin_router.callback_query(F.data.startswith("select_branch_"), StateFilter(AdminStates.selecting_trainer_branch))
-async def select_trainer_branch(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_BRANCH, state=AdminStates.selecting_trainer_branch)
+async def select_trainer_branch(callback: CallbackQuery, branch_id: int, state: FSMContext):
     """Выбор филиала для тренера"""
-    branch_id = int(callback.data.split("_")[2])
     data = await state.get_data()
 
     # Создаём тренера без привязки к пользователю Telegram
     trainer_id = await db.create_trainer(None, branch_id, data['trainer_name'])
+    audit.record("trainer_created", f"Trainer: {trainer_id}, Name: {data['trainer_name']}, Branch: {branch_id}",
+                 telegram_id=callback.from_user.id)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute("SELECT name FROM branches WHERE id = ?", (branch_id,)) as cursor:
             branch = await cursor.fetchone()
@@ -195,19 +207,19 @@ async def select_trainer_branch(callback: CallbackQuery, state: FSMContext):
 
 # УПРАВЛЕНИЕ ГРУППАМИ И ДЕТЬМИ
 
-@admin_router.callback_query(F.data == "mt_groups")
+@callbacks.route(MT_GROUPS)
 async def manage_groups(callback: CallbackQuery):
     """Управление группами и детьми"""
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="👥 Просмотр групп", callback_data="view_groups"),
-        InlineKeyboardButton(text="👶 Просмотр детей", callback_data="view_children")
+        InlineKeyboardButton(text="👥 Просмотр групп", callback_data=VIEW_GROUPS.pack()),
+        InlineKeyboardButton(text="👶 Просмотр детей", callback_data=VIEW_CHILDREN.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="➕ Создать группу", callback_data="add_group"),
-        InlineKeyboardButton(text="➕ Добавить ребёнка", callback_data="add_child")
+        InlineKeyboardButton(text="➕ Создать группу", callback_data=ADD_GROUP.pack()),
+        InlineKeyboardButton(text="➕ Добавить ребёнка", callback_data=ADD_CHILD.pack())
     )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         "👥 Управление группами и детьми:",
@@ -215,7 +227,7 @@ async def manage_groups(callback: CallbackQuery):
     )
 
 
-@admin_router.callback_query(F.data == "add_group")
+@callbacks.route(ADD_GROUP)
 async def add_group_start(callback: CallbackQuery, state: FSMContext):
     """Начало добавления группы"""
     await state.set_state(AdminStates.creating_group_name)
@@ -249,10 +261,10 @@ async def process_group_name(message: Message, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"🏢 {branch['name']}",
-                callback_data=f"select_group_branch_{branch['id']}"
+                callback_data=SELECT_GROUP_BRANCH.pack(branch['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await message.answer(
         f"👥 Группа: {group_name}\n\n"
@@ -261,14 +273,13 @@ async def process_group_name(message: Message, state: FSMContext):
     )
 
 
-@admin_router.callback_query(F.data.startswith("select_group_branch_"), StateFilter(AdminStates.selecting_group_branch))
-async def select_group_branch(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_GROUP_BRANCH, state=AdminStates.selecting_group_branch)
+async def select_group_branch(callback: CallbackQuery, branch_id: int, state: FSMContext):
     """Выбор филиала для группы"""
-    branch_id = int(callback.data.split("_")[3])
     data = await state.get_data()
 
     # Получаем тренеров филиала
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT * FROM trainers WHERE branch_id = ? ORDER BY full_name", (branch_id,)
@@ -291,10 +302,10 @@ async def select_group_branch(callback: CallbackQuery, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"👨‍🏫 {trainer['full_name']}",
-                callback_data=f"select_group_trainer_{trainer['id']}"
+                callback_data=SELECT_GROUP_TRAINER.pack(trainer['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         f"👥 Группа: {data['group_name']}\n\n"
@@ -303,18 +314,18 @@ async def select_group_branch(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@admin_router.callback_query(F.data.startswith("select_group_trainer_"),
-                             StateFilter(AdminStates.selecting_group_trainer))
-async def select_group_trainer(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_GROUP_TRAINER, state=AdminStates.selecting_group_trainer)
+async def select_group_trainer(callback: CallbackQuery, trainer_id: int, state: FSMContext):
     """Выбор тренера для группы"""
-    trainer_id = int(callback.data.split("_")[3])
     data = await state.get_data()
 
     # Создаём группу
     group_id = await db.create_group(data['group_name'], data['branch_id'], trainer_id)
+    audit.record("group_created", f"Group: {group_id}, Name: {data['group_name']}, Branch: {data['branch_id']}, "
+                                  f"Trainer: {trainer_id}", telegram_id=callback.from_user.id)
 
     # Получаем информацию о созданной группе
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT g.*, b.name as branch_name, t.full_name as trainer_name
@@ -337,7 +348,7 @@ async def select_group_trainer(callback: CallbackQuery, state: FSMContext):
     await state.clear()
 
 
-@admin_router.callback_query(F.data == "add_child")
+@callbacks.route(ADD_CHILD)
 async def add_child_start(callback: CallbackQuery, state: FSMContext):
     """Начало добавления ребёнка"""
     await state.set_state(AdminStates.creating_child_name)
@@ -354,7 +365,7 @@ async def process_child_name(message: Message, state: FSMContext):
     child_name = message.text.strip()
 
     # Получаем родителей
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT * FROM users WHERE role = 'parent' ORDER BY first_name, last_name",
@@ -380,10 +391,10 @@ async def process_child_name(message: Message, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"👤 {parent_name}",
-                callback_data=f"select_child_parent_{parent['id']}"
+                callback_data=SELECT_CHILD_PARENT.pack(parent['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await message.answer(
         f"👶 Ребёнок: {child_name}\n\n"
@@ -392,14 +403,13 @@ async def process_child_name(message: Message, state: FSMContext):
     )
 
 
-@admin_router.callback_query(F.data.startswith("select_child_parent_"), StateFilter(AdminStates.selecting_child_parent))
-async def select_child_parent(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_CHILD_PARENT, state=AdminStates.selecting_child_parent)
+async def select_child_parent(callback: CallbackQuery, parent_id: int, state: FSMContext):
     """Выбор родителя для ребёнка"""
-    parent_id = int(callback.data.split("_")[3])
     data = await state.get_data()
 
     # Получаем группы
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT g.*, b.name as branch_name, t.full_name as trainer_name
@@ -426,10 +436,10 @@ async def select_child_parent(callback: CallbackQuery, state: FSMContext):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"👥 {group['name']} ({group['branch_name']} - {group['trainer_name']})",
-                callback_data=f"select_child_group_{group['id']}"
+                callback_data=SELECT_CHILD_GROUP.pack(group['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         f"👶 Ребёнок: {data['child_name']}\n\n"
@@ -438,17 +448,18 @@ async def select_child_parent(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@admin_router.callback_query(F.data.startswith("select_child_group_"), StateFilter(AdminStates.selecting_child_group))
-async def select_child_group(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_CHILD_GROUP, state=AdminStates.selecting_child_group)
+async def select_child_group(callback: CallbackQuery, group_id: int, state: FSMContext):
     """Выбор группы для ребёнка"""
-    group_id = int(callback.data.split("_")[3])
     data = await state.get_data()
 
     # Создаём ребёнка
     child_id = await db.create_child(data['child_name'], data['parent_id'], group_id)
+    audit.record("child_created", f"Child: {child_id}, Name: {data['child_name']}, Group: {group_id}, "
+                                  f"Parent: {data['parent_id']}", telegram_id=callback.from_user.id)
 
     # Получаем информацию для отчёта
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT g.name as group_name, b.name as branch_name, t.full_name as trainer_name,
@@ -477,19 +488,27 @@ async def select_child_group(callback: CallbackQuery, state: FSMContext):
 
 # ОТЧЁТЫ
 
-@admin_router.callback_query(F.data == "mt_reports")
+@callbacks.route(MT_REPORTS)
 async def reports_menu(callback: CallbackQuery):
     """Меню отчётов"""
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="📅 Отчёт за сегодня", callback_data="report_today"),
-        InlineKeyboardButton(text="📊 Отчёт за неделю", callback_data="report_week")
+        InlineKeyboardButton(text="📅 Отчёт за сегодня", callback_data=REPORT_TODAY.pack()),
+        InlineKeyboardButton(text="📊 Отчёт за неделю", callback_data=REPORT_WEEK.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="📈 Отчёт за месяц", callback_data="report_month"),
-        InlineKeyboardButton(text="💰 Финансовый отчёт", callback_data="report_finance")
+        InlineKeyboardButton(text="📈 Отчёт за месяц", callback_data=REPORT_MONTH.pack()),
+        InlineKeyboardButton(text="💰 Финансовый отчёт", callback_data=REPORT_FINANCE.pack())
     )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(
+        InlineKeyboardButton(text="🗓 Произвольный период", callback_data=REPORT_RANGE.pack()),
+        InlineKeyboardButton(text="🧮 Аналитика", callback_data=REPORT_ANALYTICS.pack())
+    )
+    keyboard.row(
+        InlineKeyboardButton(text="📄 PDF за месяц", callback_data=REPORT_PDF.pack()),
+        InlineKeyboardButton(text="📥 Выгрузка в Excel", callback_data=REPORT_EXPORT.pack())
+    )
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         "📋 Выберите тип отчёта:",
@@ -497,13 +516,13 @@ async def reports_menu(callback: CallbackQuery):
     )
 
 
-@admin_router.callback_query(F.data == "report_today")
+@callbacks.route(REPORT_TODAY)
 async def report_today(callback: CallbackQuery):
     """Отчёт за сегодня"""
     from datetime import date
     today = date.today()
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         async with conn.execute(
@@ -549,12 +568,12 @@ async def report_today(callback: CallbackQuery):
 
 
 # Добавляем функцию для просмотра детей с возможностью редактирования ТОЛЬКО для главного тренера
-@admin_router.callback_query(F.data == "view_children")
+@callbacks.route(VIEW_CHILDREN)
 async def view_children_with_edit(callback: CallbackQuery):
     """Просмотр всех детей с возможностью редактирования (только для главного тренера)"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT c.*, g.name as group_name, b.name as branch_name, t.full_name as trainer_name,
@@ -586,7 +605,7 @@ async def view_children_with_edit(callback: CallbackQuery):
             keyboard.row(
                 InlineKeyboardButton(
                     text=f"👶 {child['full_name']} ({child['group_name']}, {child['branch_name']})",
-                    callback_data=f"child_info_{child['id']}"
+                    callback_data=CHILD_INFO.pack(child['id'])
                 )
             )
         else:
@@ -595,23 +614,22 @@ async def view_children_with_edit(callback: CallbackQuery):
             keyboard.row(
                 InlineKeyboardButton(
                     text=text_info,
-                    callback_data=f"child_info_readonly_{child['id']}"
+                    callback_data=CHILD_INFO_READONLY.pack(child['id'])
                 )
             )
 
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="mt_groups"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_GROUPS.pack()))
 
     title = "👶 Все дети" + (" (нажмите для редактирования)" if is_main_trainer else " (только просмотр)")
     await callback.message.edit_text(title, reply_markup=keyboard.as_markup())
 
 
 # Функция для read-only просмотра информации о ребёнке
-@admin_router.callback_query(F.data.startswith("child_info_readonly_"))
-async def child_info_readonly(callback: CallbackQuery):
+@callbacks.route(CHILD_INFO_READONLY)
+async def child_info_readonly(callback: CallbackQuery, child_id: int):
     """Информация о ребёнке без возможности редактирования"""
-    child_id = int(callback.data.split("_")[3])
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT c.*, g.name as group_name, b.name as branch_name, t.full_name as trainer_name,
@@ -642,61 +660,16 @@ async def child_info_readonly(callback: CallbackQuery):
     )
 
     keyboard = InlineKeyboardBuilder()
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="view_children"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=VIEW_CHILDREN.pack()))
 
     await callback.message.edit_text(text, reply_markup=keyboard.as_markup())
 
 
-# ДОБАВИТЬ В КОНЕЦ ФАЙЛА admin_handlers.py
-
-@admin_router.callback_query(F.data == "view_children")
-async def view_children_handler(callback: CallbackQuery):
-    """Просмотр всех детей"""
-    user = await db.get_user_by_telegram_id(callback.from_user.id)
-    is_main_trainer = user and user['role'] == ROLE_MAIN_TRAINER
+@callbacks.route(CHILD_INFO)
+async def child_info_with_actions(callback: CallbackQuery, child_id: int):
+    """Информация о ребёнке: посещаемость за месяц и платежи"""
 
-    async with aiosqlite.connect(db.db_path) as conn:
-        conn.row_factory = aiosqlite.Row
-        async with conn.execute(
-                """SELECT c.*, g.name as group_name, b.name as branch_name
-                   FROM children c 
-                   JOIN groups_table g ON c.group_id = g.id 
-                   JOIN branches b ON g.branch_id = b.id 
-                   ORDER BY b.name, g.name, c.full_name"""
-        ) as cursor:
-            children = await cursor.fetchall()
-
-    if not children:
-        await callback.message.edit_text(
-            "❌ Детей пока нет.",
-            reply_markup=get_back_button()
-        )
-        return
-
-    keyboard = InlineKeyboardBuilder()
-
-    for child in children:
-        keyboard.row(
-            InlineKeyboardButton(
-                text=f"👶 {child['full_name']} ({child['group_name']}, {child['branch_name']})",
-                callback_data=f"child_info_{child['id']}"
-            )
-        )
-
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="mt_groups"))
-
-    title = "👶 Все дети" + (" (нажмите для редактирования)" if is_main_trainer else " (нажмите для просмотра)")
-    await callback.message.edit_text(title, reply_markup=keyboard.as_markup())
-
-
-@admin_router.callback_query(F.data.startswith("child_info_"))
-async def child_info_with_actions(callback: CallbackQuery):
-    """Информация о ребёнке с кнопками редактирования (только для главного тренера)"""
-    child_id = int(callback.data.split("_")[2])
-    user = await db.get_user_by_telegram_id(callback.from_user.id)
-    is_main = user and user['role'] == ROLE_MAIN_TRAINER
-
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT c.*, g.name as group_name, b.name as branch_name, t.full_name as trainer_name,
@@ -766,12 +739,6 @@ async def child_info_with_actions(callback: CallbackQuery):
     )
 
     keyboard = InlineKeyboardBuilder()
-
-    # Кнопки редактирования и удаления только для главного тренера
-    if is_main:
-        keyboard.row(InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"edit_child_{child_id}"))
-        keyboard.row(InlineKeyboardButton(text="🗑 Удалить", callback_data=f"delete_child_{child_id}"))
-
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="view_children"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=VIEW_CHILDREN.pack()))
 
     await callback.message.edit_text(text, reply_markup=keyboard.as_markup())
\ No newline at end of file
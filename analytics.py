@@ -0,0 +1,416 @@
+import asyncio
+import copy
+import logging
+import sqlite3
+from datetime import date
+
+import numpy as np
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(1970, 1, 1)
+
+# Строки из курсора читаются порциями
+LOAD_CHUNK_SIZE = 5000
+
+
+def to_epoch_day(value: date) -> int:
+    return value.toordinal() - EPOCH.toordinal()
+
+
+def from_epoch_day(day: int) -> date:
+    return date.fromordinal(int(day) + EPOCH.toordinal())
+
+
+def _epoch_days(timestamps) -> np.ndarray:
+    """ISO-строки из базы -> номера дней с 1970-01-01
+
+    Время хранится с часовым поясом академии, поэтому первые 10 символов
+    уже являются локальной датой.
+    """
+    if not timestamps:
+        return np.empty(0, dtype=np.int32)
+    return np.array([ts[:10] for ts in timestamps], dtype="datetime64[D]").astype(np.int32)
+
+
+def _group(keys: np.ndarray, weights: np.ndarray = None):
+    """Группировка: уникальные ключи и сумма весов (или количество) по каждому"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    if weights is None:
+        return unique, np.bincount(inverse, minlength=len(unique))
+    return unique, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+def _dense_lookup(pairs) -> np.ndarray:
+    """[(id, значение)] -> массив, где array[id] = значение (0 для отсутствующих id)"""
+    pairs = list(pairs)
+    size = max((key for key, _ in pairs), default=0) + 1
+    table = np.zeros(size, dtype=np.int32)
+    for key, value in pairs:
+        table[key] = value
+    return table
+
+
+def _lookup(table: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Векторный поиск по плотному массиву; id вне справочника (удалённые) дают 0"""
+    result = np.zeros(len(keys), dtype=np.int32)
+    known = keys < len(table)
+    result[known] = table[keys[known]]
+    return result
+
+
+def _month_keys(days: np.ndarray) -> np.ndarray:
+    """Номер дня -> номер месяца с 1970-01 (для группировки по месяцам)"""
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+
+
+def _month_label(month_key: int) -> str:
+    return str(np.datetime64(int(month_key), "M"))
+
+
+class AnalyticsSnapshot:
+    """Колоночный снимок посещаемости, занятий и оплат в памяти
+
+    Данные загружаются один раз и затем дочитываются по максимальному id
+    (high-water mark). Идентификаторы хранятся как целые, даты - как номера дней,
+    поэтому группировки считаются векторно в numpy без запросов к SQLite.
+
+    Посещаемость пишется через INSERT OR REPLACE: перезаписанная отметка
+    получает новый id, старая при дочитке отбрасывается по ключу (занятие, ребёнок).
+    Если строк в базе стало меньше (удаления), снимок перечитывается целиком. Если и полная
+    перезагрузка не сходится с базой (например, отметка удалённого занятия), остаётся
+    прежний снимок, а в журнал пишется ошибка.
+
+    Обновление собирается в потоке на копии снимка (массивы только заменяются, на месте
+    не меняются) и подставляется в цикле событий целиком. Запросы синхронные, поэтому
+    каждый из них видит массивы одного обновления, даже если другое идёт параллельно.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Занятия (отсортированы по id)
+        self.session_id = np.empty(0, dtype=np.int64)
+        self.session_day = np.empty(0, dtype=np.int32)
+        self.session_trainer = np.empty(0, dtype=np.int32)
+        self.session_group = np.empty(0, dtype=np.int32)
+        self.session_is_game = np.empty(0, dtype=np.int8)
+
+        # Отметки посещаемости с денормализованными полями занятия
+        self.att_id = np.empty(0, dtype=np.int64)
+        self.att_session = np.empty(0, dtype=np.int64)
+        self.att_child = np.empty(0, dtype=np.int32)
+        self.att_present = np.empty(0, dtype=np.int8)
+        self.att_day = np.empty(0, dtype=np.int32)
+        self.att_trainer = np.empty(0, dtype=np.int32)
+        self.att_group = np.empty(0, dtype=np.int32)
+
+        # Оплаты
+        self.pay_id = np.empty(0, dtype=np.int64)
+        self.pay_child = np.empty(0, dtype=np.int32)
+        self.pay_trainer = np.empty(0, dtype=np.int32)
+        self.pay_amount = np.empty(0, dtype=np.float64)
+        self.pay_day = np.empty(0, dtype=np.int32)
+
+        # Справочники маленькие и могут меняться - перечитываются при каждом обновлении.
+        # group_branch[group_id] и child_group[child_id] - плотные массивы для векторного поиска
+        self.group_branch = np.zeros(1, dtype=np.int32)
+        self.child_group = np.zeros(1, dtype=np.int32)
+        self.branch_names = {}
+        self.trainer_names = {}
+        self.group_names = {}
+        self.child_names = {}
+
+        self.loaded = False
+
+    # ЗАГРУЗКА
+
+    def _fetch(self, conn, sql, params=()):
+        cursor = conn.execute(sql, params)
+        rows = []
+        try:
+            while True:
+                chunk = cursor.fetchmany(LOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                rows.extend(chunk)
+        finally:
+            cursor.close()
+        return rows
+
+    def _load_dictionaries(self, conn):
+        self.branch_names = dict(conn.execute("SELECT id, name FROM branches").fetchall())
+        self.trainer_names = dict(conn.execute("SELECT id, full_name FROM trainers").fetchall())
+        groups = conn.execute("SELECT id, name, branch_id FROM groups_table").fetchall()
+        self.group_names = {group_id: name for group_id, name, _ in groups}
+        self.group_branch = _dense_lookup((group_id, branch_id) for group_id, _, branch_id in groups)
+        children = conn.execute("SELECT id, full_name, group_id FROM children").fetchall()
+        self.child_names = {child_id: name for child_id, name, _ in children}
+        self.child_group = _dense_lookup((child_id, group_id) for child_id, _, group_id in children)
+
+    def _load_sessions(self, conn):
+        hwm = int(self.session_id[-1]) if len(self.session_id) else 0
+        rows = self._fetch(
+            conn,
+            "SELECT id, start_time, trainer_id, group_id, type FROM sessions WHERE id > ? ORDER BY id",
+            (hwm,)
+        )
+        if not rows:
+            return
+        ids, starts, trainers, groups, types = zip(*rows)
+        self.session_id = np.concatenate([self.session_id, np.array(ids, dtype=np.int64)])
+        self.session_day = np.concatenate([self.session_day, _epoch_days(starts)])
+        self.session_trainer = np.concatenate([self.session_trainer, np.array(trainers, dtype=np.int32)])
+        self.session_group = np.concatenate([self.session_group, np.array(groups, dtype=np.int32)])
+        self.session_is_game = np.concatenate([
+            self.session_is_game, np.array([t == 'game' for t in types], dtype=np.int8)
+        ])
+
+    def _load_attendance(self, conn):
+        hwm = int(self.att_id.max()) if len(self.att_id) else 0
+        rows = self._fetch(
+            conn,
+            "SELECT id, session_id, child_id, status FROM attendance WHERE id > ? ORDER BY id",
+            (hwm,)
+        )
+        if not rows:
+            return
+        ids, sessions, children, statuses = zip(*rows)
+        sessions = np.array(sessions, dtype=np.int64)
+
+        # Поля занятия переносятся в отметку через поиск по отсортированным id занятий
+        index = np.searchsorted(self.session_id, sessions)
+        index = np.clip(index, 0, max(len(self.session_id) - 1, 0))
+        if not len(self.session_id) or not np.array_equal(self.session_id[index], sessions):
+            raise LookupError("Отметка посещаемости ссылается на незагруженное занятие")
+
+        self.att_id = np.concatenate([self.att_id, np.array(ids, dtype=np.int64)])
+        self.att_session = np.concatenate([self.att_session, sessions])
+        self.att_child = np.concatenate([self.att_child, np.array(children, dtype=np.int32)])
+        self.att_present = np.concatenate([
+            self.att_present, np.array([s == 'present' for s in statuses], dtype=np.int8)
+        ])
+        self.att_day = np.concatenate([self.att_day, self.session_day[index]])
+        self.att_trainer = np.concatenate([self.att_trainer, self.session_trainer[index]])
+        self.att_group = np.concatenate([self.att_group, self.session_group[index]])
+        self._dedupe_attendance()
+
+    def _dedupe_attendance(self):
+        """Оставляет по одной (последней) отметке на пару (занятие, ребёнок)"""
+        key = (self.att_session << 32) | self.att_child.astype(np.int64)
+        order = np.lexsort((self.att_id, key))
+        sorted_key = key[order]
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = sorted_key[:-1] != sorted_key[1:]
+        if is_last.all():
+            return
+        keep = np.sort(order[is_last])
+        for name in ("att_id", "att_session", "att_child", "att_present", "att_day", "att_trainer", "att_group"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def _load_payments(self, conn):
+        hwm = int(self.pay_id[-1]) if len(self.pay_id) else 0
+        rows = self._fetch(
+            conn,
+            "SELECT id, child_id, trainer_id, amount, payment_date FROM payments WHERE id > ? ORDER BY id",
+            (hwm,)
+        )
+        if not rows:
+            return
+        ids, children, trainers, amounts, dates = zip(*rows)
+        self.pay_id = np.concatenate([self.pay_id, np.array(ids, dtype=np.int64)])
+        self.pay_child = np.concatenate([self.pay_child, np.array(children, dtype=np.int32)])
+        self.pay_trainer = np.concatenate([self.pay_trainer, np.array(trainers, dtype=np.int32)])
+        self.pay_amount = np.concatenate([self.pay_amount, np.array(amounts, dtype=np.float64)])
+        self.pay_day = np.concatenate([self.pay_day, _epoch_days(dates)])
+
+    def _counts_match(self, conn) -> bool:
+        sessions, attendance, payments = conn.execute(
+            """SELECT (SELECT COUNT(*) FROM sessions),
+                      (SELECT COUNT(*) FROM attendance),
+                      (SELECT COUNT(*) FROM payments)"""
+        ).fetchone()
+        return (sessions, attendance, payments) == (
+            len(self.session_id), len(self.att_id), len(self.pay_id)
+        )
+
+    def _refresh_sync(self) -> "AnalyticsSnapshot":
+        """Обновлённая копия снимка (вызывается в потоке, сам снимок не меняет)"""
+        staged = copy.copy(self)
+        conn = sqlite3.connect(self.db_path or db.db_path)
+        try:
+            # Один читающий транзакционный снимок на всё обновление
+            conn.execute("BEGIN")
+            staged._load_dictionaries(conn)
+            for attempt in range(2):
+                try:
+                    staged._load_sessions(conn)
+                    staged._load_attendance(conn)
+                    staged._load_payments(conn)
+                    if staged._counts_match(conn):
+                        break
+                    error = LookupError("Число строк снимка не совпадает с базой")
+                except LookupError as e:
+                    error = e
+                if attempt:
+                    # Не сошлась и полная перезагрузка: пустой снимок не должен заменить прежний
+                    raise error
+                logger.info("Снимок аналитики устарел (были удаления), полная перезагрузка")
+                staged._reset()
+                staged._load_dictionaries(conn)
+            conn.rollback()
+        finally:
+            conn.close()
+        staged.loaded = True
+        return staged
+
+    async def refresh(self):
+        """Дочитка новых строк (при первом вызове - полная загрузка)"""
+        async with self._lock:
+            try:
+                staged = await asyncio.to_thread(self._refresh_sync)
+            except LookupError as e:
+                logger.error(f"Снимок аналитики не обновлён, остаётся прежний: {e}")
+                return
+            # Подмена в цикле событий, без await: запрос не увидит половину обновления
+            self.__dict__.update(vars(staged))
+
+    # ЗАПРОСЫ
+
+    def _group_branches(self, groups: np.ndarray) -> np.ndarray:
+        return _lookup(self.group_branch, groups)
+
+    def _child_groups(self, children: np.ndarray) -> np.ndarray:
+        return _lookup(self.child_group, children)
+
+    @staticmethod
+    def _day_mask(days: np.ndarray, start: date, end: date) -> np.ndarray:
+        return (days >= to_epoch_day(start)) & (days <= to_epoch_day(end))
+
+    def branch_comparison(self, start: date, end: date):
+        """Филиалы за период: занятия, отметки, посещаемость, оплаты"""
+        mask = self._day_mask(self.session_day, start, end)
+        branches, sessions = _group(self._group_branches(self.session_group[mask]))
+        session_counts = dict(zip(branches.tolist(), sessions.tolist()))
+
+        mask = self._day_mask(self.att_day, start, end)
+        att_branches = self._group_branches(self.att_group[mask])
+        branches, marks = _group(att_branches)
+        _, present = _group(att_branches, self.att_present[mask])
+        attendance = {b: (int(p), int(m)) for b, p, m in zip(branches.tolist(), present, marks)}
+
+        mask = self._day_mask(self.pay_day, start, end)
+        branches, income = _group(self._group_branches(self._child_groups(self.pay_child[mask])),
+                                  self.pay_amount[mask])
+        incomes = dict(zip(branches.tolist(), income.tolist()))
+
+        result = []
+        for branch_id, name in sorted(self.branch_names.items(), key=lambda item: item[1]):
+            present, marks = attendance.get(branch_id, (0, 0))
+            result.append({
+                'branch_id': branch_id,
+                'name': name,
+                'sessions': session_counts.get(branch_id, 0),
+                'marks': marks,
+                'attendance_rate': round(present * 100.0 / marks, 1) if marks else 0,
+                'income': incomes.get(branch_id, 0.0),
+            })
+        return result
+
+    def trainer_utilization(self, start: date, end: date):
+        """Тренеры за период: занятия, игры, рабочие дни, посещаемость"""
+        mask = self._day_mask(self.session_day, start, end)
+        trainers = self.session_trainer[mask]
+        ids, sessions = _group(trainers)
+        _, games = _group(trainers, self.session_is_game[mask])
+
+        # Рабочий день - уникальная пара (тренер, день)
+        pairs = np.unique((trainers.astype(np.int64) << 32) | self.session_day[mask].astype(np.int64))
+        day_ids, active_days = _group((pairs >> 32).astype(np.int32))
+        days = dict(zip(day_ids.tolist(), active_days.tolist()))
+
+        mask = self._day_mask(self.att_day, start, end)
+        att_ids, marks = _group(self.att_trainer[mask])
+        _, present = _group(self.att_trainer[mask], self.att_present[mask])
+        attendance = {t: (int(p), int(m)) for t, p, m in zip(att_ids.tolist(), present, marks)}
+
+        result = []
+        for trainer_id, count, game_count in zip(ids.tolist(), sessions.tolist(), games.tolist()):
+            present, marks = attendance.get(trainer_id, (0, 0))
+            result.append({
+                'trainer_id': trainer_id,
+                'name': self.trainer_names.get(trainer_id, f"#{trainer_id}"),
+                'sessions': count,
+                'trainings': count - int(game_count),
+                'games': int(game_count),
+                'active_days': days.get(trainer_id, 0),
+                'attendance_rate': round(present * 100.0 / marks, 1) if marks else 0,
+            })
+        result.sort(key=lambda row: row['sessions'], reverse=True)
+        return result
+
+    def child_monthly_attendance(self, start: date, end: date, group_id: int = None):
+        """Посещаемость каждого ребёнка по месяцам: [(ребёнок, месяц, был, всего)]"""
+        mask = self._day_mask(self.att_day, start, end)
+        if group_id is not None:
+            mask &= self.att_group == group_id
+
+        months = _month_keys(self.att_day[mask])
+        key = (self.att_child[mask].astype(np.int64) << 32) | months.astype(np.int64)
+        keys, marks = _group(key)
+        _, present = _group(key, self.att_present[mask])
+
+        return [
+            {
+                'child_id': int(k >> 32),
+                'name': self.child_names.get(int(k >> 32), f"#{int(k >> 32)}"),
+                'month': _month_label(k & 0xFFFFFFFF),
+                'present': int(p),
+                'total': int(m),
+            }
+            for k, p, m in zip(keys.tolist(), present, marks)
+        ]
+
+    def monthly_trend(self, start: date, end: date, branch_id: int = None):
+        """Занятия, посещаемость и оплаты по месяцам"""
+        session_mask = self._day_mask(self.session_day, start, end)
+        att_mask = self._day_mask(self.att_day, start, end)
+        pay_mask = self._day_mask(self.pay_day, start, end)
+        if branch_id is not None:
+            session_mask &= self._group_branches(self.session_group) == branch_id
+            att_mask &= self._group_branches(self.att_group) == branch_id
+            pay_mask &= self._group_branches(self._child_groups(self.pay_child)) == branch_id
+
+        months, sessions = _group(_month_keys(self.session_day[session_mask]))
+        trend = {m: {'sessions': int(c), 'present': 0, 'marks': 0, 'income': 0.0}
+                 for m, c in zip(months.tolist(), sessions)}
+
+        att_months = _month_keys(self.att_day[att_mask])
+        months, marks = _group(att_months)
+        _, present = _group(att_months, self.att_present[att_mask])
+        for m, p, total in zip(months.tolist(), present, marks):
+            row = trend.setdefault(m, {'sessions': 0, 'present': 0, 'marks': 0, 'income': 0.0})
+            row['present'], row['marks'] = int(p), int(total)
+
+        months, income = _group(_month_keys(self.pay_day[pay_mask]), self.pay_amount[pay_mask])
+        for m, amount in zip(months.tolist(), income.tolist()):
+            trend.setdefault(m, {'sessions': 0, 'present': 0, 'marks': 0, 'income': 0.0})['income'] = amount
+
+        result = []
+        for month_key in sorted(trend):
+            row = trend[month_key]
+            result.append({
+                'month': _month_label(month_key),
+                'sessions': row['sessions'],
+                'attendance_rate': round(row['present'] * 100.0 / row['marks'], 1) if row['marks'] else 0,
+                'income': row['income'],
+            })
+        return result
+
+
+analytics = AnalyticsSnapshot()
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+from config import AUDIT_BATCH_SIZE, AUDIT_FLUSH_MS, AUDIT_MAX_PENDING, get_current_time
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Пользователь задаётся id из users или telegram_id (id находится при записи)
+INSERT_SQL = """INSERT INTO logs (user_id, action, details, created_at)
+                VALUES (COALESCE(?, (SELECT id FROM users WHERE telegram_id = ?)), ?, ?, ?)"""
+
+
+class AuditWriter:
+    """Журнал действий в таблице logs с пакетной записью
+
+    record() только кладёт запись в очередь в памяти и сразу возвращается: обработчик
+    не ждёт базу. Очередь пишется одним executemany и одной транзакцией, как только
+    набралось batch_size записей или прошло flush_interval_ms после первой из них.
+    При ошибке записи пачка возвращается в очередь (не больше max_pending записей,
+    самые старые отбрасываются). При остановке бота очередь дописывается (close).
+    """
+
+    def __init__(self, batch_size: int = AUDIT_BATCH_SIZE, flush_interval_ms: float = AUDIT_FLUSH_MS,
+                 max_pending: int = AUDIT_MAX_PENDING):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._pending = []
+        self._task = None
+        self._has_entries = None
+        self._full = None
+        self._flush_lock = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, action: str, details: str = None, user_id: int = None, telegram_id: int = None):
+        """Запись в журнал; user_id - id из users, telegram_id - если id под рукой нет"""
+        self._pending.append((user_id, telegram_id, action, details, get_current_time().isoformat()))
+        if self._task is None or self._task.done():
+            self._start()
+        self._has_entries.set()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    def _start(self):
+        # События и задача создаются в текущем цикле событий (бенчмарки запускают несколько)
+        self._has_entries = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop(), name="audit_flush")
+
+    async def _flush_loop(self):
+        while True:
+            await self._has_entries.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Журнал действий: ошибка записи")
+                # Не повторять сразу: база может быть занята
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self):
+        """Запись накопленных записей одной транзакцией"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            self._has_entries.clear()
+            self._full.clear()
+            if not batch:
+                return
+            try:
+                async with db.connect() as conn:
+                    await conn.executemany(INSERT_SQL, batch)
+                    await conn.commit()
+            except BaseException:
+                # В том числе отмена при остановке: пачку допишет close.
+                # Вернуть пачку в начало очереди; лишнее - самые старые записи
+                self._pending[:0] = batch
+                overflow = len(self._pending) - self.max_pending
+                if overflow > 0:
+                    del self._pending[:overflow]
+                    self.dropped += overflow
+                self._has_entries.set()
+                raise
+            self.written += len(batch)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(f"Журнал действий: не записано при остановке: {len(self._pending)}")
+
+    def stats(self) -> dict:
+        return {'pending': len(self._pending), 'written': self.written, 'dropped': self.dropped}
+
+
+audit = AuditWriter()
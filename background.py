@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """Фоновые задачи, запущенные обработчиками после ответа пользователю
+
+    Обработчик сначала отвечает на нажатие и обновляет сообщение, а медленную
+    работу (рассылку уведомлений родителям, геокодинг) отдаёт сюда. Задачи
+    хранятся до завершения (иначе сборщик мусора может уничтожить их посреди работы),
+    ошибки пишутся в лог с именем задачи, а не теряются молча.
+    """
+
+    def __init__(self):
+        self._tasks = set()
+        self.started = 0
+        self.failed = 0
+
+    def spawn(self, coro, name: str = None) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        self.started += 1
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            logger.warning(f"Фоновая задача {task.get_name()} отменена")
+            return
+        error = task.exception()
+        if error is not None:
+            self.failed += 1
+            logger.error(f"Ошибка фоновой задачи {task.get_name()}", exc_info=error)
+
+    async def drain(self, timeout: float) -> bool:
+        """Ожидание фоновых задач при остановке; не успевшие за timeout отменяются"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Задача может запустить следующую, поэтому ждём, пока набор не опустеет
+        while self._tasks:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+
+        if not self._tasks:
+            return True
+        logger.warning(f"Не дождались фоновых задач: {len(self._tasks)}, отменяем")
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return False
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def stats(self) -> dict:
+        return {'pending': self.pending, 'started': self.started, 'failed': self.failed}
+
+
+background = BackgroundTasks()
@@ -0,0 +1,378 @@
+"""Резервные копии базы через SQLite Online Backup API
+
+Пример:
+    python backup.py                                     # снять копию сейчас
+    python backup.py --list                              # копии в BACKUP_DIR
+    python backup.py --verify backups/football_academy_20250301-040000.db.gz
+    python backup.py --restore backups/football_academy_20250301-040000.db.gz   # бот должен быть остановлен
+
+Копия снимается из работающей базы: по BACKUP_STEP_PAGES страниц за шаг с паузой между
+шагами, в отдельном потоке - обработчики обновлений и писатели не ждут копирования. Снятая
+копия проверяется (PRAGMA integrity_check), сжимается gzip и только потом появляется в
+BACKUP_DIR под своим именем; хранятся последние BACKUP_KEEP копий.
+
+Старая история живёт только в архивах по годам (retention.py), поэтому они копируются
+тоже: BACKUP_DIR/<база>_archive/<архив>.db.gz, по одной копии на архив, которая
+обновляется, когда архив изменился (не чаще раза за ночь). --verify проверяет и их,
+--restore восстанавливает пропавшие или повреждённые архивы.
+"""
+import argparse
+import asyncio
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import urllib.request
+
+from config import (
+    BACKUP_CRON, BACKUP_DIR, BACKUP_KEEP, BACKUP_STEP_PAGES, BACKUP_STEP_PAUSE_MS, get_current_time
+)
+from database import db
+from retention import ARCHIVE_DIR, archive_path, archive_years
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз пошаговое копирование может начаться заново из-за записи в базу,
+# прежде чем копия снимется за один шаг
+MAX_RESTARTS = 3
+# Таблицы, число строк которых показывает проверка копии
+SUMMARY_TABLES = ("users", "children", "sessions", "attendance", "payments", "logs")
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _stem(db_path: str) -> str:
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def _check(path: str) -> dict:
+    """PRAGMA integrity_check и число строк основных таблиц; BackupError, если файл повреждён"""
+    conn = sqlite3.connect("file:" + urllib.request.pathname2url(os.path.abspath(path)) + "?mode=ro", uri=True)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if result != ["ok"]:
+            raise BackupError(f"Копия повреждена: {'; '.join(result[:5])}")
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in SUMMARY_TABLES if table in tables}
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"Не база SQLite или файл повреждён: {e}") from e
+    finally:
+        conn.close()
+
+
+class BackupService:
+    """Снятие, проверка, ротация и восстановление копий
+
+    Online Backup API копирует страницы шагами; между шагами блокировка чтения снимается
+    и писатели проходят без ожидания. Если в базу пишут во время копирования, SQLite
+    начинает копию заново - после MAX_RESTARTS таких повторов копия снимается за один
+    шаг (в режиме WAL это одна транзакция чтения, писателей она тоже не держит).
+    Всё копирование идёт в потоке, цикл событий не блокируется.
+    """
+
+    def __init__(self, directory: str = BACKUP_DIR, keep: int = BACKUP_KEEP,
+                 step_pages: int = BACKUP_STEP_PAGES, step_pause_ms: float = BACKUP_STEP_PAUSE_MS):
+        self.directory = directory
+        self.keep = keep
+        self.step_pages = step_pages
+        self.step_pause = step_pause_ms / 1000
+        self._lock = None
+        self.last_success = 0.0
+        self.last_duration = 0.0
+        self.last_size = 0
+        self.failures = 0
+
+    def list(self, db_path: str = None) -> list:
+        """Копии базы, от старых к новым (имя содержит дату и время)"""
+        pattern = os.path.join(glob.escape(self.directory), f"{glob.escape(_stem(db_path or db.db_path))}_*.db.gz")
+        return sorted(glob.glob(pattern))
+
+    # СНЯТИЕ КОПИИ
+
+    def _copy(self, source_path: str, target_path: str) -> dict:
+        source = sqlite3.connect(source_path)
+        try:
+            try:
+                progress = self._copy_steps(source, target_path)
+            except _TooManyRestarts:
+                logger.info("Резервная копия: база меняется быстрее копирования, копия за один шаг")
+                os.remove(target_path)
+                target = sqlite3.connect(target_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                progress = {'restarts': MAX_RESTARTS + 1, 'one_step': True}
+        finally:
+            source.close()
+
+        # Копия наследует WAL; файл копии должен быть самодостаточным, без -wal и -shm
+        target = sqlite3.connect(target_path)
+        try:
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+        return progress
+
+    def _copy_steps(self, source: sqlite3.Connection, target_path: str) -> dict:
+        progress = {'restarts': 0, 'one_step': False}
+        last_remaining = None
+
+        def on_step(status, remaining, total):
+            nonlocal last_remaining
+            # Осталось больше, чем на прошлом шаге: базу изменили, копирование началось заново
+            if last_remaining is not None and remaining > last_remaining:
+                progress['restarts'] += 1
+                if progress['restarts'] > MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            last_remaining = remaining
+            if remaining and self.step_pause:
+                time.sleep(self.step_pause)
+
+        target = sqlite3.connect(target_path)
+        try:
+            # Исключение из on_step прерывает копирование и выходит отсюда
+            source.backup(target, pages=self.step_pages, progress=on_step)
+        finally:
+            target.close()
+        return progress
+
+    def _snapshot(self, source_path: str, path: str) -> tuple:
+        """Снять, проверить и сжать копию базы в path; (ход копирования, число строк)"""
+        # Недоснятая копия не похожа на готовую: ротация и --list её не видят
+        partial = path[:-len(".gz")] + ".partial"
+        try:
+            progress = self._copy(source_path, partial)
+            counts = _check(partial)
+            with open(partial, "rb") as src, gzip.open(path + ".partial", "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(path + ".partial", path)
+        finally:
+            for leftover in (partial, partial + "-wal", partial + "-shm", path + ".partial"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        return progress, counts
+
+    def archive_directory(self, db_path: str = None) -> str:
+        return os.path.join(self.directory, f"{_stem(db_path or db.db_path)}_archive")
+
+    def _backup_archives(self, db_path: str) -> list:
+        """Копии изменившихся архивов истории; время изменения копии = времени архива"""
+        directory = self.archive_directory(db_path)
+        copied = []
+        for year in archive_years(db_path):
+            source = archive_path(year, db_path)
+            target = os.path.join(directory, os.path.basename(source) + ".gz")
+            mtime = os.stat(source).st_mtime_ns
+            if os.path.exists(target) and os.stat(target).st_mtime_ns == mtime:
+                continue
+            os.makedirs(directory, exist_ok=True)
+            try:
+                self._snapshot(source, target)
+            except (BackupError, sqlite3.DatabaseError):
+                # Прежняя копия архива не заменяется; остальные архивы и база копируются
+                logger.exception(f"Резервная копия: архив {source} не скопирован")
+                continue
+            os.utime(target, ns=(mtime, mtime))
+            copied.append(target)
+        return copied
+
+    def create(self, db_path: str = None, with_archives: bool = True) -> dict:
+        """Снять, проверить, сжать копию и удалить старые (синхронно: вызывать в потоке)"""
+        db_path = db_path or db.db_path
+        if not os.path.exists(db_path):
+            raise BackupError(f"Нет файла базы: {db_path}")
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.perf_counter()
+        name = f"{_stem(db_path)}_{get_current_time():%Y%m%d-%H%M%S}.db.gz"
+        path = os.path.join(self.directory, name)
+
+        progress, counts = self._snapshot(db_path, path)
+        archives = self._backup_archives(db_path) if with_archives else []
+        removed = self.rotate(db_path)
+        return {
+            'path': path,
+            'size': os.path.getsize(path),
+            'duration': time.perf_counter() - started,
+            'counts': counts,
+            'archives': archives,
+            'removed': removed,
+            **progress,
+        }
+
+    def rotate(self, db_path: str = None) -> list:
+        """Удалить копии сверх self.keep, самые старые"""
+        existing = self.list(db_path)
+        removed = existing[:-self.keep] if self.keep > 0 else []
+        for path in removed:
+            os.remove(path)
+        return removed
+
+    async def run(self) -> dict:
+        """Снятие копии из работающего бота (в потоке; одновременно - только одна)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                result = await asyncio.to_thread(self.create)
+            except Exception:
+                self.failures += 1
+                logger.exception("Резервная копия: не удалось снять копию")
+                raise
+        self.last_success = time.time()
+        self.last_duration = result['duration']
+        self.last_size = result['size']
+        logger.info(
+            f"Резервная копия: {result['path']}, {result['size'] / 1024 / 1024:.1f} MB за {result['duration']:.1f} с"
+            f" (повторов: {result['restarts']}, архивов скопировано: {len(result['archives'])},"
+            f" удалено старых: {len(result['removed'])})"
+        )
+        return result
+
+    # ПРОВЕРКА И ВОССТАНОВЛЕНИЕ
+
+    def _unpack(self, path: str) -> str:
+        """Распаковать копию рядом с ней во временный файл"""
+        unpacked = path + ".check"
+        try:
+            with gzip.open(path, "rb") as src, open(unpacked, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        except (OSError, EOFError) as e:
+            if os.path.exists(unpacked):
+                os.remove(unpacked)
+            raise BackupError(f"Не удалось распаковать {path}: {e}") from e
+        return unpacked
+
+    def _verify_file(self, path: str) -> dict:
+        unpacked = self._unpack(path)
+        try:
+            return _check(unpacked)
+        finally:
+            os.remove(unpacked)
+
+    def archive_copies(self, db_path: str = None) -> list:
+        return sorted(glob.glob(os.path.join(glob.escape(self.archive_directory(db_path)), "*.db.gz")))
+
+    def verify(self, path: str, db_path: str = None) -> dict:
+        """Распаковать и проверить копию и копии архивов; число строк основных таблиц"""
+        return {
+            'counts': self._verify_file(path),
+            'archives': {os.path.basename(copy): self._verify_file(copy) for copy in self.archive_copies(db_path)},
+        }
+
+    @staticmethod
+    def _write(unpacked: str, target_path: str):
+        # Запись через Backup API в сам файл базы: WAL и служебные файлы остаются согласованными
+        source = sqlite3.connect(unpacked)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def restore(self, path: str, db_path: str = None) -> dict:
+        """Заменить базу проверенной копией (бот должен быть остановлен)
+
+        Текущая база сначала сохраняется отдельной копией. Архивы восстанавливаются,
+        только если их нет или они повреждены: целый архив не старше своей копии.
+        Строки, которые после снятия копии базы переехали в архив, окажутся в обоих
+        местах до следующего переноса (python retention.py) - он удалит их из базы.
+        """
+        db_path = db_path or db.db_path
+        unpacked = self._unpack(path)
+        try:
+            counts = _check(unpacked)
+            previous = self.create(db_path, with_archives=False)['path'] if os.path.exists(db_path) else None
+            self._write(unpacked, db_path)
+        finally:
+            os.remove(unpacked)
+
+        archives = []
+        for copy in self.archive_copies(db_path):
+            target_path = os.path.join(ARCHIVE_DIR, os.path.basename(copy)[:-len(".gz")])
+            if os.path.exists(target_path):
+                try:
+                    _check(target_path)
+                    continue
+                except BackupError:
+                    # Backup API не пишет поверх файла, который не читается как база
+                    os.replace(target_path, target_path + ".corrupt")
+                    logger.warning(f"Архив {target_path} повреждён (сохранён как .corrupt), восстанавливается из копии")
+            unpacked = self._unpack(copy)
+            try:
+                _check(unpacked)
+                os.makedirs(ARCHIVE_DIR, exist_ok=True)
+                self._write(unpacked, target_path)
+            finally:
+                os.remove(unpacked)
+            archives.append(target_path)
+        return {'counts': counts, 'previous': previous, 'archives': archives}
+
+    def stats(self) -> dict:
+        return {
+            'last_success_timestamp': self.last_success,
+            'last_duration_seconds': round(self.last_duration, 1),
+            'last_size_bytes': self.last_size,
+            'failures': self.failures,
+        }
+
+
+backups = BackupService()
+
+
+def setup_backups(scheduler):
+    """Ежедневная резервная копия (BACKUP_CRON, по умолчанию 04:00 - после переноса истории в архив)"""
+    if backups.keep <= 0:
+        return
+
+    async def job(scheduled_at):
+        await backups.run()
+
+    scheduler.add_job("backup", BACKUP_CRON, job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Резервные копии базы")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--list", action="store_true", help="показать копии")
+    action.add_argument("--verify", metavar="FILE", help="распаковать и проверить копию")
+    action.add_argument("--restore", metavar="FILE", help="восстановить базу из копии (бот должен быть остановлен)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.list:
+            for path in backups.list() + backups.archive_copies():
+                print(f"{path}  {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        elif args.verify:
+            result = backups.verify(args.verify)
+            print("OK: " + ", ".join(f"{table} {count}" for table, count in result['counts'].items()))
+            for name, counts in result['archives'].items():
+                print(f"OK {name}: " + ", ".join(f"{table} {count}" for table, count in counts.items()))
+        elif args.restore:
+            result = backups.restore(args.restore)
+            print("Восстановлено: " + ", ".join(f"{table} {count}" for table, count in result['counts'].items()))
+            for path in result['archives']:
+                print(f"Восстановлен архив: {path}")
+            if result['previous']:
+                print(f"Прежняя база сохранена: {result['previous']}")
+        else:
+            result = backups.create()
+            print(f"{result['path']}  {result['size'] / 1024 / 1024:.1f} MB за {result['duration']:.1f} с")
+    except BackupError as e:
+        raise SystemExit(f"Ошибка: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Бенчмарки: синтетические данные (datagen), замеры (run), сравнение результатов (compare)"""
@@ -0,0 +1,58 @@
+"""Сравнение двух файлов результатов benchmarks.run
+
+Пример:
+    python -m benchmarks.compare base.json new.json --threshold 1.25
+
+Сравниваются медианы сценариев, общих для обоих файлов. Код выхода 1, если
+хотя бы один сценарий стал медленнее в threshold раз и больше чем на --min-ms.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base: dict, new: dict, threshold: float, min_ms: float):
+    """Строки (размер, сценарий, было, стало, отношение, регрессия)"""
+    rows = []
+    for scale, new_scale in new["scales"].items():
+        base_scale = base["scales"].get(scale)
+        if base_scale is None:
+            continue
+        for name, result in new_scale["cases"].items():
+            before = base_scale["cases"].get(name)
+            if not before or "median_ms" not in before or "median_ms" not in result:
+                continue
+            old_ms, new_ms = before["median_ms"], result["median_ms"]
+            ratio = new_ms / old_ms if old_ms else float("inf")
+            regression = ratio >= threshold and new_ms - old_ms >= min_ms
+            rows.append((scale, name, old_ms, new_ms, ratio, regression))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.25, help="во сколько раз медленнее считать регрессией")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="не считать регрессией разницу меньше, мс")
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f"База: {base.get('commit') or '?'}  Новый: {new.get('commit') or '?'}")
+    rows = compare(base, new, args.threshold, args.min_ms)
+    for scale, name, old_ms, new_ms, ratio, regression in rows:
+        mark = "  <-- регрессия" if regression else ""
+        print(f"{scale:8} {name:45} {old_ms:10.2f} -> {new_ms:10.2f} ms  x{ratio:.2f}{mark}")
+
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"Сценариев: {len(rows)}, регрессий: {regressions}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Генерация синтетической базы академии заданного размера
+
+Пример:
+    python -m benchmarks.datagen bench.db --scale medium
+
+Схема создаётся самим ботом (db.init_db), данные пишутся пачками через sqlite3.
+Расписание, посещаемость и оплаты похожи на настоящие: три занятия группы в неделю,
+каждое десятое - игра, около 85% присутствующих, оплата за каждый месяц,
+последние две недели оплат ещё у тренеров.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+from datetime import datetime, time, timedelta
+
+from config import TIMEZONE, get_current_time
+from database import db
+
+SCALES = {
+    # ~100 детей, ~15 тыс. отметок посещаемости
+    "small": {
+        "branches": 2, "trainers_per_branch": 2, "groups_per_trainer": 2,
+        "children_per_group": 12, "years": 1,
+    },
+    # ~900 детей, ~280 тыс. отметок
+    "medium": {
+        "branches": 5, "trainers_per_branch": 4, "groups_per_trainer": 3,
+        "children_per_group": 15, "years": 2,
+    },
+    # ~4300 детей, ~2 млн отметок
+    "large": {
+        "branches": 10, "trainers_per_branch": 6, "groups_per_trainer": 4,
+        "children_per_group": 18, "years": 3,
+    },
+}
+
+# Дни занятий группы (пн, ср, пт) и время начала
+TRAINING_WEEKDAYS = (0, 2, 4)
+SESSION_HOURS = (9, 11, 15, 17, 19)
+SESSION_LENGTH = timedelta(minutes=90)
+GAME_SHARE = 0.1
+PRESENT_SHARE = 0.85
+# Доля детей, у которых в академии есть брат или сестра
+SIBLING_SHARE = 0.2
+AMOUNTS = (300000, 350000, 400000)
+# Оплаты моложе этого срока ещё не сданы в кассу
+WITH_TRAINER_DAYS = 14
+
+TELEGRAM_ID_BASE = 10_000_000
+BATCH_SIZE = 10000
+
+
+def _insert(conn, sql: str, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(sql, batch)
+
+
+def _fill(path: str, scale: dict, seed: int) -> dict:
+    rnd = random.Random(seed)
+    now = get_current_time().replace(microsecond=0)
+    first_day = (now - timedelta(days=365 * scale["years"])).date()
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA synchronous = OFF")
+        users = []
+
+        def add_user(role: str, first_name: str) -> int:
+            user_id = len(users) + 1
+            users.append((user_id, TELEGRAM_ID_BASE + user_id, f"user{user_id}", first_name, None, role, 1))
+            return user_id
+
+        main_trainer_user = add_user("main_trainer", "Главный тренер")
+        cashier_user = add_user("cashier", "Кассир")
+
+        branches, trainers, groups = [], [], []
+        for b in range(1, scale["branches"] + 1):
+            branches.append((b, f"Филиал {b}", f"ул. Спортивная, {b}"))
+            for _ in range(scale["trainers_per_branch"]):
+                trainer_id = len(trainers) + 1
+                user_id = add_user("trainer", f"Тренер {trainer_id}")
+                trainers.append((trainer_id, user_id, b, f"Тренер {trainer_id}"))
+                for _ in range(scale["groups_per_trainer"]):
+                    group_id = len(groups) + 1
+                    groups.append((group_id, f"Группа {group_id}", b, trainer_id))
+
+        children = []
+        parent_user = None
+        for group_id, _, _, _ in groups:
+            for _ in range(scale["children_per_group"]):
+                if parent_user is None or rnd.random() >= SIBLING_SHARE:
+                    parent_user = add_user("parent", "Родитель")
+                child_id = len(children) + 1
+                children.append((child_id, f"Ребёнок {child_id}", parent_user, group_id))
+
+        conn.executemany(
+            "INSERT INTO users (id, telegram_id, username, first_name, last_name, role, is_active) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            users
+        )
+        conn.executemany("INSERT INTO branches (id, name, address) VALUES (?, ?, ?)", branches)
+        conn.executemany("INSERT INTO trainers (id, user_id, branch_id, full_name) VALUES (?, ?, ?, ?)", trainers)
+        conn.executemany("INSERT INTO groups_table (id, name, branch_id, trainer_id) VALUES (?, ?, ?, ?)", groups)
+        conn.executemany("INSERT INTO children (id, full_name, parent_id, group_id) VALUES (?, ?, ?, ?)", children)
+
+        children_by_group = {}
+        for child_id, _, _, group_id in children:
+            children_by_group.setdefault(group_id, []).append(child_id)
+
+        sessions, attendance = [], []
+        for group_id, _, _, trainer_id in groups:
+            hour = rnd.choice(SESSION_HOURS)
+            day = first_day
+            while day <= now.date():
+                if day.weekday() in TRAINING_WEEKDAYS:
+                    start = TIMEZONE.localize(datetime.combine(day, time(hour)))
+                    if start <= now:
+                        session_id = len(sessions) + 1
+                        # Незакрытое занятие сегодня - как в реальный день
+                        finished = start + SESSION_LENGTH <= now
+                        sessions.append((
+                            session_id, "game" if rnd.random() < GAME_SHARE else "training", trainer_id, group_id,
+                            start.isoformat(), (start + SESSION_LENGTH).isoformat() if finished else None,
+                            41.3 + rnd.random() / 10, 69.2 + rnd.random() / 10,
+                            "completed" if finished else "started"
+                        ))
+                        for child_id in children_by_group[group_id]:
+                            attendance.append((
+                                session_id, child_id,
+                                "present" if rnd.random() < PRESENT_SHARE else "absent",
+                                (start + timedelta(minutes=5)).isoformat()
+                            ))
+                day += timedelta(days=1)
+
+        _insert(conn, """INSERT INTO sessions (id, type, trainer_id, group_id, start_time, end_time,
+                                               location_lat, location_lon, status)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", sessions)
+        _insert(conn, "INSERT INTO attendance (session_id, child_id, status, created_at) VALUES (?, ?, ?, ?)",
+                attendance)
+
+        trainer_of_group = {group_id: trainer_id for group_id, _, _, trainer_id in groups}
+        payments = []
+        month = first_day.replace(day=1)
+        while month <= now.date():
+            for child_id, _, _, group_id in children:
+                paid = TIMEZONE.localize(datetime.combine(month + timedelta(days=rnd.randrange(10)), time(
+                    rnd.choice(SESSION_HOURS), rnd.randrange(60))))
+                if paid > now:
+                    continue
+                with_trainer = now - paid < timedelta(days=WITH_TRAINER_DAYS)
+                cashbox = None if with_trainer else (paid + timedelta(days=rnd.randrange(1, 5))).isoformat()
+                payments.append((
+                    child_id, trainer_of_group[group_id], rnd.choice(AMOUNTS),
+                    "with_trainer" if with_trainer else "in_cashbox",
+                    paid.isoformat(), cashbox, month.strftime("%Y-%m")
+                ))
+            month = (month + timedelta(days=32)).replace(day=1)
+
+        _insert(conn, """INSERT INTO payments (child_id, trainer_id, amount, status, payment_date, cashbox_date, month_year)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)""", payments)
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        # Объекты, на которых бенчмарк вызывает методы и обработчики
+        busiest_trainer = trainers[0]
+        last_session = sessions[-1]
+        return {
+            "main_trainer_telegram_id": TELEGRAM_ID_BASE + main_trainer_user,
+            "cashier_telegram_id": TELEGRAM_ID_BASE + cashier_user,
+            "trainer_id": busiest_trainer[0],
+            "trainer_user_id": busiest_trainer[1],
+            "trainer_telegram_id": TELEGRAM_ID_BASE + busiest_trainer[1],
+            "branch_id": branches[0][0],
+            "group_id": groups[0][0],
+            "child_id": children[0][0],
+            "parent_id": children[0][2],
+            "parent_telegram_id": TELEGRAM_ID_BASE + children[0][2],
+            "session_id": last_session[0],
+            "session_trainer_id": last_session[2],
+            "next_telegram_id": TELEGRAM_ID_BASE + len(users) + 1,
+            "month": now.strftime("%Y-%m"),
+            "counts": {
+                "users": len(users), "branches": len(branches), "trainers": len(trainers),
+                "groups": len(groups), "children": len(children), "sessions": len(sessions),
+                "attendance": len(attendance), "payments": len(payments),
+            },
+        }
+    finally:
+        conn.close()
+
+
+async def generate(path: str, scale, seed: int = 1) -> dict:
+    """Новая база по пути path; scale - имя из SCALES или словарь параметров
+
+    Возвращает идентификаторы объектов для бенчмарков и число строк по таблицам.
+    """
+    if isinstance(scale, str):
+        scale = SCALES[scale]
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    previous, db.db_path = db.db_path, path
+    try:
+        await db.init_db()
+    finally:
+        db.db_path = previous
+    return await asyncio.to_thread(_fill, path, scale, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетической базы академии")
+    parser.add_argument("path", help="файл базы (будет перезаписан)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    fixture = asyncio.run(generate(args.path, args.scale, args.seed))
+    print(", ".join(f"{table}: {count}" for table, count in fixture["counts"].items()))
+
+
+if __name__ == "__main__":
+    main()
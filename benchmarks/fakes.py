@@ -0,0 +1,72 @@
+"""Заменители объектов Telegram для вызова обработчиков без сети
+
+Обработчик получает callback с сообщением, которое запоминает отправленный текст
+вместо запроса к Bot API. Состояние FSM - настоящее, в памяти.
+"""
+from types import SimpleNamespace
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+BOT_ID = 42
+
+
+class FakeMessage:
+    def __init__(self, chat_id: int, user):
+        self.message_id = 1
+        self.chat = SimpleNamespace(id=chat_id, type="private")
+        self.from_user = user
+        self.text = None
+        self.sent = []
+
+    def _record(self, text):
+        self.sent.append(text or "")
+        return self
+
+    async def edit_text(self, text, *args, **kwargs):
+        return self._record(text)
+
+    async def answer(self, text=None, *args, **kwargs):
+        return self._record(text)
+
+    async def answer_document(self, document, *args, caption=None, **kwargs):
+        return self._record(caption)
+
+    async def delete(self, *args, **kwargs):
+        return True
+
+
+class FakeCallback:
+    def __init__(self, telegram_id: int, data: str = ""):
+        self.id = "0"
+        self.data = data
+        self.from_user = SimpleNamespace(id=telegram_id, is_bot=False, first_name="Bench", last_name=None,
+                                         username="bench")
+        self.message = FakeMessage(telegram_id, self.from_user)
+
+    async def answer(self, *args, **kwargs):
+        return True
+
+    @property
+    def output(self) -> str:
+        """Последний текст, который обработчик показал пользователю"""
+        return self.message.sent[-1] if self.message.sent else ""
+
+
+class FakeBot:
+    id = BOT_ID
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, *args, **kwargs):
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent), chat=SimpleNamespace(id=chat_id))
+
+
+_storage = MemoryStorage()
+
+
+def make_state(telegram_id: int) -> FSMContext:
+    return FSMContext(storage=_storage, key=StorageKey(bot_id=BOT_ID, chat_id=telegram_id, user_id=telegram_id))
@@ -0,0 +1,407 @@
+"""Замер методов Database и отчётов на синтетических базах нескольких размеров
+
+Пример:
+    python -m benchmarks.run --scales small,medium --repeat 5 --output bench.json
+    python -m benchmarks.compare old.json bench.json
+
+Для каждого размера генерируется новая база (benchmarks.datagen), затем каждый
+сценарий выполняется один раз «холодным» (first_ms) и repeat раз подряд
+(min/median/p95/mean). Отчёты вызываются настоящими обработчиками с заменителями
+объектов Telegram (benchmarks.fakes). Сценарии идут в порядке: чтение, отчёты,
+запись - изменения данных почти не влияют на следующие замеры.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cashier_handlers
+import handlers
+import reports
+import reports_handlers
+from analytics import analytics
+from audit import audit
+from benchmarks.datagen import SCALES, generate
+from benchmarks.fakes import FakeBot, FakeCallback, make_state
+from daily_reports import DailyReportService
+from database import db
+from slow_queries import slow_queries
+
+# (группа, имя, функция(fixture) -> результат)
+CASES = []
+
+
+def case(group: str, name: str = None):
+    def decorator(func):
+        CASES.append((group, name or func.__name__, func))
+        return func
+    return decorator
+
+
+def _size(result) -> int:
+    """Объём результата: число строк или длина текста"""
+    if result is None:
+        return 0
+    if isinstance(result, (str, list, tuple, dict)):
+        return len(result)
+    return 1
+
+
+# ЧТЕНИЕ
+
+@case("db")
+async def get_user_by_telegram_id(fx):
+    return await db.get_user_by_telegram_id(fx["trainer_telegram_id"])
+
+
+@case("db")
+async def get_user_role(fx):
+    return await db.get_user_role(fx["main_trainer_telegram_id"])
+
+
+@case("db")
+async def get_all_branches(fx):
+    return await db.get_all_branches()
+
+
+@case("db")
+async def get_trainer_by_user_id(fx):
+    return await db.get_trainer_by_user_id(fx["trainer_user_id"])
+
+
+@case("db")
+async def get_all_trainers(fx):
+    return await db.get_all_trainers()
+
+
+@case("db")
+async def get_groups_by_trainer(fx):
+    return await db.get_groups_by_trainer(fx["trainer_id"])
+
+
+@case("db")
+async def get_group_by_id(fx):
+    return await db.get_group_by_id(fx["group_id"])
+
+
+@case("db")
+async def get_children_by_group(fx):
+    return await db.get_children_by_group(fx["group_id"])
+
+
+@case("db")
+async def get_children_by_parent(fx):
+    return await db.get_children_by_parent(fx["parent_id"])
+
+
+@case("db")
+async def get_active_session(fx):
+    return await db.get_active_session(fx["session_trainer_id"])
+
+
+@case("db")
+async def get_attendance_by_session(fx):
+    return await db.get_attendance_by_session(fx["session_id"])
+
+
+@case("db")
+async def get_payments_with_trainer(fx):
+    return await db.get_payments_with_trainer(fx["trainer_id"])
+
+
+@case("db")
+async def get_all_payments_with_trainer(fx):
+    return await db.get_all_payments_with_trainer()
+
+
+@case("db")
+async def get_cashbox_batch(fx):
+    return await db.get_cashbox_batch(fx["batch_id"])
+
+
+# ОТЧЁТЫ И СВОДКИ
+
+async def _callback_handler(handler, telegram_id: int, with_state: bool = False, **kwargs):
+    callback = FakeCallback(telegram_id)
+    if with_state:
+        kwargs["state"] = make_state(telegram_id)
+    await handler(callback, **kwargs)
+    return callback.output
+
+
+@case("report")
+async def report_week(fx):
+    return await _callback_handler(reports_handlers.report_week, fx["main_trainer_telegram_id"], with_state=True)
+
+
+@case("report")
+async def report_month(fx):
+    return await _callback_handler(reports_handlers.report_month, fx["main_trainer_telegram_id"], with_state=True)
+
+
+@case("report")
+async def report_finance(fx):
+    return await _callback_handler(reports_handlers.report_finance, fx["main_trainer_telegram_id"])
+
+
+@case("report")
+async def report_analytics(fx):
+    return await _callback_handler(reports_handlers.report_analytics, fx["main_trainer_telegram_id"])
+
+
+@case("report")
+async def prepare_branch_month(fx):
+    return await reports.prepare_branch_month(fx["month"])
+
+
+@case("report")
+async def prepare_trainer_month(fx):
+    return await reports.prepare_trainer_month(fx["trainer_id"], fx["month"])
+
+
+@case("report")
+async def send_daily_report(fx):
+    bot = FakeBot()
+    await DailyReportService(bot).send_daily_report()
+    return bot.sent
+
+
+@case("dashboard")
+async def main_trainer_statistics(fx):
+    return await _callback_handler(handlers.main_trainer_statistics, fx["main_trainer_telegram_id"])
+
+
+@case("dashboard")
+async def main_trainer_finance(fx):
+    return await _callback_handler(handlers.main_trainer_finance, fx["main_trainer_telegram_id"])
+
+
+@case("dashboard")
+async def trainer_statistics(fx):
+    return await _callback_handler(handlers.trainer_statistics, fx["trainer_telegram_id"])
+
+
+@case("dashboard")
+async def pending_payments(fx):
+    return await _callback_handler(cashier_handlers.pending_payments_handler, fx["cashier_telegram_id"])
+
+
+@case("dashboard")
+async def financial_report(fx):
+    return await _callback_handler(cashier_handlers.financial_report_handler, fx["cashier_telegram_id"])
+
+
+# ЗАПИСЬ
+
+def _next_telegram_id(fx) -> int:
+    fx["next_telegram_id"] += 1
+    return fx["next_telegram_id"]
+
+
+@case("db")
+async def create_user(fx):
+    return await db.create_user(_next_telegram_id(fx), "bench", "Bench", None, "parent")
+
+
+@case("db")
+async def create_branch(fx):
+    return await db.create_branch("Филиал (бенчмарк)", "ул. Тестовая")
+
+
+@case("db")
+async def create_trainer(fx):
+    return await db.create_trainer(fx["trainer_user_id"], fx["branch_id"], "Тренер (бенчмарк)")
+
+
+@case("db")
+async def create_group(fx):
+    return await db.create_group("Группа (бенчмарк)", fx["branch_id"], fx["trainer_id"])
+
+
+@case("db")
+async def create_child(fx):
+    return await db.create_child("Ребёнок (бенчмарк)", fx["parent_id"], fx["group_id"])
+
+
+@case("db")
+async def create_session(fx):
+    return await db.create_session("training", fx["trainer_id"], fx["group_id"], 41.3, 69.2)
+
+
+@case("db")
+async def end_session(fx):
+    return await db.end_session(fx["session_id"])
+
+
+@case("db")
+async def mark_attendance(fx):
+    return await db.mark_attendance(fx["session_id"], fx["child_id"], "present")
+
+
+@case("db")
+async def create_payment(fx):
+    fx["payment_seq"] = fx.get("payment_seq", 0) + 1
+    return await db.create_payment(fx["child_id"], fx["trainer_id"], 350000, fx["month"],
+                                   idempotency_key=f"bench-{fx['payment_seq']}")
+
+
+@case("db")
+async def create_payment_repeat(fx):
+    """Повторное нажатие: ключ уже есть в базе"""
+    return await db.create_payment(fx["child_id"], fx["trainer_id"], 350000, fx["month"],
+                                   idempotency_key="bench-1")
+
+
+@case("db")
+async def create_cashbox_batch(fx):
+    return await db.create_cashbox_batch(fx["trainer_id"], fx["trainer_payments"])
+
+
+@case("db")
+async def confirm_cashbox_batch(fx):
+    """Полная сдача в кассу: новая оплата, пакет, подтверждение"""
+    await create_payment(fx)
+    payments = await db.get_payments_with_trainer(fx["trainer_id"])
+    batch_id = await db.create_cashbox_batch(fx["trainer_id"], payments)
+    return await db.confirm_cashbox_batch(batch_id)
+
+
+@case("db")
+async def add_log(fx):
+    return await db.add_log(fx["trainer_user_id"], "bench", "Запись журнала (бенчмарк)")
+
+
+# ЗАПУСК
+
+def _summary(first: float, timings: list, size: int) -> dict:
+    ordered = sorted(timings)
+    return {
+        "first_ms": round(first * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "runs": len(ordered),
+        "result_size": size,
+    }
+
+
+async def _timed(func, fx):
+    start = time.perf_counter()
+    result = await func(fx)
+    return time.perf_counter() - start, result
+
+
+async def run_scale(name: str, path: str, repeat: int, seed: int, only=None) -> dict:
+    started = time.perf_counter()
+    fx = await generate(path, name, seed)
+    generated = time.perf_counter() - started
+
+    previous, db.db_path = db.db_path, path
+    analytics._reset()
+    try:
+        # Общие объекты сценариев, которые сами по себе не замеряются
+        fx["trainer_payments"] = await db.get_payments_with_trainer(fx["trainer_id"])
+        fx["batch_id"] = await db.create_cashbox_batch(fx["trainer_id"], fx["trainer_payments"])
+
+        cases = {}
+        for group, case_name, func in CASES:
+            key = f"{group}.{case_name}"
+            if only and not any(pattern in key for pattern in only):
+                continue
+            try:
+                first, result = await _timed(func, fx)
+                timings = [(await _timed(func, fx))[0] for _ in range(repeat)]
+            except Exception as e:
+                cases[key] = {"error": f"{type(e).__name__}: {e}"}
+                print(f"  {key}: ошибка {e}", file=sys.stderr)
+                continue
+            cases[key] = _summary(first, timings or [first], _size(result))
+            print(f"  {key}: median {cases[key]['median_ms']} ms (first {cases[key]['first_ms']} ms)",
+                  file=sys.stderr)
+    finally:
+        # Журнал действий (add_log) дописывается в базу этого размера
+        await audit.close()
+        # Соединения отчётов к этой базе: временный каталог удаляется
+        await db.close()
+        db.db_path = previous
+
+    return {
+        "params": SCALES[name],
+        "counts": fx["counts"],
+        "generate_s": round(generated, 2),
+        "db_size_bytes": os.path.getsize(path),
+        "cases": cases,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(scales, repeat: int, seed: int, data_dir: str, only=None) -> dict:
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+        "scales": {},
+    }
+    for name in scales:
+        print(f"Размер {name}", file=sys.stderr)
+        path = os.path.join(data_dir, f"bench_{name}.db")
+        results["scales"][name] = await run_scale(name, path, repeat, seed, only)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер запросов и отчётов на синтетических данных")
+    parser.add_argument("--scales", default="small,medium", help=f"через запятую из: {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого сценария после первого")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", help="только сценарии, в имени которых есть одна из подстрок (через запятую)")
+    parser.add_argument("--output", default="bench_results.json", help="файл результатов JSON")
+    parser.add_argument("--data-dir", help="каталог для баз (по умолчанию временный, удаляется)")
+    parser.add_argument("--slow-log", default="", help="вести журнал медленных запросов в этот файл")
+    args = parser.parse_args()
+
+    scales = [name.strip() for name in args.scales.split(",") if name.strip()]
+    unknown = [name for name in scales if name not in SCALES]
+    if unknown:
+        parser.error(f"неизвестный размер: {', '.join(unknown)}")
+    only = [pattern.strip() for pattern in args.only.split(",")] if args.only else None
+
+    slow_queries.path = args.slow_log
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bench_")
+    os.makedirs(data_dir, exist_ok=True)
+    try:
+        results = asyncio.run(run(scales, args.repeat, args.seed, data_dir, only))
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Результаты: {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
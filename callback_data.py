@@ -0,0 +1,113 @@
+from callback_dispatch import CallbackAction
+
+# Все callback-кнопки бота: полное имя действия, короткий код и аргументы.
+# Коды должны быть уникальными и не меняться: они хранятся в уже отправленных сообщениях.
+
+# Общие
+BACK_TO_MENU = CallbackAction("back_to_menu", "m")
+
+# Регистрация
+ROLE = CallbackAction("role", "r", role=str)
+BACK_TO_REGISTRATION = CallbackAction("back_to_registration", "rb")
+
+# Тренер: занятия и перекличка
+START_TRAINING = CallbackAction("start_training", "st")
+START_GAME = CallbackAction("start_game", "sg")
+SELECT_GROUP = CallbackAction("select_group", "sgr", group_id=int)
+ATTENDANCE = CallbackAction("attendance", "sa")
+PRESENT = CallbackAction("present", "p", session_id=int, child_id=int)
+ABSENT = CallbackAction("absent", "a", session_id=int, child_id=int)
+FINISH_ATTENDANCE = CallbackAction("finish_attendance", "sf")
+END_SESSION = CallbackAction("end_session", "se")
+TRAINER_STATS = CallbackAction("trainer_stats", "ts")
+
+# Тренер: оплаты
+PAYMENT = CallbackAction("payment", "y")
+PAYMENT_CHILD = CallbackAction("payment_child", "yc", child_id=int)
+AMOUNT = CallbackAction("amount", "ya", amount=int)
+CUSTOM_AMOUNT = CallbackAction("custom_amount", "yca")
+MONTH = CallbackAction("month", "ym", month_year=str)
+CONFIRM_PAYMENT = CallbackAction("confirm_payment", "yok")
+TO_CASHBOX = CallbackAction("to_cashbox", "yk")
+CONFIRM_CASHBOX = CallbackAction("confirm_cashbox", "ykc", batch_id=int)
+
+# Главный тренер: разделы
+MT_STATISTICS = CallbackAction("mt_statistics", "ms")
+MT_FINANCE = CallbackAction("mt_finance", "mf")
+MT_BRANCHES = CallbackAction("mt_branches", "mb")
+MT_TRAINERS = CallbackAction("mt_trainers", "mtr")
+MT_GROUPS = CallbackAction("mt_groups", "mg")
+MT_REPORTS = CallbackAction("mt_reports", "mr")
+
+# Главный тренер: филиалы
+ADD_BRANCH = CallbackAction("add_branch", "ba")
+BRANCH_INFO = CallbackAction("branch_info", "bi", branch_id=int)
+EDIT_BRANCH = CallbackAction("edit_branch", "be", branch_id=int)
+EDIT_BRANCH_ADDRESS_ONLY = CallbackAction("edit_branch_address_only", "bea")
+DELETE_BRANCH = CallbackAction("delete_branch", "bd", branch_id=int)
+CONFIRM_DELETE_BRANCH = CallbackAction("confirm_delete_branch", "bdc", branch_id=int)
+
+# Главный тренер: тренеры
+ADD_TRAINER = CallbackAction("add_trainer", "tra")
+SELECT_BRANCH = CallbackAction("select_branch", "trb", branch_id=int)
+TRAINER_INFO = CallbackAction("trainer_info", "ti", trainer_id=int)
+EDIT_TRAINER = CallbackAction("edit_trainer", "tre", trainer_id=int)
+EDIT_TRAINER_BRANCH_ONLY = CallbackAction("edit_trainer_branch_only", "treb")
+SELECT_EDIT_BRANCH = CallbackAction("select_edit_branch", "trs", branch_id=int)
+DELETE_TRAINER = CallbackAction("delete_trainer", "trd", trainer_id=int)
+CONFIRM_DELETE_TRAINER = CallbackAction("confirm_delete_trainer", "trdc", trainer_id=int)
+
+# Главный тренер: группы
+ADD_GROUP = CallbackAction("add_group", "ga")
+SELECT_GROUP_BRANCH = CallbackAction("select_group_branch", "gb", branch_id=int)
+SELECT_GROUP_TRAINER = CallbackAction("select_group_trainer", "gt", trainer_id=int)
+VIEW_GROUPS = CallbackAction("view_groups", "gv")
+GROUP_INFO = CallbackAction("group_info", "gi", group_id=int)
+EDIT_GROUP = CallbackAction("edit_group", "ge", group_id=int)
+EDIT_GROUP_TRAINER_ONLY = CallbackAction("edit_group_trainer_only", "get")
+SELECT_EDIT_GROUP_TRAINER = CallbackAction("select_edit_group_trainer", "ges", trainer_id=int)
+DELETE_GROUP = CallbackAction("delete_group", "gd", group_id=int)
+CONFIRM_DELETE_GROUP = CallbackAction("confirm_delete_group", "gdc", group_id=int)
+
+# Главный тренер: дети
+ADD_CHILD = CallbackAction("add_child", "ca")
+SELECT_CHILD_PARENT = CallbackAction("select_child_parent", "cp", parent_id=int)
+SELECT_CHILD_GROUP = CallbackAction("select_child_group", "cg", group_id=int)
+VIEW_CHILDREN = CallbackAction("view_children", "cv")
+CHILD_INFO = CallbackAction("child_info", "ci", child_id=int)
+CHILD_INFO_READONLY = CallbackAction("child_info_readonly", "cr", child_id=int)
+
+# Отчёты
+REPORT_TODAY = CallbackAction("report_today", "rt")
+REPORT_WEEK = CallbackAction("report_week", "rw")
+REPORT_MONTH = CallbackAction("report_month", "rm")
+REPORT_PAGE_PREV = CallbackAction("report_page_prev", "rpp")
+REPORT_PAGE_NEXT = CallbackAction("report_page_next", "rpn")
+REPORT_RANGE = CallbackAction("report_range", "rr")
+RFILTER_MENU = CallbackAction("rfilter_menu", "rfm")
+RFLIST = CallbackAction("rflist", "rfl", kind=str)
+RFILTER_ALL = CallbackAction("rfilter_all", "rfa")
+RFILTER = CallbackAction("rfilter", "rf", kind=str, object_id=int)
+REPORT_ANALYTICS = CallbackAction("report_analytics", "ra")
+REPORT_FINANCE = CallbackAction("report_finance", "rfin")
+REPORT_EXPORT = CallbackAction("report_export", "rx")
+EXPORT = CallbackAction("export", "x", kind=str)
+REPORT_PDF = CallbackAction("report_pdf", "rpdf")
+PDF_MONTH = CallbackAction("pdf_month", "pdm", month=str)
+PDF_BRANCHES = CallbackAction("pdf_branches", "pdb", month=str)
+PDF_TRAINER = CallbackAction("pdf_trainer", "pdt", trainer_id=int, month=str)
+
+# Кассир
+ACCEPT_MONEY = CallbackAction("accept_money", "ka")
+ACCEPT_FROM_TRAINER = CallbackAction("accept_from_trainer", "kt", trainer_id=int)
+CONFIRM_MONEY_RECEIPT = CallbackAction("confirm_money_receipt", "kc", batch_id=int)
+PENDING_PAYMENTS = CallbackAction("pending_payments", "kp")
+FINANCIAL_REPORT = CallbackAction("financial_report", "kf")
+
+# Родитель
+MY_CHILDREN = CallbackAction("my_children", "pc")
+ADD_CHILD_REQUEST = CallbackAction("add_child_request", "pca")
+ATTENDANCE_HISTORY = CallbackAction("attendance_history", "pah")
+CHILD_ATTENDANCE = CallbackAction("child_attendance", "pa", child_id=int)
+PAYMENT_HISTORY = CallbackAction("payment_history", "pph")
+CHILD_PAYMENTS = CallbackAction("child_payments", "pp", child_id=int)
@@ -0,0 +1,336 @@
+import logging
+from functools import lru_cache
+
+from aiogram import BaseMiddleware, Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters import StateFilter
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+# Разделитель частей в callback_data: "p_c_9l" -> действие с кодом "p", аргументы c и 9l
+SEPARATOR = "_"
+# Ограничение Telegram на длину callback_data, байт
+MAX_CALLBACK_DATA_LENGTH = 64
+# Сколько разобранных callback_data держать в кэше
+PARSE_CACHE_SIZE = 4096
+
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def to_base36(value: int) -> str:
+    if value < 0:
+        return "-" + to_base36(-value)
+    digits = ""
+    while True:
+        value, digit = divmod(value, 36)
+        digits = _BASE36[digit] + digits
+        if value == 0:
+            return digits
+
+
+def from_base36(value: str) -> int:
+    return int(value, 36)
+
+
+class CallbackAction:
+    """Фабрика callback_data одного действия
+
+    Кнопки собираются через pack(), а не вручную f-строками:
+    PRESENT = CallbackAction("present", "p", session_id=int, child_id=int)
+    PRESENT.pack(12, 345) -> "p_c_9l"
+
+    В callback_data попадает короткий код действия и числа в base36, поэтому данные
+    гарантированно укладываются в 64 байта. Полное имя action остаётся для обработчиков
+    и для разбора кнопок старого формата ("present_12_345") в уже отправленных сообщениях.
+    """
+
+    def __init__(self, action: str, code: str, **params):
+        if SEPARATOR in code:
+            raise ValueError(f"Код действия не может содержать '{SEPARATOR}': {code}")
+        for name, kind in params.items():
+            if kind not in (int, str):
+                raise TypeError(f"Неподдерживаемый тип аргумента {name}: {kind}")
+        self.action = action
+        self.code = code
+        self.params = params
+
+    def pack(self, *args, **kwargs) -> str:
+        values = dict(zip(self.params, args))
+        values.update(kwargs)
+        if values.keys() != self.params.keys():
+            raise TypeError(f"{self.action}: ожидаются аргументы {', '.join(self.params)}")
+
+        parts = [self.code]
+        for name, kind in self.params.items():
+            value = values[name]
+            if kind is int:
+                parts.append(to_base36(int(value)))
+            else:
+                value = str(value)
+                if not value or SEPARATOR in value:
+                    raise ValueError(f"{self.action}: недопустимое значение {name}={value!r}")
+                parts.append(value)
+
+        data = SEPARATOR.join(parts)
+        if len(data.encode()) > MAX_CALLBACK_DATA_LENGTH:
+            raise ValueError(f"{self.action}: callback_data длиннее {MAX_CALLBACK_DATA_LENGTH} байт")
+        return data
+
+    def converters(self, legacy: bool = False) -> dict:
+        """Преобразователи аргументов: base36 для нового формата, десятичные - для старого"""
+        return {
+            name: (int if legacy else from_base36) if kind is int else str
+            for name, kind in self.params.items()
+        }
+
+    def __repr__(self):
+        return f"CallbackAction({self.action!r}, {self.code!r})"
+
+
+def _state_names(states):
+    """Множество имён состояний маршрута (None - любое состояние)"""
+    if not states:
+        return None
+    names = set()
+    for state in states:
+        if isinstance(state, State):
+            names.add(state.state)
+        elif isinstance(state, type) and issubclass(state, StatesGroup):
+            names.update(state.__all_states_names__)
+        elif state == "*":
+            return None
+        else:
+            names.add(state)
+    return names
+
+
+class CallbackRoute:
+    """Маршрут: префикс callback_data, именованные аргументы с преобразователями и фильтр состояния"""
+
+    def __init__(self, action: str, prefix: str, handler, params: dict, states: tuple,
+                 answer_first: bool = False):
+        self.action = action
+        self.answer_first = answer_first
+        self.tokens = tuple(prefix.split(SEPARATOR))
+        self.handler = CallableObject(handler)
+        self.name = f"{handler.__module__}.{handler.__name__}"
+        self.params = params
+        self.states = states
+        self.state_names = _state_names(states)
+        self._state_filter = StateFilter(*states) if self.state_names is not None else None
+
+    @property
+    def arity(self) -> int:
+        return len(self.params)
+
+    def convert(self, raw_args):
+        """Строковые аргументы -> {имя: значение} или None, если не подходят по типу"""
+        try:
+            return {
+                name: converter(value)
+                for (name, converter), value in zip(self.params.items(), raw_args)
+            }
+        except (TypeError, ValueError):
+            return None
+
+    async def accepts_state(self, callback: CallbackQuery, raw_state) -> bool:
+        if self._state_filter is None:
+            return True
+        return await self._state_filter(callback, raw_state=raw_state)
+
+    def overlaps(self, other: "CallbackRoute") -> bool:
+        if self.state_names is None or other.state_names is None:
+            return True
+        return bool(self.state_names & other.state_names)
+
+    def __repr__(self):
+        return f"{SEPARATOR.join(self.tokens)}({', '.join(self.params)}) -> {self.name}"
+
+
+class _Node:
+    __slots__ = ("children", "routes")
+
+    def __init__(self):
+        self.children = {}
+        self.routes = []
+
+
+class CallbackParseMiddleware(BaseMiddleware):
+    """Разбирает callback_data один раз и кладёт маршрут и аргументы в data"""
+
+    def __init__(self, table: "CallbackTable"):
+        self.table = table
+
+    async def __call__(self, handler, event: CallbackQuery, data: dict):
+        route, kwargs = await self.table.resolve(event, data.get("raw_state"))
+        data["callback_route"] = route
+        data["callback_args"] = kwargs
+        return await handler(event, data)
+
+
+class AnswerFirstMiddleware(BaseMiddleware):
+    """Ответ на нажатие до запуска обработчика (маршруты с answer_first=True)
+
+    Клиент Telegram показывает «часики» на кнопке, пока бот не ответит на callback.
+    Для обработчиков, которые сначала пишут в базу и правят сообщение, а уведомления
+    отправляют в фоне, ответ сразу убирает это ожидание. Такие обработчики
+    не должны сами вызывать callback.answer().
+    """
+
+    async def __call__(self, handler, event: CallbackQuery, data: dict):
+        route = data.get("callback_route")
+        if route is not None and route.answer_first:
+            try:
+                await event.answer()
+            except Exception as e:
+                # Устаревший запрос - не повод не выполнять действие
+                logger.warning(f"Не удалось ответить на callback {event.data}: {e}")
+        return await handler(event, data)
+
+
+class CallbackTable:
+    """Таблица обработчиков callback-кнопок
+
+    callback_data разбивается по '_' на части и ищется в префиксном дереве
+    действий за один проход. Из всех действий, являющихся префиксом, выбирается
+    самое длинное, у которого совпадает число аргументов, их типы и текущее
+    состояние FSM. Поэтому результат не зависит от порядка регистрации и роутеров
+    ('child_info_5' и 'child_info_readonly_5', 'edit_branch_5' и 'edit_branch_address_only').
+
+    Каждое действие регистрируется дважды: по короткому коду (CallbackAction.pack)
+    и по полному имени - для кнопок, отправленных до перехода на коды.
+    Разбор строки не зависит от состояния и кэшируется, на каждое обновление
+    остаётся только проверка состояния FSM.
+
+    Обработчик получает аргументы по именам, а также action (полное имя действия)
+    и всё, что aiogram обычно передаёт обработчикам (state, bot, ...).
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self.routes = []
+        self._codes = {}
+        self._parse = lru_cache(maxsize=PARSE_CACHE_SIZE)(self._parse_data)
+        self.router = Router(name="callbacks")
+        self.router.callback_query.outer_middleware(CallbackParseMiddleware(self))
+        self.router.callback_query.middleware(AnswerFirstMiddleware())
+        self.router.callback_query.register(self._dispatch, self._has_route)
+
+    def route(self, action: CallbackAction, state=None, answer_first: bool = False):
+        """Декоратор регистрации обработчика
+
+        @callbacks.route(PRESENT)
+        @callbacks.route(SELECT_GROUP, state=SessionStates.waiting_for_location)
+        @callbacks.route(END_SESSION, answer_first=True)  # ответ на нажатие до обработчика
+        """
+        if state is None:
+            states = ()
+        elif isinstance(state, (tuple, list)):
+            states = tuple(state)
+        else:
+            states = (state,)
+
+        registered = self._codes.setdefault(action.code, action)
+        if registered is not action:
+            raise ValueError(f"Код '{action.code}' уже занят: {registered!r} и {action!r}")
+
+        def decorator(handler):
+            for prefix, legacy in ((action.code, False), (action.action, True)):
+                self._add(CallbackRoute(action.action, prefix, handler, action.converters(legacy=legacy),
+                                        states, answer_first))
+            return handler
+        return decorator
+
+    def _add(self, route: CallbackRoute):
+        node = self._root
+        for token in route.tokens:
+            node = node.children.setdefault(token, _Node())
+
+        for existing in node.routes:
+            if existing.arity == route.arity and existing.overlaps(route):
+                raise ValueError(f"Повторный обработчик callback: {route!r} и {existing!r}")
+
+        node.routes.append(route)
+        self.routes.append(route)
+        self._parse.cache_clear()
+
+    def _parse_data(self, data: str) -> tuple:
+        """Все маршруты, подходящие под callback_data по числу и типам аргументов,
+        от самого длинного префикса к короткому: ((маршрут, аргументы), ...)"""
+        tokens = data.split(SEPARATOR)
+        nodes = []
+        node = self._root
+        for depth, token in enumerate(tokens):
+            node = node.children.get(token)
+            if node is None:
+                break
+            if node.routes:
+                nodes.append((depth + 1, node))
+
+        matches = []
+        for depth, node in reversed(nodes):
+            raw_args = tokens[depth:]
+            for route in node.routes:
+                if route.arity != len(raw_args):
+                    continue
+                kwargs = route.convert(raw_args)
+                if kwargs is not None:
+                    matches.append((route, kwargs))
+        return tuple(matches)
+
+    def cache_stats(self) -> dict:
+        """Кэш разбора callback_data: hits, misses, currsize, maxsize"""
+        return self._parse.cache_info()._asdict()
+
+    def action_of(self, data: str):
+        """Имя действия для callback_data без учёта состояния FSM (None - неизвестная кнопка)"""
+        matches = self._parse(data) if data else ()
+        return matches[0][0].action if matches else None
+
+    async def resolve(self, callback: CallbackQuery, raw_state=None):
+        """callback_data -> (маршрут, аргументы) или (None, None)"""
+        if not callback.data:
+            return None, None
+
+        for route, kwargs in self._parse(callback.data):
+            if await route.accepts_state(callback, raw_state):
+                # Копия: обработчик не должен менять закэшированные аргументы
+                return route, dict(kwargs)
+        return None, None
+
+    @staticmethod
+    async def _has_route(callback: CallbackQuery, callback_route=None) -> bool:
+        return callback_route is not None
+
+    @staticmethod
+    async def _dispatch(callback: CallbackQuery, callback_route: CallbackRoute, callback_args: dict, **data):
+        data.pop("handler", None)
+        return await callback_route.handler.call(
+            callback, action=callback_route.action, **callback_args, **data
+        )
+
+    def check(self):
+        """Поиск неоднозначных маршрутов: одна и та же callback_data подходит под два действия
+
+        Неоднозначность разрешается в пользу более длинного действия, но обычно
+        это означает ошибку в именах кнопок.
+        """
+        problems = []
+        for short in self.routes:
+            for long in self.routes:
+                extra = len(long.tokens) - len(short.tokens)
+                if extra <= 0 or long.tokens[:len(short.tokens)] != short.tokens:
+                    continue
+                if short.arity != extra + long.arity or not short.overlaps(long):
+                    continue
+                # Части длинного действия должны подходить по типам как аргументы короткого
+                sample = list(long.tokens[len(short.tokens):]) + ["1"] * long.arity
+                if short.convert(sample) is None:
+                    continue
+                problems.append(f"{long!r} перекрывает {short!r}")
+        return problems
+
+
+callbacks = CallbackTable()
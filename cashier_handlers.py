@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
@@ -7,6 +7,13 @@ from aiogram.types import InlineKeyboardButton
 import aiosqlite
 from datetime import date, timedelta
 
+from audit import audit
+from background import background
+from callback_data import (
+    ACCEPT_FROM_TRAINER, ACCEPT_MONEY, BACK_TO_MENU, CONFIRM_MONEY_RECEIPT, FINANCIAL_REPORT,
+    PENDING_PAYMENTS
+)
+from callback_dispatch import callbacks
 from config import ROLE_CASHIER
 from database import db
 from keyboards import get_back_button, get_cashier_menu
@@ -15,7 +22,7 @@ from states import CashierStates
 cashier_router = Router()
 
 
-@cashier_router.callback_query(F.data == "accept_money")
+@callbacks.route(ACCEPT_MONEY)
 async def accept_money_handler(callback: CallbackQuery):
     """Принять деньги от тренеров"""
     # Получаем всех тренеров, у которых есть деньги
@@ -46,10 +53,10 @@ async def accept_money_handler(callback: CallbackQuery):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"💰 {trainer_name} ({summary['total_amount']:.0f} сум)",
-                callback_data=f"accept_from_trainer_{summary['trainer_id']}"
+                callback_data=ACCEPT_FROM_TRAINER.pack(summary['trainer_id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         "💰 Выберите тренера для принятия денег:",
@@ -57,10 +64,9 @@ async def accept_money_handler(callback: CallbackQuery):
     )
 
 
-@cashier_router.callback_query(F.data.startswith("accept_from_trainer_"))
-async def accept_from_trainer(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(ACCEPT_FROM_TRAINER)
+async def accept_from_trainer(callback: CallbackQuery, trainer_id: int, state: FSMContext):
     """Подтверждение принятия денег от тренера"""
-    trainer_id = int(callback.data.split("_")[3])
 
     # Получаем платежи этого тренера
     payments = await db.get_payments_with_trainer(trainer_id)
@@ -74,13 +80,16 @@ async def accept_from_trainer(callback: CallbackQuery, state: FSMContext):
     total_amount = sum(payment['amount'] for payment in payments)
     trainer_name = payments[0]['trainer_name']
 
+    cashier = await db.get_user_by_telegram_id(callback.from_user.id)
+    batch_id = await db.create_cashbox_batch(trainer_id, payments, created_by=cashier['id'] if cashier else None)
+
     await state.update_data(trainer_id=trainer_id, total_amount=total_amount, trainer_name=trainer_name)
     await state.set_state(CashierStates.confirming_payment_receipt)
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="✅ Подтвердить получение", callback_data="confirm_money_receipt"),
-        InlineKeyboardButton(text="❌ Отмена", callback_data="back_to_menu")
+        InlineKeyboardButton(text="✅ Подтвердить получение", callback_data=CONFIRM_MONEY_RECEIPT.pack(batch_id)),
+        InlineKeyboardButton(text="❌ Отмена", callback_data=BACK_TO_MENU.pack())
     )
 
     await callback.message.edit_text(
@@ -92,32 +101,53 @@ async def accept_from_trainer(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@cashier_router.callback_query(F.data == "confirm_money_receipt", StateFilter(CashierStates.confirming_payment_receipt))
-async def confirm_money_receipt(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(CONFIRM_MONEY_RECEIPT, state=CashierStates.confirming_payment_receipt, answer_first=True)
+async def confirm_money_receipt(callback: CallbackQuery, batch_id: int, state: FSMContext):
     """Подтверждение получения денег"""
-    data = await state.get_data()
-
-    # Переводим все платежи тренера в кассу
-    await db.move_payments_to_cashbox(data['trainer_id'])
+    # Сумма и тренер берутся из пакета кнопки, а не из FSM: кассир мог открыть
+    # подтверждение другого тренера, не закрыв это сообщение
+    batch = await db.get_cashbox_batch(batch_id)
+    if not batch:
+        await callback.message.edit_text("❌ Пакет платежей не найден.", reply_markup=get_back_button())
+        return
 
-    # Отправляем уведомление главному тренеру
-    from notifications import NotificationService
-    from handlers import notification_service
-    if notification_service:
-        await notification_service.notify_money_to_cashbox(data['trainer_id'], data['total_amount'])
+    cashier = await db.get_user_by_telegram_id(callback.from_user.id)
+    result = await db.confirm_cashbox_batch(batch_id, confirmed_by=cashier['id'] if cashier else None)
+    if result == 'confirmed':
+        audit.record(
+            "cashbox_received",
+            f"Batch: {batch_id}, Trainer: {batch['trainer_id']}, Amount: {batch['total_amount']:.0f}, "
+            f"Payments: {batch['payment_count']}",
+            telegram_id=callback.from_user.id
+        )
+    if result == 'stale':
+        await callback.message.edit_text(
+            "⚠️ Список платежей тренера изменился. Выберите тренера ещё раз.",
+            reply_markup=get_back_button()
+        )
+        await state.clear()
+        return
 
     await callback.message.edit_text(
         f"✅ Деньги приняты!\n\n"
-        f"👨‍🏫 Тренер: {data['trainer_name']}\n"
-        f"💰 Сумма: {data['total_amount']:.0f} сум\n"
+        f"👨‍🏫 Тренер: {batch['trainer_name']}\n"
+        f"💰 Сумма: {batch['total_amount']:.0f} сум\n"
         f"📅 Время: {date.today().strftime('%d.%m.%Y')}",
         reply_markup=get_cashier_menu()
     )
 
     await state.clear()
 
+    # Уведомление главному тренеру - в фоне
+    from handlers import notification_service
+    if notification_service and result == 'confirmed':
+        background.spawn(
+            notification_service.notify_money_to_cashbox(batch['trainer_id'], batch['total_amount']),
+            name=f"notify_money_to_cashbox:{batch['trainer_id']}"
+        )
+
 
-@cashier_router.callback_query(F.data == "pending_payments")
+@callbacks.route(PENDING_PAYMENTS)
 async def pending_payments_handler(callback: CallbackQuery):
     """Список всех непереданных сумм"""
     trainers_with_money = await db.get_all_payments_with_trainer()
@@ -159,14 +189,14 @@ async def pending_payments_handler(callback: CallbackQuery):
     await callback.message.edit_text(text, reply_markup=get_back_button())
 
 
-@cashier_router.callback_query(F.data == "financial_report")
+@callbacks.route(FINANCIAL_REPORT)
 async def financial_report_handler(callback: CallbackQuery):
     """Финансовый отчёт кассира"""
     today = date.today()
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         # Деньги в кассе всего
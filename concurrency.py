@@ -0,0 +1,122 @@
+import asyncio
+import logging
+
+from aiogram import BaseMiddleware
+
+from config import CONCURRENCY_STATS_INTERVAL, MAX_CONCURRENT_UPDATES
+
+logger = logging.getLogger(__name__)
+
+
+class ChatConcurrencyMiddleware(BaseMiddleware):
+    """Параллельная обработка обновлений разных чатов с сохранением порядка внутри чата
+
+    aiogram запускает каждое обновление отдельной задачей, поэтому без ограничений
+    два нажатия одного пользователя могут обрабатываться одновременно и в любом порядке.
+    Здесь обновления одного чата ждут друг друга на замке чата, а общее число
+    одновременно работающих обработчиков ограничено семафором. Замок берётся первым:
+    чат, ожидающий свободного места, не задерживает другие чаты сверх лимита.
+    Состояние FSM перечитывается под замком, поэтому обновление, стоявшее в очереди
+    за сменой состояния, маршрутизируется уже по новому состоянию.
+    """
+
+    def __init__(self, limit: int = MAX_CONCURRENT_UPDATES):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        # chat_id -> [замок, число обновлений чата в работе и в очереди]
+        self._chats = {}
+        self.running = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.processed = 0
+        self._report_task = None
+        # Установлено, когда нет ни работающих, ни ожидающих обновлений
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @staticmethod
+    def _chat_key(data: dict):
+        chat = data.get("event_chat")
+        if chat is not None:
+            return chat.id
+        user = data.get("event_from_user")
+        return user.id if user is not None else None
+
+    async def __call__(self, handler, event, data: dict):
+        key = self._chat_key(data)
+        entry = self._chats.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.waiting += 1
+        self._idle.clear()
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        started = False
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    self.waiting -= 1
+                    self.running += 1
+                    started = True
+                    try:
+                        # FSMContextMiddleware прочитал состояние до замка чата; предыдущее
+                        # обновление чата могло его изменить - фильтры должны видеть новое
+                        state = data.get("state")
+                        if state is not None:
+                            data["raw_state"] = await state.get_state()
+                        return await handler(event, data)
+                    finally:
+                        self.running -= 1
+                        self.processed += 1
+        finally:
+            if not started:
+                # Отмена во время ожидания
+                self.waiting -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chats[key]
+            if not self._chats:
+                self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Ожидание завершения всех начатых обновлений; False - не успели за timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=max(timeout, 0))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> dict:
+        """Текущее состояние очереди обновлений"""
+        return {
+            'running': self.running,
+            'waiting': self.waiting,
+            'peak_waiting': self.peak_waiting,
+            'chats': len(self._chats),
+            'max_chat_queue': max((entry[1] for entry in self._chats.values()), default=0),
+            'processed': self.processed,
+            'limit': self.limit,
+        }
+
+    async def _report_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            stats = self.stats()
+            if stats['running'] or stats['waiting'] or stats['peak_waiting']:
+                logger.info(
+                    f"Обновления: в работе {stats['running']}/{stats['limit']}, в очереди {stats['waiting']} "
+                    f"(пик {stats['peak_waiting']}), чатов {stats['chats']}, "
+                    f"самая длинная очередь чата {stats['max_chat_queue']}, обработано {stats['processed']}"
+                )
+            # Пик считается за период между записями
+            self.peak_waiting = self.waiting
+
+    async def start_reporting(self):
+        if CONCURRENCY_STATS_INTERVAL > 0 and self._report_task is None:
+            self._report_task = asyncio.create_task(self._report_loop(CONCURRENCY_STATS_INTERVAL))
+
+    async def stop_reporting(self):
+        if self._report_task is not None:
+            self._report_task.cancel()
+            self._report_task = None
+
+
+update_concurrency = ChatConcurrencyMiddleware()
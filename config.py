@@ -9,6 +9,8 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 # Database configuration
 DB_PATH = os.getenv("DB_PATH", "football_academy.db")
+# Соединений только для чтения для отчётов, которые держатся открытыми (db.snapshot())
+REPORT_POOL_SIZE = int(os.getenv("REPORT_POOL_SIZE", "4"))
 
 # User roles
 ROLE_MAIN_TRAINER = "main_trainer"
@@ -21,6 +23,96 @@ ADMIN_USER_IDS = [238658021,349639816]
 # Timezone configuration
 TIMEZONE = pytz.timezone('Asia/Tashkent')  # UTC+5
 
+# Расписание ежедневного отчёта (cron: минута час день месяц день_недели, время по TIMEZONE)
+DAILY_REPORT_CRON = os.getenv("DAILY_REPORT_CRON", "0 21 * * *")
+
+# FSM-хранилище: период фоновой записи (сек) и время жизни брошенных состояний (часы)
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "1.0"))
+FSM_STATE_TTL_HOURS = float(os.getenv("FSM_STATE_TTL_HOURS", "72"))
+
+# Режим получения обновлений: "polling" или "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Публичный адрес (https://bot.example.com) - за ним reverse proxy на WEBAPP_HOST:WEBAPP_PORT
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "127.0.0.1")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+# Если задан - входящие обновления дописываются в этот файл (для replay_updates.py)
+WEBHOOK_RECORD_PATH = os.getenv("WEBHOOK_RECORD_PATH", "")
+
+# Число процессов-обработчиков; больше 1 - фронт раздаёт обновления воркерам по chat_id
+WORKERS = int(os.getenv("WORKERS", "1"))
+
+# Сколько обновлений обрабатывается одновременно (обновления одного чата - всегда по очереди)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "50"))
+# Период записи статистики очереди обновлений в лог, сек (0 - не писать)
+CONCURRENCY_STATS_INTERVAL = float(os.getenv("CONCURRENCY_STATS_INTERVAL", "60"))
+
+# Сколько при остановке ждать начатые обновления и рассылки, сек
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "25"))
+
+# Защита от повторных нажатий и флуда
+# Повтор той же кнопки тем же пользователем в течение окна (сек) отбрасывается
+THROTTLE_DUPLICATE_WINDOW = float(os.getenv("THROTTLE_DUPLICATE_WINDOW", "1.5"))
+# Ведро токенов на пользователя и действие: запас нажатий и пополнение в секунду
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", "5"))
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "1"))
+# Не больше FLOOD_LIMIT обновлений от пользователя за FLOOD_WINDOW секунд
+FLOOD_LIMIT = int(os.getenv("FLOOD_LIMIT", "30"))
+FLOOD_WINDOW = float(os.getenv("FLOOD_WINDOW", "10"))
+
+# Метрики Prometheus: http://METRICS_HOST:METRICS_PORT/metrics (0 - не запускать).
+# В многопроцессном режиме воркер i отдаёт свои метрики на METRICS_PORT + 1 + i
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Журнал медленных SQL-запросов с планами выполнения (0 - не вести)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "logs/slow_queries.log")
+SLOW_QUERY_MAX_BYTES = int(os.getenv("SLOW_QUERY_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_BACKUP_COUNT = int(os.getenv("SLOW_QUERY_BACKUP_COUNT", "5"))
+
+# Сторож цикла событий: пульс каждые WATCHDOG_INTERVAL сек, блокировка цикла дольше
+# WATCHDOG_STALL_MS пишется в лог со стеком и именем обработчика (0 - сторож выключен)
+WATCHDOG_STALL_MS = float(os.getenv("WATCHDOG_STALL_MS", "0"))
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL", "0.1"))
+
+# Хранение истории: занятия с посещаемостью старше HISTORY_RETENTION_DAYS и журнал действий
+# старше LOG_RETENTION_DAYS переносятся в архивы по годам ARCHIVE_DIR/<база>_<год>.db (0 - не переносить)
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "730"))
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "365"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+RETENTION_CRON = os.getenv("RETENTION_CRON", "30 3 * * *")
+# Строк за транзакцию переноса и страниц за шаг incremental_vacuum: писатели ждут не дольше одного шага
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "2000"))
+VACUUM_STEP_PAGES = int(os.getenv("VACUUM_STEP_PAGES", "500"))
+
+# Резервные копии базы: BACKUP_DIR/<база>_<дата-время>.db.gz, хранятся последние BACKUP_KEEP (0 - не делать).
+# Копия снимается по BACKUP_STEP_PAGES страниц с паузой BACKUP_STEP_PAUSE_MS между шагами
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_CRON = os.getenv("BACKUP_CRON", "0 4 * * *")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "14"))
+BACKUP_STEP_PAGES = int(os.getenv("BACKUP_STEP_PAGES", "1000"))
+BACKUP_STEP_PAUSE_MS = float(os.getenv("BACKUP_STEP_PAUSE_MS", "5"))
+
+# Журнал действий (таблица logs): запись пачкой по AUDIT_BATCH_SIZE записей или раз в AUDIT_FLUSH_MS;
+# если база недоступна, в памяти держится не больше AUDIT_MAX_PENDING записей
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_MS = float(os.getenv("AUDIT_FLUSH_MS", "500"))
+AUDIT_MAX_PENDING = int(os.getenv("AUDIT_MAX_PENDING", "10000"))
+
+# Логи: уровень и формат ("json" - запись JSON на строку, "text" - для чтения глазами)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Доля записей об обработанных обновлениях для частых обработчиков: "present=0.1,absent=0.1"
+# (ошибки пишутся всегда, обработчики не из списка - все)
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, rate in (item.split("=", 1) for item in os.getenv("LOG_SAMPLE_RATES", "present=0.1,absent=0.1").split(",")
+                       if "=" in item)
+}
+
 def get_current_time():
     """Получить текущее время в ташкентском часовом поясе"""
     return datetime.now(TIMEZONE)
@@ -1,20 +1,26 @@
-import asyncio
+import logging
 import aiosqlite
 from datetime import datetime, date
 from aiogram import Bot
+from config import DAILY_REPORT_CRON, get_current_time
 from database import db
 
+logger = logging.getLogger(__name__)
+
 
 class DailyReportService:
     def __init__(self, bot: Bot):
         self.bot = bot
 
-    async def send_daily_report(self):
-        """Отправка ежедневного отчёта в 21:00"""
+    async def send_daily_report(self, report_date: date = None):
+        """Отправка ежедневного отчёта (по умолчанию за текущий день в часовом поясе академии)"""
         try:
-            today = date.today().isoformat()
+            if report_date is None:
+                report_date = get_current_time().date()
+            today = report_date.isoformat()
 
-            async with aiosqlite.connect(db.db_path) as conn:
+            # Все числа отчёта - из одного снимка базы, писатели его не ждут
+            async with db.snapshot() as conn:
                 conn.row_factory = aiosqlite.Row
 
                 # Получаем все сессии за сегодня
@@ -65,8 +71,7 @@ class DailyReportService:
                     main_trainers = await cursor.fetchall()
 
             # Формируем отчёт
-            today_date = date.today()
-            report = f"📊 Ежедневный отчёт за {today_date.strftime('%d.%m.%Y')}\n\n"
+            report = f"📊 Ежедневный отчёт за {report_date.strftime('%d.%m.%Y')}\n\n"
 
             if sessions:
                 report += f"📅 Всего занятий: {len(sessions)}\n"
@@ -101,25 +106,19 @@ class DailyReportService:
                 try:
                     await self.bot.send_message(trainer['telegram_id'], report)
                 except Exception as e:
-                    print(f"Ошибка отправки ежедневного отчёта: {e}")
-
-        except Exception as e:
-            print(f"Ошибка в send_daily_report: {e}")
+                    logger.warning(f"Ошибка отправки ежедневного отчёта: {e}")
 
+        except Exception:
+            logger.exception("Ошибка в send_daily_report")
 
-# Функция для планировщика ежедневных отчётов
-async def schedule_daily_reports(bot: Bot):
-    """Планировщик ежедневных отчётов"""
-    import schedule
-    import time
 
+# Регистрация ежедневного отчёта в планировщике
+def setup_daily_reports(scheduler, bot: Bot):
+    """Добавляет ежедневный отчёт в планировщик (по умолчанию в 21:00 по Ташкенту)"""
     daily_report_service = DailyReportService(bot)
 
-    def job():
-        asyncio.create_task(daily_report_service.send_daily_report())
-
-    schedule.every().day.at("21:00").do(job)
+    async def job(scheduled_at: datetime):
+        # После перезапуска отчёт догоняется за тот день, когда он был пропущен
+        await daily_report_service.send_daily_report(scheduled_at.date())
 
-    while True:
-        schedule.run_pending()
-        await asyncio.sleep(60)  # Проверяем каждую минуту
\ No newline at end of file
+    scheduler.add_job("daily_report", DAILY_REPORT_CRON, job)
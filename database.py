@@ -1,20 +1,277 @@
 import aiosqlite
 import asyncio
+import contextvars
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import urllib.request
+from contextlib import asynccontextmanager
 from datetime import datetime
-from config import DB_PATH, get_current_time
+from aiosqlite.context import contextmanager
+from config import DB_PATH, REPORT_POOL_SIZE, get_current_time
+from metrics import db_query_errors, db_query_seconds
+from slow_queries import slow_queries
+
+# Длина текста запроса в метке метрики
+QUERY_LABEL_LENGTH = 80
+
+# Параметры executemany в журнале медленных запросов: пачка, план по ней не снимается
+_BATCH = object()
+
+# Открытый снимок для отчётов (db.snapshot()): вложенные вызовы читают его же
+_snapshot_var = contextvars.ContextVar("db_snapshot", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def statement_shape(sql: str) -> str:
+    """Вид запроса для метрик: без переносов строк и с одинаковым списком IN (?, ...) любой длины"""
+    return _PLACEHOLDER_LIST.sub("?, ...", _WHITESPACE.sub(" ", sql).strip())
+
+
+def query_label(shape: str) -> str:
+    """Метка запроса в метриках: начало текста и короткий хэш, чтобы длинные
+    запросы с одинаковым началом не сливались"""
+    if len(shape) <= QUERY_LABEL_LENGTH:
+        return shape
+    digest = hashlib.blake2s(shape.encode(), digest_size=4).hexdigest()
+    return f"{shape[:QUERY_LABEL_LENGTH]}... #{digest}"
+
+
+def _observe_query(conn: "Connection", sql: str, elapsed: float, parameters=None, rows: int = None,
+                   error: Exception = None):
+    shape = statement_shape(sql)
+    label = query_label(shape)
+    db_query_seconds.observe(elapsed, query=label)
+    if error is not None:
+        db_query_errors.inc(query=label, error=type(error).__name__)
+    slow_queries.observe(shape, label, elapsed, parameters, rows, conn.db_path, sql)
+
+
+class TimedCursor(aiosqlite.Cursor):
+    """Курсор, добавляющий к времени запроса время чтения результата
+
+    Запрос записывается в метрики при закрытии курсора (выход из async with)
+    или при закрытии соединения - для курсоров, которые не закрывают явно.
+    Число строк: прочитанные строки для SELECT, изменённые - для остальных.
+    """
+
+    def __init__(self, conn: "Connection", cursor: sqlite3.Cursor, sql: str, parameters, elapsed: float):
+        super().__init__(conn, cursor)
+        self._db = conn
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = elapsed
+        self._rows = 0
+        self._recorded = False
+
+    async def _timed(self, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    async def fetchone(self):
+        row = await self._timed(super().fetchone())
+        if row is not None:
+            self._rows += 1
+        return row
+
+    async def fetchmany(self, size: int = None):
+        rows = await self._timed(super().fetchmany(size))
+        self._rows += len(rows)
+        return rows
+
+    async def fetchall(self):
+        rows = await self._timed(super().fetchall())
+        self._rows += len(rows)
+        return rows
+
+    def record(self):
+        if not self._recorded:
+            self._recorded = True
+            rows = self._rows if self.description is not None else self.rowcount
+            _observe_query(self._db, self._sql, self._elapsed, self._parameters, rows)
+
+    async def close(self):
+        self.record()
+        # Соединения отчётов живут долго: закрытый курсор не должен оставаться в списке
+        self._db.forget_cursor(self)
+        await super().close()
+
+
+class Connection(aiosqlite.Connection):
+    """Соединение aiosqlite с замером времени каждого запроса (db.connect())"""
+
+    def __init__(self, connector, db_path: str, iter_chunk_size: int = 64):
+        super().__init__(connector, iter_chunk_size)
+        self.db_path = db_path
+        # Курсоры SELECT, результат которых ещё могут дочитывать
+        self._open_cursors = []
+
+    async def _timed(self, sql: str, parameters, fn, *args):
+        start = time.perf_counter()
+        try:
+            result = await self._execute(fn, *args)
+        except Exception as e:
+            _observe_query(self, sql, time.perf_counter() - start, parameters, error=e)
+            raise
+        return result, time.perf_counter() - start
+
+    @contextmanager
+    async def execute(self, sql: str, parameters=None) -> TimedCursor:
+        parameters = parameters or []
+        cursor, elapsed = await self._timed(sql, parameters, self._conn.execute, sql, parameters)
+        timed = TimedCursor(self, cursor, sql, parameters, elapsed)
+        if cursor.description is None:
+            # Не SELECT: читать нечего
+            timed.record()
+        else:
+            self._open_cursors.append(timed)
+        return timed
+
+    @contextmanager
+    async def executemany(self, sql: str, parameters) -> TimedCursor:
+        cursor, elapsed = await self._timed(sql, _BATCH, self._conn.executemany, sql, parameters)
+        timed = TimedCursor(self, cursor, sql, _BATCH, elapsed)
+        timed.record()
+        return timed
+
+    @contextmanager
+    async def execute_fetchall(self, sql: str, parameters=None):
+        parameters = parameters or []
+        rows, elapsed = await self._timed(sql, parameters, self._execute_fetchall, sql, parameters)
+        _observe_query(self, sql, elapsed, parameters, len(rows))
+        return rows
+
+    async def commit(self):
+        # Для WAL фиксация транзакции - отдельная заметная часть записи
+        _, elapsed = await self._timed("COMMIT", None, self._conn.commit)
+        _observe_query(self, "COMMIT", elapsed)
+
+    def forget_cursor(self, cursor: TimedCursor):
+        try:
+            self._open_cursors.remove(cursor)
+        except ValueError:
+            pass
+
+    def record_cursors(self):
+        """Записать в метрики курсоры, которые не закрыли явно"""
+        for cursor in self._open_cursors:
+            cursor.record()
+        self._open_cursors.clear()
+
+    async def close(self):
+        self.record_cursors()
+        await super().close()
 
 
 class Database:
     def __init__(self):
         self.db_path = DB_PATH
+        # Свободные соединения только для чтения для отчётов: путь базы -> список
+        self._readers = {}
+
+    def connect(self, db_path: str = None) -> Connection:
+        """Соединение с базой: async with db.connect() as conn"""
+        path = db_path or self.db_path
+        # uri=True: ATTACH архивов и соединения только для чтения через file:...?mode=ro;
+        # обычный путь без "file:" открывается как раньше
+        return Connection(lambda: sqlite3.connect(path, uri=True), path)
+
+    def read_only_uri(self, db_path: str = None) -> str:
+        """URI базы для соединения только для чтения: sqlite3.connect(uri, uri=True)"""
+        return "file:" + urllib.request.pathname2url(os.path.abspath(db_path or self.db_path)) + "?mode=ro"
+
+    # СОЕДИНЕНИЯ ДЛЯ ОТЧЁТОВ
+
+    async def _acquire_reader(self) -> Connection:
+        idle = self._readers.get(self.db_path)
+        if idle:
+            conn = idle.pop()
+            conn.row_factory = None
+            return conn
+        uri = self.read_only_uri()
+        # isolation_level=None: транзакцией чтения управляет snapshot()
+        conn = Connection(lambda: sqlite3.connect(uri, uri=True, isolation_level=None), self.db_path)
+        # Свободное соединение в пуле не должно задерживать выход из процесса
+        conn.daemon = True
+        await conn
+        await conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    async def _release_reader(self, conn: Connection, reusable: bool):
+        conn.record_cursors()
+        idle = self._readers.setdefault(conn.db_path, [])
+        if reusable and len(idle) < REPORT_POOL_SIZE:
+            idle.append(conn)
+        else:
+            await conn.close()
+
+    @asynccontextmanager
+    async def snapshot(self, prepare=None):
+        """Соединение для отчёта: async with db.snapshot() as conn
+
+        Соединение только для чтения (mode=ro и PRAGMA query_only) из пула, все запросы
+        внутри идут в одной транзакции чтения: числа отчёта берутся из одного состояния
+        базы, а в режиме WAL читатель не задерживает тренеров, отмечающих посещаемость.
+        Вложенный snapshot() (отчёт собирается из нескольких функций) использует уже
+        открытый снимок. prepare(conn) выполняется до начала транзакции (подключение
+        архивов); если он что-то подключил (вернул истину), соединение в пул не возвращается.
+        """
+        current = _snapshot_var.get()
+        if current:
+            yield current[0]
+            return
+
+        conn = await self._acquire_reader()
+        reusable = True
+        holder = [conn]
+        token = _snapshot_var.set(holder)
+        try:
+            if prepare is not None:
+                # Временные представления архивов пишутся во временную базу; основная остаётся mode=ro
+                await conn.execute("PRAGMA query_only = OFF")
+                # Если prepare упадёт, часть архивов может остаться подключённой
+                reusable = False
+                try:
+                    reusable = not await prepare(conn)
+                finally:
+                    await conn.execute("PRAGMA query_only = ON")
+            await conn.execute("BEGIN")
+            # Снимок фиксируется первым чтением
+            async with conn.execute("SELECT COUNT(*) FROM sqlite_master") as cursor:
+                await cursor.fetchone()
+            yield conn
+        finally:
+            # Задачи, скопировавшие контекст, не должны получить закрытый снимок
+            holder.clear()
+            _snapshot_var.reset(token)
+            try:
+                if conn.in_transaction:
+                    await conn.rollback()
+            except Exception:
+                reusable = False
+            await self._release_reader(conn, reusable)
 
     async def init_db(self):
         """Инициализация базы данных"""
+        async with self.connect() as conn:
+            # Место от удалённых строк возвращается по частям (retention.py). Действует только
+            # для новой базы; существующую переводит python retention.py --enable-incremental-vacuum
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # WAL: читатели не блокируют писателя - нужно, когда с базой работают несколько процессов.
+            # Режим сохраняется в самом файле базы
+            await conn.execute("PRAGMA journal_mode = WAL")
         await self.create_tables()
 
     async def create_tables(self):
         """Создание таблиц"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             # Включаем поддержку foreign keys
             await conn.execute("PRAGMA foreign_keys = ON")
 
@@ -111,10 +368,35 @@ class Database:
                     payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     cashbox_date TIMESTAMP,
                     month_year TEXT NOT NULL,
+                    idempotency_key TEXT,
                     FOREIGN KEY (child_id) REFERENCES children(id) ON DELETE CASCADE,
                     FOREIGN KEY (trainer_id) REFERENCES trainers(id) ON DELETE CASCADE
                 );
                 """,
+                # Сдача денег в кассу: ровно те платежи и та сумма, что были показаны на экране подтверждения
+                """
+                CREATE TABLE IF NOT EXISTS cashbox_batches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    trainer_id INTEGER NOT NULL,
+                    total_amount REAL NOT NULL,
+                    payment_count INTEGER NOT NULL,
+                    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'confirmed', 'stale')),
+                    created_by INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    confirmed_by INTEGER,
+                    confirmed_at TIMESTAMP,
+                    FOREIGN KEY (trainer_id) REFERENCES trainers(id) ON DELETE CASCADE
+                );
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS cashbox_batch_payments (
+                    batch_id INTEGER NOT NULL,
+                    payment_id INTEGER NOT NULL,
+                    PRIMARY KEY (batch_id, payment_id),
+                    FOREIGN KEY (batch_id) REFERENCES cashbox_batches(id) ON DELETE CASCADE,
+                    FOREIGN KEY (payment_id) REFERENCES payments(id) ON DELETE CASCADE
+                );
+                """,
                 """
                 CREATE TABLE IF NOT EXISTS logs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -124,21 +406,65 @@ class Database:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
                 );
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS scheduler_state (
+                    job_name TEXT PRIMARY KEY,
+                    last_run TIMESTAMP
+                );
+                """,
                 """
+                CREATE TABLE IF NOT EXISTS fsm_storage (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT,
+                    updated_at REAL NOT NULL
+                );
+                """,
+                # Индексы для отчётов за период: фильтр по времени и сортировка (start_time, id)
+                "CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON sessions(start_time, id)",
+                "CREATE INDEX IF NOT EXISTS idx_sessions_trainer_start ON sessions(trainer_id, start_time)",
+                "CREATE INDEX IF NOT EXISTS idx_sessions_group_start ON sessions(group_id, start_time)",
+                "CREATE INDEX IF NOT EXISTS idx_groups_branch ON groups_table(branch_id)",
+                "CREATE INDEX IF NOT EXISTS idx_children_group ON children(group_id)",
+                "CREATE INDEX IF NOT EXISTS idx_payments_date ON payments(payment_date)",
+                "CREATE INDEX IF NOT EXISTS idx_payments_trainer_date ON payments(trainer_id, payment_date)",
+                # Журнал действий: выборки за период и действия пользователя за период
+                "CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs(created_at)",
+                "CREATE INDEX IF NOT EXISTS idx_logs_user_created ON logs(user_id, created_at)"
             ]
 
             for query in queries:
                 await conn.execute(query)
 
+            await self._migrate(conn)
             await conn.commit()
 
+    async def _migrate(self, conn):
+        """Доработка таблиц, созданных прежними версиями бота"""
+        async with conn.execute("PRAGMA table_info(payments)") as cursor:
+            payment_columns = {row[1] for row in await cursor.fetchall()}
+        if 'idempotency_key' not in payment_columns:
+            await conn.execute("ALTER TABLE payments ADD COLUMN idempotency_key TEXT")
+
+        # У старых платежей ключа нет: NULL в уникальном индексе не конфликтуют
+        await conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_idempotency ON payments(idempotency_key)"
+        )
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_payments_trainer_status ON payments(trainer_id, status)"
+        )
+
     async def close(self):
-        """Закрытие соединения (для SQLite не требуется)"""
-        pass
+        """Закрытие соединений для отчётов (остальные соединения закрываются после каждого запроса)"""
+        readers, self._readers = self._readers, {}
+        for idle in readers.values():
+            for conn in idle:
+                await conn.close()
 
     # User methods
     async def create_user(self, telegram_id: int, username: str, first_name: str, last_name: str, role: str):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             cursor = await conn.execute(
                 "INSERT INTO users (telegram_id, username, first_name, last_name, role) VALUES (?, ?, ?, ?, ?)",
                 (telegram_id, username, first_name, last_name, role)
@@ -147,7 +473,7 @@ class Database:
             return cursor.lastrowid
 
     async def get_user_by_telegram_id(self, telegram_id: int):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     "SELECT * FROM users WHERE telegram_id = ? AND is_active = TRUE",
@@ -156,7 +482,7 @@ class Database:
                 return await cursor.fetchone()
 
     async def get_user_role(self, telegram_id: int):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             async with conn.execute(
                     "SELECT role FROM users WHERE telegram_id = ? AND is_active = TRUE",
                     (telegram_id,)
@@ -166,7 +492,7 @@ class Database:
 
     # Branch methods
     async def create_branch(self, name: str, address: str = None):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             cursor = await conn.execute(
                 "INSERT INTO branches (name, address) VALUES (?, ?)",
                 (name, address)
@@ -175,14 +501,14 @@ class Database:
             return cursor.lastrowid
 
     async def get_all_branches(self):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute("SELECT * FROM branches ORDER BY name") as cursor:
                 return await cursor.fetchall()
 
     # Trainer methods
     async def create_trainer(self, user_id: int, branch_id: int, full_name: str):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             cursor = await conn.execute(
                 "INSERT INTO trainers (user_id, branch_id, full_name) VALUES (?, ?, ?)",
                 (user_id, branch_id, full_name)
@@ -191,7 +517,7 @@ class Database:
             return cursor.lastrowid
 
     async def get_trainer_by_user_id(self, user_id: int):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     """SELECT t.*, b.name as branch_name 
@@ -203,7 +529,7 @@ class Database:
                 return await cursor.fetchone()
 
     async def get_all_trainers(self):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     """SELECT t.*, u.telegram_id, b.name as branch_name 
@@ -216,7 +542,7 @@ class Database:
 
     # Group methods
     async def create_group(self, name: str, branch_id: int, trainer_id: int):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             cursor = await conn.execute(
                 "INSERT INTO groups_table (name, branch_id, trainer_id) VALUES (?, ?, ?)",
                 (name, branch_id, trainer_id)
@@ -225,7 +551,7 @@ class Database:
             return cursor.lastrowid
 
     async def get_groups_by_trainer(self, trainer_id: int):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     "SELECT * FROM groups_table WHERE trainer_id = ? ORDER BY name",
@@ -234,7 +560,7 @@ class Database:
                 return await cursor.fetchall()
 
     async def get_group_by_id(self, group_id: int):
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     """SELECT g.*, b.name as branch_name, t.full_name as trainer_name 
@@ -249,7 +575,7 @@ class Database:
     # Дополнительные методы для детей и сессий
     async def create_child(self, full_name: str, parent_id: int, group_id: int):
         """Создание ребёнка"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             cursor = await conn.execute(
                 "INSERT INTO children (full_name, parent_id, group_id) VALUES (?, ?, ?)",
                 (full_name, parent_id, group_id)
@@ -259,7 +585,7 @@ class Database:
 
     async def get_children_by_group(self, group_id: int):
         """Получить детей группы"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                 """SELECT c.*, u.telegram_id as parent_telegram_id, u.first_name as parent_name 
@@ -272,7 +598,7 @@ class Database:
 
     async def get_children_by_parent(self, parent_id: int):
         """Получить детей родителя"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                 """SELECT c.*, g.name as group_name, b.name as branch_name 
@@ -286,7 +612,7 @@ class Database:
 
     async def create_session(self, session_type: str, trainer_id: int, group_id: int, location_lat: float, location_lon: float):
         """Создание сессии (тренировки/игры)"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             current_time = get_current_time()
             cursor = await conn.execute(
                 """INSERT INTO sessions (type, trainer_id, group_id, start_time, location_lat, location_lon) 
@@ -298,7 +624,7 @@ class Database:
 
     async def end_session(self, session_id: int):
         """Завершение сессии"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             current_time = get_current_time()
             await conn.execute(
                 "UPDATE sessions SET end_time = ?, status = 'completed' WHERE id = ?",
@@ -308,7 +634,7 @@ class Database:
 
     async def get_active_session(self, trainer_id: int):
         """Получить активную сессию тренера"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                 "SELECT * FROM sessions WHERE trainer_id = ? AND status = 'started' ORDER BY start_time DESC LIMIT 1",
@@ -318,7 +644,7 @@ class Database:
 
     async def mark_attendance(self, session_id: int, child_id: int, status: str):
         """Отметка посещаемости"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             await conn.execute(
                 """INSERT OR REPLACE INTO attendance (session_id, child_id, status) 
                    VALUES (?, ?, ?)""",
@@ -328,7 +654,7 @@ class Database:
 
     async def get_attendance_by_session(self, session_id: int):
         """Получить посещаемость по сессии"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                 """SELECT a.*, c.full_name as child_name, c.parent_id 
@@ -339,20 +665,40 @@ class Database:
             ) as cursor:
                 return await cursor.fetchall()
 
-    async def create_payment(self, child_id: int, trainer_id: int, amount: float, month_year: str):
-        """Создание платежа"""
-        async with aiosqlite.connect(self.db_path) as conn:
+    async def create_payment(self, child_id: int, trainer_id: int, amount: float, month_year: str,
+                             idempotency_key: str = None):
+        """Создание платежа
+
+        С idempotency_key повторный вызов (двойное нажатие, повтор после сбоя)
+        не создаёт вторую запись. Возвращает (id платежа, создан ли он этим вызовом).
+        Пропускается только совпадение ключа: остальные ошибки (NOT NULL, CHECK) не глотаются.
+        """
+        sql = """INSERT INTO payments (child_id, trainer_id, amount, month_year, payment_date, idempotency_key)
+                 VALUES (?, ?, ?, ?, ?, ?)"""
+        if idempotency_key is not None:
+            sql += " ON CONFLICT(idempotency_key) DO NOTHING"
+
+        async with self.connect() as conn:
             current_time = get_current_time()
             cursor = await conn.execute(
-                "INSERT INTO payments (child_id, trainer_id, amount, month_year, payment_date) VALUES (?, ?, ?, ?, ?)",
-                (child_id, trainer_id, amount, month_year, current_time.isoformat())
+                sql, (child_id, trainer_id, amount, month_year, current_time.isoformat(), idempotency_key)
             )
             await conn.commit()
-            return cursor.lastrowid
+            if cursor.rowcount:
+                return cursor.lastrowid, True
+
+            async with conn.execute(
+                "SELECT id FROM payments WHERE idempotency_key = ?", (idempotency_key,)
+            ) as existing:
+                row = await existing.fetchone()
+            if row is None:
+                # Платёж с этим ключом удалили между вставкой и поиском
+                raise LookupError(f"Платёж с ключом {idempotency_key} не найден")
+            return row[0], False
 
     async def get_payments_with_trainer(self, trainer_id: int):
         """Получить платежи у тренера"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                 """SELECT p.*, c.full_name as child_name, t.full_name as trainer_name 
@@ -365,19 +711,93 @@ class Database:
             ) as cursor:
                 return await cursor.fetchall()
 
-    async def move_payments_to_cashbox(self, trainer_id: int):
-        """Перевод платежей в кассу"""
-        async with aiosqlite.connect(self.db_path) as conn:
+    async def create_cashbox_batch(self, trainer_id: int, payments, created_by: int = None):
+        """Фиксация платежей, показанных на экране сдачи в кассу
+
+        Подтверждение переводит в кассу ровно эти платежи, даже если тренер
+        успел принять новые оплаты между показом суммы и нажатием кнопки.
+        """
+        async with self.connect() as conn:
             current_time = get_current_time()
-            await conn.execute(
-                "UPDATE payments SET status = 'in_cashbox', cashbox_date = ? WHERE trainer_id = ? AND status = 'with_trainer'",
-                (current_time.isoformat(), trainer_id)
+            cursor = await conn.execute(
+                """INSERT INTO cashbox_batches (trainer_id, total_amount, payment_count, created_by, created_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (trainer_id, sum(payment['amount'] for payment in payments), len(payments),
+                 created_by, current_time.isoformat())
+            )
+            batch_id = cursor.lastrowid
+            await conn.executemany(
+                "INSERT INTO cashbox_batch_payments (batch_id, payment_id) VALUES (?, ?)",
+                [(batch_id, payment['id']) for payment in payments]
             )
             await conn.commit()
+            return batch_id
+
+    async def get_cashbox_batch(self, batch_id: int):
+        """Получить пакет сдачи в кассу"""
+        async with self.connect() as conn:
+            conn.row_factory = aiosqlite.Row
+            async with conn.execute(
+                """SELECT b.*, t.full_name as trainer_name
+                   FROM cashbox_batches b
+                   JOIN trainers t ON b.trainer_id = t.id
+                   WHERE b.id = ?""",
+                (batch_id,)
+            ) as cursor:
+                return await cursor.fetchone()
+
+    async def confirm_cashbox_batch(self, batch_id: int, confirmed_by: int = None) -> str:
+        """Перевод платежей пакета в кассу одной транзакцией
+
+        Возвращает:
+        - 'confirmed' - платежи переведены этим вызовом;
+        - 'duplicate' - пакет уже подтверждён раньше (повторное нажатие);
+        - 'stale' - часть платежей уже сдана другим пакетом, ничего не изменено;
+        - 'missing' - пакета нет.
+        """
+        async with self.connect() as conn:
+            current_time = get_current_time().isoformat()
+            # Сразу берём блокировку записи: два подтверждения не пройдут проверку одновременно
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                async with conn.execute(
+                    "SELECT status, payment_count FROM cashbox_batches WHERE id = ?", (batch_id,)
+                ) as cursor:
+                    batch = await cursor.fetchone()
+                if batch is None:
+                    await conn.rollback()
+                    return 'missing'
+                if batch[0] != 'pending':
+                    await conn.rollback()
+                    return 'duplicate' if batch[0] == 'confirmed' else 'stale'
+
+                cursor = await conn.execute(
+                    """UPDATE payments SET status = 'in_cashbox', cashbox_date = ?
+                       WHERE id IN (SELECT payment_id FROM cashbox_batch_payments WHERE batch_id = ?)
+                         AND status = 'with_trainer'""",
+                    (current_time, batch_id)
+                )
+                if cursor.rowcount != batch[1]:
+                    await conn.rollback()
+                    await conn.execute(
+                        "UPDATE cashbox_batches SET status = 'stale' WHERE id = ? AND status = 'pending'", (batch_id,)
+                    )
+                    await conn.commit()
+                    return 'stale'
+
+                await conn.execute(
+                    "UPDATE cashbox_batches SET status = 'confirmed', confirmed_by = ?, confirmed_at = ? WHERE id = ?",
+                    (confirmed_by, current_time, batch_id)
+                )
+                await conn.commit()
+                return 'confirmed'
+            except Exception:
+                await conn.rollback()
+                raise
 
     async def get_all_payments_with_trainer(self):
         """Получить все платежи у тренеров"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                 """SELECT p.*, c.full_name as child_name, t.full_name as trainer_name 
@@ -390,14 +810,10 @@ class Database:
                 return await cursor.fetchall()
 
     async def add_log(self, user_id: int, action: str, details: str = None):
-        """Добавление лога"""
-        async with aiosqlite.connect(self.db_path) as conn:
-            current_time = get_current_time()
-            await conn.execute(
-                "INSERT INTO logs (user_id, action, details, created_at) VALUES (?, ?, ?, ?)",
-                (user_id, action, details, current_time.isoformat())
-            )
-            await conn.commit()
+        """Добавление лога: запись уходит в базу пачкой (audit.AuditWriter)"""
+        # Импорт здесь: audit импортирует этот модуль
+        from audit import audit
+        audit.record(action, details, user_id=user_id)
 
 
 # Global database instance
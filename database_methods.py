@@ -6,7 +6,7 @@ from database import db
 
 async def create_child(self, full_name: str, parent_id: int, group_id: int):
     """Создание ребёнка"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         cursor = await conn.execute(
             "INSERT INTO children (full_name, parent_id, group_id) VALUES (?, ?, ?)",
             (full_name, parent_id, group_id)
@@ -16,7 +16,7 @@ async def create_child(self, full_name: str, parent_id: int, group_id: int):
 
 async def get_children_by_group(self, group_id: int):
     """Получить детей группы"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
             """SELECT c.*, u.telegram_id as parent_telegram_id, u.first_name as parent_name 
@@ -29,7 +29,7 @@ async def get_children_by_group(self, group_id: int):
 
 async def get_children_by_parent(self, parent_id: int):
     """Получить детей родителя"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
             """SELECT c.*, g.name as group_name, b.name as branch_name 
@@ -43,7 +43,7 @@ async def get_children_by_parent(self, parent_id: int):
 
 async def create_session(self, session_type: str, trainer_id: int, group_id: int, location_lat: float, location_lon: float):
     """Создание сессии (тренировки/игры)"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         cursor = await conn.execute(
             """INSERT INTO sessions (type, trainer_id, group_id, start_time, location_lat, location_lon) 
                VALUES (?, ?, ?, ?, ?, ?)""",
@@ -54,7 +54,7 @@ async def create_session(self, session_type: str, trainer_id: int, group_id: int
 
 async def end_session(self, session_id: int):
     """Завершение сессии"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         await conn.execute(
             "UPDATE sessions SET end_time = ?, status = 'completed' WHERE id = ?",
             (datetime.now().isoformat(), session_id)
@@ -63,7 +63,7 @@ async def end_session(self, session_id: int):
 
 async def get_active_session(self, trainer_id: int):
     """Получить активную сессию тренера"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
             "SELECT * FROM sessions WHERE trainer_id = ? AND status = 'started' ORDER BY start_time DESC LIMIT 1",
@@ -73,7 +73,7 @@ async def get_active_session(self, trainer_id: int):
 
 async def mark_attendance(self, session_id: int, child_id: int, status: str):
     """Отметка посещаемости"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         await conn.execute(
             """INSERT OR REPLACE INTO attendance (session_id, child_id, status) 
                VALUES (?, ?, ?)""",
@@ -83,7 +83,7 @@ async def mark_attendance(self, session_id: int, child_id: int, status: str):
 
 async def get_attendance_by_session(self, session_id: int):
     """Получить посещаемость по сессии"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
             """SELECT a.*, c.full_name as child_name, c.parent_id 
@@ -96,7 +96,7 @@ async def get_attendance_by_session(self, session_id: int):
 
 async def create_payment(self, child_id: int, trainer_id: int, amount: float, month_year: str):
     """Создание платежа"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         cursor = await conn.execute(
             "INSERT INTO payments (child_id, trainer_id, amount, month_year) VALUES (?, ?, ?, ?)",
             (child_id, trainer_id, amount, month_year)
@@ -106,7 +106,7 @@ async def create_payment(self, child_id: int, trainer_id: int, amount: float, mo
 
 async def get_payments_with_trainer(self, trainer_id: int):
     """Получить платежи у тренера"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
             """SELECT p.*, c.full_name as child_name 
@@ -120,7 +120,7 @@ async def get_payments_with_trainer(self, trainer_id: int):
 
 async def move_payments_to_cashbox(self, trainer_id: int):
     """Перевод платежей в кассу"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         await conn.execute(
             "UPDATE payments SET status = 'in_cashbox', cashbox_date = ? WHERE trainer_id = ? AND status = 'with_trainer'",
             (datetime.now().isoformat(), trainer_id)
@@ -129,7 +129,7 @@ async def move_payments_to_cashbox(self, trainer_id: int):
 
 async def get_all_payments_with_trainer(self):
     """Получить все платежи у тренеров"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
             """SELECT p.*, c.full_name as child_name, t.full_name as trainer_name 
@@ -143,7 +143,7 @@ async def get_all_payments_with_trainer(self):
 
 async def add_log(self, user_id: int, action: str, details: str = None):
     """Добавление лога"""
-    async with aiosqlite.connect(self.db_path) as conn:
+    async with self.connect() as conn:
         await conn.execute(
             "INSERT INTO logs (user_id, action, details) VALUES (?, ?, ?)",
             (user_id, action, details)
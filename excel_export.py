@@ -0,0 +1,249 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from config import TIMEZONE, get_current_time
+from database import db
+
+# Сколько строк забирается из курсора за один раз
+EXPORT_CHUNK_SIZE = 500
+
+# Одновременно формируется не больше двух файлов
+_export_semaphore = asyncio.Semaphore(2)
+
+
+def _to_excel_datetime(value):
+    """ISO-строка из базы -> datetime без часового пояса (Excel не хранит tz)"""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(TIMEZONE).replace(tzinfo=None)
+    return dt
+
+
+def _session_type(value):
+    return "Тренировка" if value == "training" else "Игра"
+
+
+def _attendance_status(value):
+    return "Присутствовал" if value == "present" else "Отсутствовал"
+
+
+def _payment_status(value):
+    return "В кассе" if value == "in_cashbox" else "У тренера"
+
+
+def _write_header(ws, titles):
+    bold = Font(bold=True)
+    cells = []
+    for title in titles:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = bold
+        cells.append(cell)
+    ws.append(cells)
+
+
+def _write_query(ws, conn, columns, sql, params=()):
+    """Потоковая запись результата запроса в лист
+
+    columns - список (заголовок, преобразователь или None).
+    Строки читаются из курсора порциями, поэтому память не зависит от объёма выгрузки.
+    """
+    _write_header(ws, [title for title, _ in columns])
+    converters = [converter for _, converter in columns]
+
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                ws.append([
+                    converter(value) if converter else value
+                    for converter, value in zip(converters, row)
+                ])
+    finally:
+        cursor.close()
+
+
+def _write_sessions(wb, conn, since):
+    ws = wb.create_sheet("Занятия")
+    _write_query(
+        ws, conn,
+        [("Начало", _to_excel_datetime), ("Окончание", _to_excel_datetime), ("Тип", _session_type),
+         ("Группа", None), ("Филиал", None), ("Тренер", None),
+         ("Присутствовали", None), ("Отсутствовали", None)],
+        """SELECT s.start_time, s.end_time, s.type, g.name, b.name, t.full_name,
+                  (SELECT COUNT(*) FROM attendance a WHERE a.session_id = s.id AND a.status = 'present'),
+                  (SELECT COUNT(*) FROM attendance a WHERE a.session_id = s.id AND a.status = 'absent')
+           FROM sessions s
+           JOIN groups_table g ON s.group_id = g.id
+           JOIN branches b ON g.branch_id = b.id
+           JOIN trainers t ON s.trainer_id = t.id
+           WHERE DATE(s.start_time) >= ?
+           ORDER BY s.start_time""", (since.isoformat(),)
+    )
+
+
+def _write_period_summary(wb, conn, since):
+    ws = wb.create_sheet("Филиалы")
+    _write_query(
+        ws, conn,
+        [("Филиал", None), ("Занятий", None), ("Уникальных детей", None), ("Посещаемость, %", None)],
+        """SELECT b.name, COUNT(DISTINCT s.id),
+                  COUNT(DISTINCT a.child_id),
+                  ROUND(AVG(CASE WHEN a.status = 'present' THEN 100.0 ELSE 0.0 END), 1)
+           FROM branches b
+           LEFT JOIN groups_table g ON b.id = g.branch_id
+           LEFT JOIN sessions s ON g.id = s.group_id AND DATE(s.start_time) >= ?
+           LEFT JOIN attendance a ON s.id = a.session_id
+           GROUP BY b.id, b.name
+           ORDER BY b.name""", (since.isoformat(),)
+    )
+
+    ws = wb.create_sheet("Тренеры")
+    _write_query(
+        ws, conn,
+        [("Тренер", None), ("Занятий", None), ("Получено оплат, сум", None)],
+        """SELECT t.full_name,
+                  (SELECT COUNT(*) FROM sessions s WHERE s.trainer_id = t.id AND DATE(s.start_time) >= ?),
+                  (SELECT COALESCE(SUM(p.amount), 0) FROM payments p
+                   WHERE p.trainer_id = t.id AND DATE(p.payment_date) >= ?)
+           FROM trainers t
+           ORDER BY t.full_name""", (since.isoformat(), since.isoformat())
+    )
+
+
+def _build_week(wb, conn):
+    since = get_current_time().date() - timedelta(days=7)
+    _write_period_summary(wb, conn, since)
+    _write_sessions(wb, conn, since)
+
+
+def _build_month(wb, conn):
+    since = get_current_time().date() - timedelta(days=30)
+    _write_period_summary(wb, conn, since)
+    _write_sessions(wb, conn, since)
+
+
+def _build_finance(wb, conn):
+    ws = wb.create_sheet("По тренерам")
+    _write_query(
+        ws, conn,
+        [("Тренер", None), ("У тренера, сум", None), ("В кассе, сум", None), ("Всего, сум", None)],
+        """SELECT t.full_name,
+                  COALESCE(SUM(CASE WHEN p.status = 'with_trainer' THEN p.amount ELSE 0 END), 0),
+                  COALESCE(SUM(CASE WHEN p.status = 'in_cashbox' THEN p.amount ELSE 0 END), 0),
+                  COALESCE(SUM(p.amount), 0)
+           FROM trainers t
+           LEFT JOIN payments p ON t.id = p.trainer_id
+           GROUP BY t.id, t.full_name
+           ORDER BY 4 DESC"""
+    )
+
+    ws = wb.create_sheet("По месяцам")
+    _write_query(
+        ws, conn,
+        [("Месяц", None), ("Платежей", None), ("Сумма, сум", None)],
+        """SELECT month_year, COUNT(*), COALESCE(SUM(amount), 0)
+           FROM payments
+           GROUP BY month_year
+           ORDER BY month_year DESC"""
+    )
+
+
+def _build_attendance(wb, conn):
+    ws = wb.create_sheet("Посещаемость")
+    _write_query(
+        ws, conn,
+        [("Дата занятия", _to_excel_datetime), ("Тип", _session_type), ("Филиал", None), ("Группа", None),
+         ("Тренер", None), ("Ребёнок", None), ("Статус", _attendance_status)],
+        """SELECT s.start_time, s.type, b.name, g.name, t.full_name, c.full_name, a.status
+           FROM attendance a
+           JOIN sessions s ON a.session_id = s.id
+           JOIN children c ON a.child_id = c.id
+           JOIN groups_table g ON s.group_id = g.id
+           JOIN branches b ON g.branch_id = b.id
+           JOIN trainers t ON s.trainer_id = t.id
+           ORDER BY s.start_time, c.full_name"""
+    )
+
+
+def _build_payments(wb, conn):
+    ws = wb.create_sheet("Платежи")
+    _write_query(
+        ws, conn,
+        [("Дата оплаты", _to_excel_datetime), ("Ребёнок", None), ("Группа", None), ("Тренер", None),
+         ("Сумма, сум", None), ("За месяц", None), ("Статус", _payment_status),
+         ("Сдано в кассу", _to_excel_datetime)],
+        """SELECT p.payment_date, c.full_name, g.name, t.full_name,
+                  p.amount, p.month_year, p.status, p.cashbox_date
+           FROM payments p
+           JOIN children c ON p.child_id = c.id
+           JOIN groups_table g ON c.group_id = g.id
+           JOIN trainers t ON p.trainer_id = t.id
+           ORDER BY p.payment_date"""
+    )
+
+
+# Тип выгрузки -> (название, построитель)
+EXPORTS = {
+    "week": ("Отчёт за неделю", _build_week),
+    "month": ("Отчёт за месяц", _build_month),
+    "finance": ("Финансовый отчёт", _build_finance),
+    "attendance": ("Журнал посещаемости", _build_attendance),
+    "payments": ("Журнал оплат", _build_payments),
+}
+
+
+def build_export(kind: str, db_path: str = None):
+    """Формирование .xlsx файла (синхронно, вызывается в рабочем потоке)
+
+    Возвращает путь к временному файлу - удалить его должен вызывающий код.
+    """
+    title, builder = EXPORTS[kind]
+
+    wb = Workbook(write_only=True)
+    # Только чтение и одна транзакция: все листы - из одного состояния базы
+    conn = sqlite3.connect(db.read_only_uri(db_path), uri=True, isolation_level=None)
+    try:
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("BEGIN")
+        builder(wb, conn)
+    finally:
+        conn.close()
+
+    fd, path = tempfile.mkstemp(prefix=f"export_{kind}_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+async def export_report(kind: str):
+    """Формирование выгрузки в отдельном потоке, чтобы не блокировать event loop
+
+    Возвращает (путь к файлу, имя файла для отправки).
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Неизвестный тип выгрузки: {kind}")
+
+    async with _export_semaphore:
+        path = await asyncio.to_thread(build_export, kind)
+
+    filename = f"{kind}_{get_current_time().strftime('%Y-%m-%d')}.xlsx"
+    return path, filename
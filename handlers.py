@@ -11,6 +11,12 @@ import re
 import aiosqlite
 
 from config import ROLE_MAIN_TRAINER, ROLE_TRAINER, ROLE_PARENT, ROLE_CASHIER, ADMIN_USER_IDS
+from background import background
+from callback_data import (
+    ABSENT, ATTENDANCE, BACK_TO_MENU, END_SESSION, FINISH_ATTENDANCE, MT_FINANCE, MT_STATISTICS,
+    PRESENT, SELECT_GROUP, START_GAME, START_TRAINING, TRAINER_STATS
+)
+from callback_dispatch import callbacks
 from database import db
 from keyboards import *
 from states import *
@@ -83,7 +89,7 @@ async def cmd_start(message: Message, state: FSMContext):
         )
 
 
-@router.callback_query(F.data == "back_to_menu")
+@callbacks.route(BACK_TO_MENU)
 async def back_to_menu(callback: CallbackQuery, state: FSMContext):
     """Возврат в главное меню"""
     await state.clear()
@@ -117,10 +123,11 @@ async def back_to_menu(callback: CallbackQuery, state: FSMContext):
 
 # ОБРАБОТЧИКИ ДЛЯ ТРЕНЕРА
 
-@router.callback_query(F.data.in_(["start_training", "start_game"]))
-async def start_session_handler(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(START_TRAINING)
+@callbacks.route(START_GAME)
+async def start_session_handler(callback: CallbackQuery, state: FSMContext, action: str):
     """Начало тренировки или игры"""
-    session_type = "training" if callback.data == "start_training" else "game"
+    session_type = "training" if action == "start_training" else "game"
 
     # Проверяем пользователя и тренера
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -162,7 +169,7 @@ async def start_session_handler(callback: CallbackQuery, state: FSMContext):
         f"Это необходимо для подтверждения того, что вы проводите {session_name}.\n\n"
         f"Нажмите кнопку '📍 Отправить геолокацию' ниже:",
         reply_markup=InlineKeyboardBuilder().row(
-            InlineKeyboardButton(text="❌ Отмена", callback_data="back_to_menu")
+            InlineKeyboardButton(text="❌ Отмена", callback_data=BACK_TO_MENU.pack())
         ).as_markup()
     )
 
@@ -234,11 +241,14 @@ async def process_location(message: Message, state: FSMContext):
             reply_markup=get_trainer_menu()
         )
 
-        # Отправляем уведомления
-        if notification_service:
-            await notification_service.notify_session_started(session_id, data['session_type'])
-
         await state.clear()
+
+        # Уведомления родителям - в фоне, тренер не ждёт рассылку
+        if notification_service:
+            background.spawn(
+                notification_service.notify_session_started(session_id, data['session_type']),
+                name=f"notify_session_started:{session_id}"
+            )
     else:
         # Если групп несколько, даём выбрать
         keyboard = InlineKeyboardBuilder()
@@ -246,10 +256,10 @@ async def process_location(message: Message, state: FSMContext):
             keyboard.row(
                 InlineKeyboardButton(
                     text=f"👥 {group['name']}",
-                    callback_data=f"select_group_{group['id']}"
+                    callback_data=SELECT_GROUP.pack(group['id'])
                 )
             )
-        keyboard.row(InlineKeyboardButton(text="Отмена", callback_data="back_to_menu"))
+        keyboard.row(InlineKeyboardButton(text="Отмена", callback_data=BACK_TO_MENU.pack()))
 
         await message.answer(
             "Выберите группу для занятия:",
@@ -258,10 +268,9 @@ async def process_location(message: Message, state: FSMContext):
         await state.update_data(location_lat=location.latitude, location_lon=location.longitude)
 
 
-@router.callback_query(F.data.startswith("select_group_"), StateFilter(SessionStates.waiting_for_location))
-async def select_group(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(SELECT_GROUP, state=SessionStates.waiting_for_location, answer_first=True)
+async def select_group(callback: CallbackQuery, group_id: int, state: FSMContext):
     """Выбор группы для занятия"""
-    group_id = int(callback.data.split("_")[2])
     data = await state.get_data()
 
     session_id = await db.create_session(
@@ -280,14 +289,17 @@ async def select_group(callback: CallbackQuery, state: FSMContext):
         reply_markup=get_trainer_menu()
     )
 
-    # Отправляем уведомления
-    if notification_service:
-        await notification_service.notify_session_started(session_id, data['session_type'])
-
     await state.clear()
 
+    # Уведомления родителям - в фоне
+    if notification_service:
+        background.spawn(
+            notification_service.notify_session_started(session_id, data['session_type']),
+            name=f"notify_session_started:{session_id}"
+        )
 
-@router.callback_query(F.data == "attendance")
+
+@callbacks.route(ATTENDANCE)
 async def attendance_handler(callback: CallbackQuery):
     """Перекличка"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -325,25 +337,26 @@ async def attendance_handler(callback: CallbackQuery):
     )
 
 
-@router.callback_query(F.data.startswith("present_") | F.data.startswith("absent_"))
-async def mark_attendance_handler(callback: CallbackQuery):
+@callbacks.route(PRESENT)
+@callbacks.route(ABSENT)
+async def mark_attendance_handler(callback: CallbackQuery, action: str, session_id: int, child_id: int):
     """Отметка посещаемости"""
-    parts = callback.data.split("_")
-    status = parts[0]  # present или absent
-    session_id = int(parts[1])
-    child_id = int(parts[2])
+    status = action  # present или absent
 
     # Отмечаем посещаемость
     await db.mark_attendance(session_id, child_id, status)
 
-    # Отправляем уведомление родителю
-    if notification_service:
-        await notification_service.notify_attendance(child_id, status, session_id)
-
     await callback.answer(f"✅ Отмечено: {'Присутствует' if status == 'present' else 'Отсутствует'}")
 
+    # Уведомление родителю - в фоне
+    if notification_service:
+        background.spawn(
+            notification_service.notify_attendance(child_id, status, session_id),
+            name=f"notify_attendance:{session_id}:{child_id}"
+        )
+
 
-@router.callback_query(F.data == "finish_attendance")
+@callbacks.route(FINISH_ATTENDANCE)
 async def finish_attendance(callback: CallbackQuery):
     """Завершение переклички"""
     await callback.message.edit_text(
@@ -352,7 +365,7 @@ async def finish_attendance(callback: CallbackQuery):
     )
 
 
-@router.callback_query(F.data == "end_session")
+@callbacks.route(END_SESSION, answer_first=True)
 async def end_session_handler(callback: CallbackQuery):
     """Завершение занятия"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -383,12 +396,15 @@ async def end_session_handler(callback: CallbackQuery):
         reply_markup=get_back_button()
     )
 
-    # Отправляем уведомления
+    # Уведомления родителям - в фоне
     if notification_service:
-        await notification_service.notify_session_ended(active_session['id'])
+        background.spawn(
+            notification_service.notify_session_ended(active_session['id']),
+            name=f"notify_session_ended:{active_session['id']}"
+        )
 
 
-@router.callback_query(F.data == "trainer_stats")
+@callbacks.route(TRAINER_STATS)
 async def trainer_statistics(callback: CallbackQuery):
     """Статистика тренера"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -406,7 +422,7 @@ async def trainer_statistics(callback: CallbackQuery):
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         # Статистика занятий тренера
@@ -480,7 +496,7 @@ async def trainer_statistics(callback: CallbackQuery):
 
 # ОБРАБОТЧИКИ ДЛЯ ГЛАВНОГО ТРЕНЕРА (основные)
 
-@router.callback_query(F.data == "mt_statistics")
+@callbacks.route(MT_STATISTICS)
 async def main_trainer_statistics(callback: CallbackQuery):
     """Статистика для главного тренера"""
     from datetime import date, timedelta
@@ -489,7 +505,7 @@ async def main_trainer_statistics(callback: CallbackQuery):
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         # Статистика за сегодня
@@ -543,7 +559,7 @@ async def main_trainer_statistics(callback: CallbackQuery):
     await callback.message.edit_text(text, reply_markup=get_back_button())
 
 
-@router.callback_query(F.data == "mt_finance")
+@callbacks.route(MT_FINANCE)
 async def main_trainer_finance(callback: CallbackQuery):
     """Финансовая статистика"""
     from datetime import date, timedelta
@@ -551,7 +567,7 @@ async def main_trainer_finance(callback: CallbackQuery):
     today = date.today()
     month_ago = today - timedelta(days=30)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         # Деньги у тренеров
@@ -588,27 +604,3 @@ async def main_trainer_finance(callback: CallbackQuery):
     )
 
     await callback.message.edit_text(text, reply_markup=get_back_button())
-
-
-# ОБРАБОТЧИКИ ДЛЯ РОДИТЕЛЯ
-
-@router.callback_query(F.data == "my_children")
-async def my_children_handler(callback: CallbackQuery):
-    """Мои дети"""
-    user = await db.get_user_by_telegram_id(callback.from_user.id)
-    children = await db.get_children_by_parent(user['id'])
-
-    if not children:
-        await callback.message.edit_text(
-            "У вас нет зарегистрированных детей.",
-            reply_markup=get_back_button()
-        )
-        return
-
-    text = "👶 Ваши дети:\n\n"
-    for child in children:
-        text += f"• {child['full_name']}\n"
-        text += f"  📍 Группа: {child['group_name']}\n"
-        text += f"  🏢 Филиал: {child['branch_name']}\n\n"
-
-    await callback.message.edit_text(text, reply_markup=get_back_button())
\ No newline at end of file
@@ -1,21 +1,28 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton, ReplyKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
+from callback_data import (
+    ABSENT, ACCEPT_MONEY, AMOUNT, ATTENDANCE, ATTENDANCE_HISTORY, BACK_TO_MENU, CUSTOM_AMOUNT,
+    END_SESSION, FINANCIAL_REPORT, FINISH_ATTENDANCE, MONTH, MT_BRANCHES, MT_FINANCE, MT_GROUPS,
+    MT_REPORTS, MT_STATISTICS, MT_TRAINERS, MY_CHILDREN, PAYMENT, PAYMENT_HISTORY,
+    PENDING_PAYMENTS, PRESENT, START_GAME, START_TRAINING, TO_CASHBOX, TRAINER_STATS
+)
+
 
 def get_main_trainer_menu():
     """Главное меню для главного тренера"""
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="📊 Статистика", callback_data="mt_statistics"),
-        InlineKeyboardButton(text="💰 Финансы", callback_data="mt_finance")
+        InlineKeyboardButton(text="📊 Статистика", callback_data=MT_STATISTICS.pack()),
+        InlineKeyboardButton(text="💰 Финансы", callback_data=MT_FINANCE.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="🏢 Филиалы", callback_data="mt_branches"),
-        InlineKeyboardButton(text="👥 Тренеры", callback_data="mt_trainers")
+        InlineKeyboardButton(text="🏢 Филиалы", callback_data=MT_BRANCHES.pack()),
+        InlineKeyboardButton(text="👥 Тренеры", callback_data=MT_TRAINERS.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="👶 Группы и дети", callback_data="mt_groups"),
-        InlineKeyboardButton(text="📋 Отчёты", callback_data="mt_reports")
+        InlineKeyboardButton(text="👶 Группы и дети", callback_data=MT_GROUPS.pack()),
+        InlineKeyboardButton(text="📋 Отчёты", callback_data=MT_REPORTS.pack())
     )
     return keyboard.as_markup()
 
@@ -24,19 +31,19 @@ def get_trainer_menu():
     """Главное меню для тренера"""
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="🏃 Начать тренировку", callback_data="start_training"),
-        InlineKeyboardButton(text="⚽ Начать игру", callback_data="start_game")
+        InlineKeyboardButton(text="🏃 Начать тренировку", callback_data=START_TRAINING.pack()),
+        InlineKeyboardButton(text="⚽ Начать игру", callback_data=START_GAME.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="✅ Завершить занятие", callback_data="end_session"),
-        InlineKeyboardButton(text="👥 Перекличка", callback_data="attendance")
+        InlineKeyboardButton(text="✅ Завершить занятие", callback_data=END_SESSION.pack()),
+        InlineKeyboardButton(text="👥 Перекличка", callback_data=ATTENDANCE.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="💰 Оплата", callback_data="payment"),
-        InlineKeyboardButton(text="💵 Сдать в кассу", callback_data="to_cashbox")
+        InlineKeyboardButton(text="💰 Оплата", callback_data=PAYMENT.pack()),
+        InlineKeyboardButton(text="💵 Сдать в кассу", callback_data=TO_CASHBOX.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="📊 Моя статистика", callback_data="trainer_stats")
+        InlineKeyboardButton(text="📊 Моя статистика", callback_data=TRAINER_STATS.pack())
     )
     return keyboard.as_markup()
 
@@ -45,11 +52,11 @@ def get_parent_menu():
     """Главное меню для родителя"""
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="👶 Мои дети", callback_data="my_children"),
-        InlineKeyboardButton(text="📊 Посещаемость", callback_data="attendance_history")
+        InlineKeyboardButton(text="👶 Мои дети", callback_data=MY_CHILDREN.pack()),
+        InlineKeyboardButton(text="📊 Посещаемость", callback_data=ATTENDANCE_HISTORY.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="💰 История оплат", callback_data="payment_history")
+        InlineKeyboardButton(text="💰 История оплат", callback_data=PAYMENT_HISTORY.pack())
     )
     return keyboard.as_markup()
 
@@ -58,11 +65,11 @@ def get_cashier_menu():
     """Главное меню для кассира"""
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="💰 Принять деньги", callback_data="accept_money"),
-        InlineKeyboardButton(text="📋 Список сумм", callback_data="pending_payments")
+        InlineKeyboardButton(text="💰 Принять деньги", callback_data=ACCEPT_MONEY.pack()),
+        InlineKeyboardButton(text="📋 Список сумм", callback_data=PENDING_PAYMENTS.pack())
     )
     keyboard.row(
-        InlineKeyboardButton(text="📊 Финансовый отчёт", callback_data="financial_report")
+        InlineKeyboardButton(text="📊 Финансовый отчёт", callback_data=FINANCIAL_REPORT.pack())
     )
     return keyboard.as_markup()
 
@@ -70,7 +77,7 @@ def get_cashier_menu():
 def get_back_button():
     """Кнопка назад"""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu")]
+        [InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack())]
     ])
 
 
@@ -82,20 +89,6 @@ def get_location_request():
     return keyboard.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
-def get_children_keyboard(children):
-    """Клавиатура со списком детей"""
-    keyboard = InlineKeyboardBuilder()
-    for child in children:
-        keyboard.row(
-            InlineKeyboardButton(
-                text=f"👶 {child['full_name']}",
-                callback_data=f"child_{child['id']}"
-            )
-        )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
-    return keyboard.as_markup()
-
-
 def get_attendance_keyboard(children, session_id):
     """Клавиатура для переклички"""
     keyboard = InlineKeyboardBuilder()
@@ -103,58 +96,20 @@ def get_attendance_keyboard(children, session_id):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"✅ {child['full_name']}",
-                callback_data=f"present_{session_id}_{child['id']}"
+                callback_data=PRESENT.pack(session_id, child['id'])
             ),
             InlineKeyboardButton(
                 text=f"❌ {child['full_name']}",
-                callback_data=f"absent_{session_id}_{child['id']}"
-            )
-        )
-    keyboard.row(
-        InlineKeyboardButton(text="✅ Завершить перекличку", callback_data="finish_attendance"),
-        InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu")
-    )
-    return keyboard.as_markup()
-
-
-def get_payment_keyboard(children):
-    """Клавиатура для отметки оплат"""
-    keyboard = InlineKeyboardBuilder()
-    for child in children:
-        keyboard.row(
-            InlineKeyboardButton(
-                text=f"💰 {child['full_name']}",
-                callback_data=f"payment_{child['id']}"
+                callback_data=ABSENT.pack(session_id, child['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
-    return keyboard.as_markup()
-
-
-def get_confirm_keyboard(action_data):
-    """Клавиатура подтверждения действия"""
-    keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="✅ Подтвердить", callback_data=f"confirm_{action_data}"),
-        InlineKeyboardButton(text="❌ Отмена", callback_data="back_to_menu")
+        InlineKeyboardButton(text="✅ Завершить перекличку", callback_data=FINISH_ATTENDANCE.pack()),
+        InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack())
     )
     return keyboard.as_markup()
 
 
-def get_trainers_keyboard(trainers):
-    """Клавиатура со списком тренеров для кассира"""
-    keyboard = InlineKeyboardBuilder()
-    for trainer in trainers:
-        keyboard.row(
-            InlineKeyboardButton(
-                text=f"👨‍🏫 {trainer['full_name']}",
-                callback_data=f"trainer_payments_{trainer['id']}"
-            )
-        )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
-    return keyboard.as_markup()
-
-
 def get_amount_keyboard():
     """Клавиатура для выбора суммы оплаты"""
     keyboard = InlineKeyboardBuilder()
@@ -171,19 +126,19 @@ def get_amount_keyboard():
                 row_buttons.append(
                     InlineKeyboardButton(
                         text=f"{amount:,} сум".replace(',', ' '),  # Форматирование с пробелами
-                        callback_data=f"amount_{amount}"
+                        callback_data=AMOUNT.pack(amount)
                     )
                 )
         keyboard.row(*row_buttons)
 
     # Кнопка для ввода произвольной суммы
     keyboard.row(
-        InlineKeyboardButton(text="✏️ Ввести другую сумму", callback_data="custom_amount")
+        InlineKeyboardButton(text="✏️ Ввести другую сумму", callback_data=CUSTOM_AMOUNT.pack())
     )
 
     # Кнопка "Назад"
     keyboard.row(
-        InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu")
+        InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack())
     )
 
     return keyboard.as_markup()
@@ -201,19 +156,8 @@ def get_month_keyboard():
 
     for month_name, month_code in months:
         keyboard.row(
-            InlineKeyboardButton(text=month_name, callback_data=f"month_{month_code}")
+            InlineKeyboardButton(text=month_name, callback_data=MONTH.pack(month_code))
         )
 
-    keyboard.row(InlineKeyboardButton(text="❌ Отмена", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="❌ Отмена", callback_data=BACK_TO_MENU.pack()))
     return keyboard.as_markup()
-
-
-def get_session_type_keyboard():
-    """Клавиатура выбора типа занятия"""
-    keyboard = InlineKeyboardBuilder()
-    keyboard.row(
-        InlineKeyboardButton(text="🏃 Тренировка", callback_data="session_training"),
-        InlineKeyboardButton(text="⚽ Игра", callback_data="session_game")
-    )
-    keyboard.row(InlineKeyboardButton(text="❌ Отмена", callback_data="back_to_menu"))
-    return keyboard.as_markup()
\ No newline at end of file
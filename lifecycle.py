@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import signal
+
+from config import SHUTDOWN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """Запуск фоновых служб и корректная остановка бота
+
+    Остановка (SIGTERM/SIGINT) идёт по шагам:
+    1. Перестаём принимать обновления (stop_serving или отмена задачи приёма).
+    2. Останавливаем службы (планировщик дорабатывает начатый отчёт).
+    3. Дожидаемся начатой работы: обновлений в обработке, рассылок уведомлений.
+    4. Сбрасываем кэши и состояния FSM на диск и закрываем соединения.
+
+    Шаги 2-3 ограничены общим сроком SHUTDOWN_TIMEOUT; всё, что не успело,
+    отменяется с записью в лог. Ошибка одного шага не мешает следующим.
+    """
+
+    def __init__(self, timeout: float = SHUTDOWN_TIMEOUT):
+        self.timeout = timeout
+        self._stop = asyncio.Event()
+        # имя -> (задача, функция остановки)
+        self._services = {}
+        self._drainers = []
+        self._closers = []
+
+    # РЕГИСТРАЦИЯ
+
+    def start_service(self, name: str, coro, stop=None) -> asyncio.Task:
+        """Долгоживущая фоновая задача (планировщик и т.п.), stop - мягкая остановка"""
+        task = asyncio.create_task(coro, name=name)
+        task.add_done_callback(self._on_service_done)
+        self._services[name] = (task, stop)
+        return task
+
+    def on_drain(self, name: str, func):
+        """func(timeout) -> bool: дождаться начатой работы не дольше timeout"""
+        self._drainers.append((name, func))
+
+    def on_close(self, name: str, func):
+        """Сброс на диск или закрытие ресурса после ожидания (в порядке регистрации)"""
+        self._closers.append((name, func))
+
+    def _on_service_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Служба {task.get_name()} упала", exc_info=task.exception())
+
+    # СИГНАЛЫ
+
+    def install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows: остаётся KeyboardInterrupt
+                pass
+
+    def request_stop(self):
+        if not self._stop.is_set():
+            logger.info("🛑 Получен сигнал остановки")
+        self._stop.set()
+
+    # ЗАПУСК И ОСТАНОВКА
+
+    async def serve(self, coro, stop_serving=None):
+        """Приём обновлений до сигнала остановки
+
+        stop_serving - мягкая остановка приёма (dp.stop_polling); без неё задача отменяется.
+        """
+        serving = asyncio.create_task(coro, name="serving")
+        stopping = asyncio.create_task(self._stop.wait())
+        try:
+            await asyncio.wait({serving, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+
+        if not serving.done():
+            try:
+                if stop_serving is None:
+                    raise RuntimeError
+                await stop_serving()
+            except RuntimeError:
+                # Мягкая остановка недоступна (например, polling ещё не запущен)
+                serving.cancel()
+        try:
+            await serving
+        except asyncio.CancelledError:
+            # Отменили приём мы сами; отмену самого serve() пробрасываем дальше
+            if not self._stop.is_set():
+                raise
+
+    async def _step(self, name: str, func, *args):
+        try:
+            result = func(*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception:
+            logger.exception(f"Остановка: ошибка на шаге {name}")
+            return
+        if result is False:
+            logger.warning(f"Остановка: {name} не успели завершить за отведённое время")
+
+    async def shutdown(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        logger.info(f"Остановка: ожидание начатой работы (не дольше {self.timeout:.0f} с)")
+
+        for name, (task, stop) in self._services.items():
+            if stop is not None and not task.done():
+                stop()
+        for name, (task, stop) in self._services.items():
+            if task.done():
+                continue
+            done, _ = await asyncio.wait({task}, timeout=max(deadline - loop.time(), 0))
+            if not done:
+                logger.warning(f"Остановка: служба {name} не завершилась, отменяем")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        for name, drain in self._drainers:
+            await self._step(name, drain, max(deadline - loop.time(), 0))
+
+        for name, close in self._closers:
+            await self._step(name, close)
+
+        logger.info("Остановка завершена")
+
+
+lifecycle = Lifecycle()
@@ -0,0 +1 @@
+"""Нагрузочные прогоны бота против локальной замены Telegram Bot API"""
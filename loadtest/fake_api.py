@@ -0,0 +1,152 @@
+"""Локальная замена Telegram Bot API для нагрузочных прогонов
+
+Принимает запросы бота вида /bot<token>/<method>, отвечает как Telegram и запоминает:
+- каждый исходящий вызов (время, метод, чат, ответ) - для подсчёта частоты сообщений;
+- последнюю inline-клавиатуру в каждом чате - по ней имитированный пользователь
+  «нажимает» кнопки, как в настоящем клиенте.
+
+Ответ 429 с retry_after выдаётся при превышении лимитов Telegram (сообщений в секунду
+в один чат и всего) или случайно с заданной вероятностью.
+"""
+import json
+import random
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+# Лимиты Telegram для ботов: ~1 сообщение в секунду в чат и ~30 в секунду всего
+CHAT_LIMIT = 1.0
+GLOBAL_LIMIT = 30
+# Методы, которые тратят лимиты (answerCallbackQuery их не тратит)
+LIMITED_METHODS = {"sendMessage", "editMessageText", "sendDocument", "sendPhoto"}
+
+
+class FakeBotAPI:
+    def __init__(self, chat_limit: float = 0, global_limit: float = 0, inject_429: float = 0,
+                 retry_after: int = 1, seed: int = 1):
+        # 0 - лимит не проверяется
+        self.chat_limit = chat_limit
+        self.global_limit = global_limit
+        self.inject_429 = inject_429
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self.calls = []
+        self.keyboards = {}
+        self._message_ids = Counter()
+        self._chat_sent = {}
+        self._sent = deque()
+        self._runner = None
+        self.url = None
+
+    # HTTP
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=host, port=port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        now = time.monotonic()
+        chat_id = int(params["chat_id"]) if str(params.get("chat_id", "")).lstrip("-").isdigit() else None
+
+        retry_after = self._limited(method, chat_id, now)
+        if retry_after:
+            self.calls.append((now, method, chat_id, 429))
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }, status=429)
+
+        self.calls.append((now, method, chat_id, 200))
+        return web.json_response({"ok": True, "result": self._result(method, chat_id, params)})
+
+    # ЛИМИТЫ
+
+    def _limited(self, method: str, chat_id, now: float) -> int:
+        if method not in LIMITED_METHODS:
+            return 0
+        if self.inject_429 and self._random.random() < self.inject_429:
+            return self.retry_after
+
+        if self.global_limit:
+            while self._sent and now - self._sent[0] >= 1:
+                self._sent.popleft()
+            if len(self._sent) >= self.global_limit:
+                return self.retry_after
+        if self.chat_limit and chat_id is not None:
+            last = self._chat_sent.get(chat_id)
+            if last is not None and now - last < 1 / self.chat_limit:
+                return self.retry_after
+
+        self._sent.append(now)
+        if chat_id is not None:
+            self._chat_sent[chat_id] = now
+        return 0
+
+    # ОТВЕТЫ
+
+    def _message(self, chat_id, message_id: int, params: dict) -> dict:
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id or 0, "type": "private"},
+            "text": params.get("text") or params.get("caption") or "",
+        }
+
+    def _remember_keyboard(self, chat_id, message_id: int, params: dict):
+        markup = params.get("reply_markup")
+        if not markup or chat_id is None:
+            return
+        rows = json.loads(markup).get("inline_keyboard")
+        if rows is not None:
+            buttons = [button["callback_data"] for row in rows for button in row if "callback_data" in button]
+            self.keyboards[chat_id] = (message_id, buttons)
+
+    def _result(self, method: str, chat_id, params: dict):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"}
+        if method.startswith("send"):
+            self._message_ids[chat_id] += 1
+            message_id = self._message_ids[chat_id]
+            self._remember_keyboard(chat_id, message_id, params)
+            return self._message(chat_id, message_id, params)
+        if method.startswith("edit"):
+            message_id = int(params.get("message_id", 0))
+            self._remember_keyboard(chat_id, message_id, params)
+            return self._message(chat_id, message_id, params)
+        return True
+
+    # СТАТИСТИКА
+
+    def stats(self, since: float = None) -> dict:
+        """Вызовы по методам, число сообщений и пик за секунду, ответы 429"""
+        calls = [call for call in self.calls if since is None or call[0] >= since]
+        by_method = Counter(method for _, method, _, status in calls if status == 200)
+        rejected = Counter(method for _, method, _, status in calls if status == 429)
+
+        per_second = Counter(int(at) for at, method, _, status in calls
+                             if status == 200 and method in LIMITED_METHODS)
+        return {
+            "calls": dict(by_method),
+            "rejected_429": dict(rejected),
+            "messages": sum(per_second.values()),
+            "peak_messages_per_second": max(per_second.values(), default=0),
+        }
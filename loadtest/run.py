@@ -0,0 +1,380 @@
+"""Нагрузочный прогон бота целиком: настоящий Dispatcher и роутеры против локального Bot API
+
+Пример:
+    python -m loadtest.run --trainers 100 --scenarios start,roll_call,payments,end,daily_report
+    python -m loadtest.run --trainers 50 --inject-429 0.05 --output loadtest.json
+    python -m loadtest.run --telegram-limits   # лимиты Telegram: 1 сообщение/с в чат, 30/с всего
+
+База генерируется benchmarks.datagen, бот ходит в loadtest.fake_api вместо api.telegram.org.
+Каждый тренер - имитированный пользователь: пишет /start и нажимает кнопки из последней
+клавиатуры, которую бот прислал в его чат, с паузой «на раздумье» между нажатиями.
+
+Сценарии (выполняются по очереди, тренеры внутри сценария - одновременно):
+    start        - все тренеры начинают занятие в 18:00: кнопка, геолокация, выбор группы
+    roll_call    - перекличка всей группы и её завершение
+    payments     - отметка оплат: ребёнок, сумма, месяц, подтверждение
+    end          - завершение занятий
+    daily_report - ежедневный отчёт (DailyReportService)
+
+По каждому сценарию: пропускная способность (обновлений/с), p50/p99 времени обработки
+обновления, исходящие вызовы Bot API по методам, частота сообщений и ответы 429.
+Уведомления родителям входят в сценарий: он заканчивается, когда фоновые рассылки завершены.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+
+import main as bot_main
+from audit import audit
+from background import background
+from benchmarks.datagen import generate
+from callback_data import (
+    ABSENT, AMOUNT, ATTENDANCE, CONFIRM_PAYMENT, END_SESSION, FINISH_ATTENDANCE, MONTH, PAYMENT,
+    PAYMENT_CHILD, PRESENT, SELECT_GROUP, START_TRAINING
+)
+from callback_dispatch import callbacks
+from daily_reports import DailyReportService
+from database import db
+from handlers import set_notification_service
+from loadtest.fake_api import CHAT_LIMIT, GLOBAL_LIMIT, FakeBotAPI
+from logging_setup import setup_logging
+from notifications import NotificationService
+from sqlite_storage import SQLiteStorage
+from throttling import throttling
+
+SCENARIOS = ("start", "roll_call", "payments", "end", "daily_report")
+TOKEN = "123456:LOADTEST"
+# Координаты «стадиона» для геолокации тренера
+LATITUDE, LONGITUDE = 41.311, 69.279
+PRESENT_SHARE = 0.85
+# Время на отправку уведомлений после сценария, сек
+DRAIN_TIMEOUT = 120
+
+
+class OfflineNotificationService(NotificationService):
+    """Уведомления без обращения к геокодеру: адрес - координаты"""
+
+    async def get_address_from_coordinates(self, latitude: float, longitude: float):
+        return f"Координаты: {latitude:.6f}, {longitude:.6f}"
+
+
+def _percentile(ordered: list, share: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class Harness:
+    """Бот, диспетчер и замеры времени обработки каждого обновления"""
+
+    def __init__(self, api: FakeBotAPI, bot: Bot, dp, think: float, seed: int):
+        self.api = api
+        self.bot = bot
+        self.dp = dp
+        self.think = think
+        self.random = random.Random(seed)
+        self._update_id = 0
+        self.latencies = []
+        self.errors = Counter()
+
+    async def feed(self, payload: dict):
+        self._update_id += 1
+        payload["update_id"] = self._update_id
+        update = Update.model_validate(payload, context={"bot": self.bot})
+
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            # Например, TelegramRetryAfter: 429 от Bot API не обрабатывается ботом
+            self.errors[type(e).__name__] += 1
+        self.latencies.append(time.perf_counter() - started)
+
+    async def pause(self):
+        if self.think > 0:
+            await asyncio.sleep(self.random.uniform(0.5, 1.5) * self.think)
+
+    def reset(self):
+        self.latencies = []
+        self.errors = Counter()
+
+
+class SimulatedUser:
+    """Пользователь Telegram: сообщения и нажатия кнопок в своём чате"""
+
+    def __init__(self, harness: Harness, telegram_id: int):
+        self.harness = harness
+        self.telegram_id = telegram_id
+        self.chat = {"id": telegram_id, "type": "private"}
+        self.user = {"id": telegram_id, "is_bot": False, "first_name": "Load", "username": f"load{telegram_id}"}
+        self._message_id = 0
+
+    def _message(self, **fields) -> dict:
+        self._message_id += 1
+        return {"message_id": self._message_id, "date": int(time.time()), "chat": self.chat, "from": self.user,
+                **fields}
+
+    async def send_text(self, text: str):
+        await self.harness.feed({"message": self._message(text=text)})
+        await self.harness.pause()
+
+    async def send_location(self, latitude: float, longitude: float):
+        await self.harness.feed({"message": self._message(location={"latitude": latitude, "longitude": longitude})})
+        await self.harness.pause()
+
+    def buttons(self, *actions) -> list:
+        """callback_data кнопок последней клавиатуры с указанными действиями"""
+        _, buttons = self.harness.api.keyboards.get(self.telegram_id, (None, []))
+        return [data for data in buttons if callbacks.action_of(data) in actions]
+
+    async def press(self, data: str):
+        message_id, _ = self.harness.api.keyboards.get(self.telegram_id, (1, []))
+        await self.harness.feed({"callback_query": {
+            "id": f"{self.telegram_id}:{self.harness._update_id}",
+            "from": self.user,
+            "chat_instance": str(self.telegram_id),
+            "data": data,
+            "message": {"message_id": message_id, "date": int(time.time()), "chat": self.chat,
+                        "from": {"id": self.harness.bot.id, "is_bot": True, "first_name": "LoadTest"}, "text": "."},
+        }})
+        await self.harness.pause()
+
+    async def click(self, action) -> bool:
+        """Нажатие первой кнопки с действием; False - такой кнопки нет на экране"""
+        found = self.buttons(action.action)
+        if not found:
+            return False
+        await self.press(found[0])
+        return True
+
+
+# СЦЕНАРИИ
+
+async def start_session(trainer: SimulatedUser):
+    await trainer.send_text("/start")
+    if not await trainer.click(START_TRAINING):
+        return
+    await trainer.send_location(LATITUDE, LONGITUDE)
+    # Групп несколько - бот просит выбрать
+    groups = trainer.buttons(SELECT_GROUP.action)
+    if groups:
+        await trainer.press(trainer.harness.random.choice(groups))
+
+
+async def roll_call(trainer: SimulatedUser):
+    await trainer.send_text("/start")
+    if not await trainer.click(ATTENDANCE):
+        return
+    present = trainer.buttons(PRESENT.action)
+    absent = trainer.buttons(ABSENT.action)
+    for present_data, absent_data in zip(present, absent):
+        await trainer.press(present_data if trainer.harness.random.random() < PRESENT_SHARE else absent_data)
+    await trainer.click(FINISH_ATTENDANCE)
+
+
+async def record_payments(trainer: SimulatedUser, count: int):
+    for _ in range(count):
+        await trainer.send_text("/start")
+        if not await trainer.click(PAYMENT):
+            return
+        children = trainer.buttons(PAYMENT_CHILD.action)
+        if not children:
+            return
+        await trainer.press(trainer.harness.random.choice(children))
+        await trainer.click(AMOUNT)
+        await trainer.click(MONTH)
+        await trainer.click(CONFIRM_PAYMENT)
+
+
+async def end_session(trainer: SimulatedUser):
+    await trainer.send_text("/start")
+    await trainer.click(END_SESSION)
+
+
+async def _for_all(harness: Harness, trainers: list, ramp: float, scenario, *args):
+    async def one(trainer):
+        # ramp=0 - все одновременно, как в 18:00
+        if ramp > 0:
+            await asyncio.sleep(harness.random.uniform(0, ramp))
+        await scenario(trainer, *args)
+
+    await asyncio.gather(*(one(trainer) for trainer in trainers))
+
+
+async def run_scenario(name: str, harness: Harness, trainers: list, args) -> dict:
+    harness.reset()
+    throttled = throttling.stats()
+    since = time.monotonic()
+    started = time.perf_counter()
+
+    if name == "start":
+        await _for_all(harness, trainers, args.ramp, start_session)
+    elif name == "roll_call":
+        await _for_all(harness, trainers, args.ramp, roll_call)
+    elif name == "payments":
+        await _for_all(harness, trainers, args.ramp, record_payments, args.payments)
+    elif name == "end":
+        await _for_all(harness, trainers, args.ramp, end_session)
+    elif name == "daily_report":
+        await DailyReportService(harness.bot).send_daily_report()
+
+    handled = time.perf_counter() - started
+    drained = await background.drain(DRAIN_TIMEOUT)
+    duration = time.perf_counter() - started
+
+    ordered = sorted(harness.latencies)
+    after = throttling.stats()
+    result = {
+        "updates": len(ordered),
+        "duration_s": round(duration, 2),
+        "updates_per_second": round(len(ordered) / handled, 1) if handled and ordered else 0,
+        "p50_ms": round(_percentile(ordered, 0.5) * 1000, 2),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0,
+        "errors": dict(harness.errors),
+        "throttled": {key: after[key] - throttled[key] for key in ("coalesced", "throttled", "flooded")},
+        "background_drained": drained,
+        "bot_api": harness.api.stats(since),
+    }
+    result["bot_api"]["messages_per_second"] = round(result["bot_api"]["messages"] / duration, 1)
+    if name == "daily_report":
+        result["duration_ms"] = round(handled * 1000, 1)
+    return result
+
+
+# ЗАПУСК
+
+def _prepare(path: str, count: int) -> list:
+    """Закрыть сгенерированные незавершённые занятия и вернуть telegram_id тренеров"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("UPDATE sessions SET status = 'completed', end_time = start_time WHERE status = 'started'")
+        conn.commit()
+        rows = conn.execute(
+            "SELECT u.telegram_id FROM trainers t JOIN users u ON u.id = t.user_id ORDER BY t.id LIMIT ?", (count,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+async def run(args, data_dir: str) -> dict:
+    branches = min(args.branches, args.trainers)
+    scale = {
+        "branches": branches,
+        "trainers_per_branch": math.ceil(args.trainers / branches),
+        "groups_per_trainer": args.groups,
+        "children_per_group": args.children,
+        "years": args.years,
+    }
+    path = os.path.join(data_dir, "loadtest.db")
+    print("Генерация базы...", file=sys.stderr)
+    fixture = await generate(path, scale, args.seed)
+    telegram_ids = await asyncio.to_thread(_prepare, path, args.trainers)
+
+    api = FakeBotAPI(
+        chat_limit=CHAT_LIMIT if args.telegram_limits else 0,
+        global_limit=GLOBAL_LIMIT if args.telegram_limits else 0,
+        inject_429=args.inject_429, retry_after=args.retry_after, seed=args.seed
+    )
+    url = await api.start()
+
+    previous, db.db_path = db.db_path, path
+    bot = Bot(token=TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(url)))
+    storage = SQLiteStorage(path)
+    dp = bot_main.build_dispatcher(storage)
+    set_notification_service(OfflineNotificationService(bot))
+    await dp.emit_startup(bot=bot)
+
+    harness = Harness(api, bot, dp, args.think, args.seed)
+    trainers = [SimulatedUser(harness, telegram_id) for telegram_id in telegram_ids]
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "params": {
+            "trainers": len(trainers), "think_s": args.think, "ramp_s": args.ramp,
+            "payments_per_trainer": args.payments, "inject_429": args.inject_429,
+            "telegram_limits": args.telegram_limits, "scale": scale,
+        },
+        "counts": fixture["counts"],
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenarios:
+            print(f"Сценарий {name}...", file=sys.stderr)
+            result = results["scenarios"][name] = await run_scenario(name, harness, trainers, args)
+            print(f"  {result['updates']} обновлений за {result['duration_s']} с, "
+                  f"{result['updates_per_second']} обн/с, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+                  f"сообщений {result['bot_api']['messages']} ({result['bot_api']['messages_per_second']}/с, "
+                  f"пик {result['bot_api']['peak_messages_per_second']}/с), "
+                  f"429: {sum(result['bot_api']['rejected_429'].values())}, ошибок: {sum(result['errors'].values())}, "
+                  f"отброшено: флуд {result['throttled']['flooded']}, лимит {result['throttled']['throttled']}, "
+                  f"склеено {result['throttled']['coalesced']}",
+                  file=sys.stderr)
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await storage.close()
+        await audit.close()
+        await db.close()
+        await bot.session.close()
+        await api.stop()
+        db.db_path = previous
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон бота против локального Bot API")
+    parser.add_argument("--trainers", type=int, default=100, help="число тренеров, действующих одновременно")
+    parser.add_argument("--branches", type=int, default=10)
+    parser.add_argument("--groups", type=int, default=2, help="групп у тренера")
+    parser.add_argument("--children", type=int, default=15, help="детей в группе")
+    parser.add_argument("--years", type=float, default=0.25, help="глубина истории в базе, лет")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"через запятую из: {', '.join(SCENARIOS)}")
+    parser.add_argument("--payments", type=int, default=2, help="оплат на тренера в сценарии payments")
+    parser.add_argument("--think", type=float, default=0.5, help="средняя пауза между действиями пользователя, сек")
+    parser.add_argument("--ramp", type=float, default=0, help="разброс старта тренеров, сек (0 - все сразу)")
+    parser.add_argument("--inject-429", type=float, default=0, help="доля сообщений, на которые ответить 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, сек")
+    parser.add_argument("--telegram-limits", action="store_true", help="отвечать 429 сверх лимитов Telegram")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл результатов JSON")
+    parser.add_argument("--data-dir", help="каталог для базы (по умолчанию временный, удаляется)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"неизвестный сценарий: {', '.join(unknown)}")
+    setup_logging(level=args.log_level, fmt="text")
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="loadtest_")
+    os.makedirs(data_dir, exist_ok=True)
+    try:
+        results = asyncio.run(run(args, data_dir))
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Результаты: {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
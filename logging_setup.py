@@ -0,0 +1,192 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from config import LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATES
+from metrics import handler_label
+
+# Контекст обновления: попадает во все записи, сделанные при его обработке,
+# в том числе в фоновых рассылках (задача копирует контекст при создании)
+update_id_var = contextvars.ContextVar("update_id", default=None)
+user_id_var = contextvars.ContextVar("user_id", default=None)
+handler_var = contextvars.ContextVar("handler", default=None)
+
+CONTEXT_FIELDS = ("update_id", "user_id", "handler")
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Запись об обработанном обновлении: handler, event, duration_ms
+updates_logger = logging.getLogger("updates")
+
+_listener = None
+
+
+class ContextFilter(logging.Filter):
+    """Копирует контекст обновления в запись (в потоке, где запись создана)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, var in (("update_id", update_id_var), ("user_id", user_id_var), ("handler", handler_var)):
+            if not hasattr(record, name):
+                setattr(record, name, var.get())
+        return True
+
+
+class LoopQueueHandler(QueueHandler):
+    """Кладёт запись в очередь без форматирования
+
+    Стандартный QueueHandler форматирует запись и трассировку ещё в цикле событий;
+    здесь в цикле только подставляются аргументы сообщения, остальное делает поток
+    QueueListener. Запись не покидает процесс, поэтому exc_info можно передать как есть.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON"""
+
+    def __init__(self, static_fields: dict = None):
+        super().__init__()
+        self.static_fields = static_fields or {}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **self.static_fields,
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Прежний текстовый формат, контекст обновления и поля - в конце строки"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        extra = {name: getattr(record, name, None) for name in CONTEXT_FIELDS}
+        extra.update(getattr(record, "fields", None) or {})
+        suffix = " ".join(f"{name}={value}" for name, value in extra.items() if value is not None)
+        if not suffix:
+            return text
+        first, _, rest = text.partition("\n")
+        return f"{first} [{suffix}]" + (f"\n{rest}" if rest else "")
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, static_fields: dict = None,
+                  text_format: str = TEXT_FORMAT) -> QueueListener:
+    """Корневой логгер пишет через очередь: форматирование и вывод - в отдельном потоке
+
+    static_fields добавляются в каждую JSON-запись (например, номер воркера).
+    Поток останавливается при выходе из процесса, оставшиеся записи дописываются.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter(static_fields) if fmt == "json" else TextFormatter(text_format))
+
+    log_queue = queue.SimpleQueue()
+    handler = LoopQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    # aiogram пишет строку на каждое обновление; её заменяет запись updates с выборкой
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Дописать очередь и остановить поток логирования"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class UpdateContextMiddleware(BaseMiddleware):
+    """update_id и user_id в контекст логов (внешний middleware обновлений)"""
+
+    async def __call__(self, handler, event: Update, data: dict):
+        user = data.get("event_from_user")
+        update_token = update_id_var.set(event.update_id)
+        user_token = user_id_var.set(user.id if user else None)
+        try:
+            return await handler(event, data)
+        finally:
+            user_id_var.reset(user_token)
+            update_id_var.reset(update_token)
+
+
+class HandlerLogMiddleware(BaseMiddleware):
+    """Запись об обработанном событии: обработчик и время (внутренний middleware)
+
+    Частые обработчики (LOG_SAMPLE_RATES, например отметки переклички) пишутся
+    выборочно, доля - в поле sample_rate. Ошибки пишутся всегда.
+    """
+
+    def __init__(self, event: str, sample_rates: dict = None):
+        self.event = event
+        self.sample_rates = LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+
+    async def __call__(self, handler, event, data: dict):
+        name = handler_label(data)
+        token = handler_var.set(name)
+        start = time.perf_counter()
+        error = None
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            handler_var.reset(token)
+            rate = self.sample_rates.get(name, 1.0)
+            if error is not None or rate >= 1 or random.random() < rate:
+                fields = {"event": self.event, "duration_ms": round(duration * 1000, 2)}
+                if rate < 1:
+                    fields["sample_rate"] = rate
+                if error is not None:
+                    fields["error"] = error
+                updates_logger.log(logging.WARNING if error else logging.INFO, "handled",
+                                   extra={"handler": name, "fields": fields})
+
+
+def setup_update_logging(dp):
+    """Контекст обновления для всех записей и запись о каждом обработанном событии"""
+    # Первым: флуд и склейка нажатий тоже пишутся с пользователем
+    dp.update.outer_middleware(UpdateContextMiddleware())
+    for event in ("message", "callback_query"):
+        dp.observers[event].middleware(HandlerLogMiddleware(event))
@@ -1,31 +1,107 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import BOT_TOKEN
+from audit import audit
+from backup import backups, setup_backups
+from callback_dispatch import callbacks
+from background import background
+from concurrency import update_concurrency
+from config import BOT_MODE, BOT_TOKEN, WORKERS
 from database import db
 from handlers import router, set_notification_service
 from admin_handlers import admin_router
 from admin_edit_handlers import admin_edit_router  # РОУТЕР ДЛЯ РЕДАКТИРОВАНИЯ (ТОЛЬКО ГЛАВНЫЙ ТРЕНЕР)
 from registration_handlers import registration_router
 from notifications import NotificationService
-from daily_reports import schedule_daily_reports
+from daily_reports import setup_daily_reports
+from retention import setup_retention
+from scheduler import Scheduler
 from cashier_handlers import cashier_router
 from parent_handlers import parent_router
 # from parent_edit_handlers import parent_edit_router  # УДАЛЕНО - родители не редактируют
 from payment_handlers import payment_router
 from reports_handlers import reports_router
 from unknown_hanlders import unknown_router
+from lifecycle import lifecycle
+from logging_setup import setup_logging, setup_update_logging
+from metrics import instrument_dispatcher, metrics, start_server as start_metrics_server, telegram_metrics
+from pdf_reports import cache_stats as pdf_cache_stats, shutdown_pdf_pool
+from sqlite_storage import SQLiteStorage
+from throttling import throttling
+from watchdog import watchdog
+from webhook import WebhookSetupError, run_webhook
+from workers import run_workers
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
+def build_dispatcher(storage) -> Dispatcher:
+    """Диспетчер со всеми роутерами"""
+    dp = Dispatcher(storage=storage)
+
+    # update_id, user_id и обработчик в каждой записи лога
+    setup_update_logging(dp)
+    # Повторные нажатия и флуд отсекаются до очереди чата
+    dp.update.outer_middleware(throttling)
+    # Обновления разных чатов - параллельно, одного чата - по очереди
+    dp.update.outer_middleware(update_concurrency)
+    dp.startup.register(update_concurrency.start_reporting)
+    dp.shutdown.register(update_concurrency.stop_reporting)
+    # Время обработчиков и состояние очередей и кэшей для /metrics
+    instrument_dispatcher(dp)
+    # Блокировки цикла событий: стек и обработчик в лог (WATCHDOG_STALL_MS)
+    watchdog.instrument(dp)
+    metrics.export_stats("bot_updates", update_concurrency.stats, "Очередь обновлений")
+    metrics.export_stats("bot_throttling", throttling.stats, "Отброшенные нажатия")
+    metrics.export_stats("bot_background", background.stats, "Фоновые задачи")
+    metrics.export_stats("bot_fsm", storage.stats, "Состояния FSM в памяти")
+    metrics.export_stats("bot_callback_parse_cache", callbacks.cache_stats, "Кэш разбора callback_data")
+    metrics.export_stats("bot_pdf_cache", pdf_cache_stats, "Кэш PDF-отчётов")
+    metrics.export_stats("bot_loop", watchdog.stats, "Сторож цикла событий")
+    metrics.export_stats("bot_audit", audit.stats, "Журнал действий")
+
+    # Все callback-кнопки: разбор callback_data по таблице, порядок роутеров на них не влияет
+    dp.include_router(callbacks.router)
+    for problem in callbacks.check():
+        logger.warning(f"Неоднозначный callback: {problem}")
+
+    # Регистрируем роутеры сообщений (ВАЖЕН ПОРЯДОК!)
+    dp.include_router(admin_edit_router)  # ПЕРВЫМ - редактирование админских сущностей (только главный тренер)
+    dp.include_router(admin_router)  # Основные админские обработчики
+    dp.include_router(registration_router)  # Регистрационные обработчики
+    dp.include_router(cashier_router)  # Обработчики кассира
+    # dp.include_router(parent_edit_router)  # УДАЛЕНО - родители больше не редактируют
+    dp.include_router(parent_router)  # Основные обработчики родителей
+    dp.include_router(payment_router)  # Обработчики оплат
+    dp.include_router(reports_router)  # Обработчики отчетов
+    dp.include_router(router)  # Основные обработчики
+    dp.include_router(unknown_router)  # ПОСЛЕДНИМ - обработчик неизвестных команд
+
+    return dp
+
+
+async def run_polling(dp: Dispatcher, bot: Bot):
+    # Снимаем вебхук, если бот раньше работал в режиме webhook, иначе getUpdates не работает
+    await bot.delete_webhook()
+    # Сигналы и закрытие сессии бота - забота lifecycle: сессия нужна до конца рассылок
+    await dp.start_polling(bot, handle_signals=False, close_bot_session=False)
+
+
+async def serve(dp: Dispatcher, bot: Bot):
+    """Приём обновлений в выбранном режиме"""
+    if WORKERS > 1:
+        await run_workers(bot, dp, WORKERS)
+    elif BOT_MODE == "webhook":
+        try:
+            await run_webhook(dp, bot)
+        except WebhookSetupError as e:
+            logger.error(f"❌ Не удалось установить вебхук: {e}. Переходим на polling")
+            await run_polling(dp, bot)
+    else:
+        await run_polling(dp, bot)
+
+
 async def main():
     """Основная функция запуска бота"""
 
@@ -36,8 +112,9 @@ async def main():
 
     # Инициализируем бот и диспетчер
     bot = Bot(token=BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    bot.session.middleware(telegram_metrics)
+    storage = SQLiteStorage()
+    dp = build_dispatcher(storage)
 
     # Инициализируем базу данных
     try:
@@ -47,36 +124,48 @@ async def main():
         logger.error(f"❌ Ошибка инициализации базы данных: {e}")
         return
 
+    # Восстанавливаем незавершённые диалоги (FSM) после перезапуска.
+    # В многопроцессном режиме состояния загружают сами воркеры
+    if WORKERS <= 1:
+        await storage.start()
+
     # Инициализируем сервис уведомлений
     notification_service = NotificationService(bot)
     set_notification_service(notification_service)
 
-    # Регистрируем роутеры (ВАЖЕН ПОРЯДОК!)
-    dp.include_router(admin_edit_router)  # ПЕРВЫМ - редактирование админских сущностей (только главный тренер)
-    dp.include_router(admin_router)  # Основные админские обработчики
-    dp.include_router(registration_router)  # Регистрационные обработчики
-    dp.include_router(cashier_router)  # Обработчики кассира
-    # dp.include_router(parent_edit_router)  # УДАЛЕНО - родители больше не редактируют
-    dp.include_router(parent_router)  # Основные обработчики родителей
-    dp.include_router(payment_router)  # Обработчики оплат
-    dp.include_router(reports_router)  # Обработчики отчетов
-    dp.include_router(router)  # Основные обработчики
-    dp.include_router(unknown_router)  # ПОСЛЕДНИМ - обработчик неизвестных команд
+    # Запускаем планировщик задач (ежедневный отчёт, перенос старой истории в архив, резервная копия) в фоне
+    scheduler = Scheduler()
+    setup_daily_reports(scheduler, bot)
+    setup_retention(scheduler)
+    setup_backups(scheduler)
+    metrics.export_stats("bot_backup", backups.stats, "Резервные копии базы")
+    lifecycle.start_service("scheduler", scheduler.run(), stop=scheduler.stop)
 
-    # Запускаем планировщик ежедневных отчётов в фоне
-    asyncio.create_task(schedule_daily_reports(bot))
+    # Порядок остановки: дождаться обновлений и рассылок, затем сбросить данные и закрыть ресурсы
+    lifecycle.on_drain("updates", update_concurrency.wait_idle)
+    lifecycle.on_drain("background", background.drain)
+    lifecycle.on_close("fsm", storage.close)
+    lifecycle.on_close("audit", audit.close)
+    lifecycle.on_close("pdf", lambda: asyncio.to_thread(shutdown_pdf_pool))
+    lifecycle.on_close("db", db.close)
+    lifecycle.on_close("bot", bot.session.close)
+    metrics_runner = await start_metrics_server()
+    if metrics_runner is not None:
+        lifecycle.on_close("metrics", metrics_runner.cleanup)
+    lifecycle.install_signal_handlers()
 
     try:
-        logger.info("🚀 Бот запущен! Редактирование доступно только главному тренеру!")
-        await dp.start_polling(bot)
-    except KeyboardInterrupt:
+        logger.info(f"🚀 Бот запущен в режиме {BOT_MODE}! Редактирование доступно только главному тренеру!")
+        await lifecycle.serve(serve(dp, bot), stop_serving=dp.stop_polling)
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("🛑 Остановка бота...")
     finally:
-        await db.close()
-        await bot.session.close()
+        await lifecycle.shutdown()
 
 
 if __name__ == '__main__':
+    # Логи через очередь: форматирование и запись - не в цикле событий
+    setup_logging()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,262 @@
+import bisect
+import logging
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiohttp import web
+
+from config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, сек
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # кортеж значений меток -> значение
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # [число попаданий в каждую корзину (последняя - +Inf), сумма]
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        bounds = self.buckets + (float("inf"),)
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """Метрики процесса в текстовом формате Prometheus
+
+    Метрики меняются только из цикла событий, поэтому обходятся без блокировок.
+    Состояние очередей и кэшей не дублируется в счётчиках: функции export_stats
+    вызываются при каждом запросе /metrics и читают stats() компонентов.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._stats = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def export_stats(self, prefix: str, stats, documentation: str):
+        """Каждое числовое поле словаря stats() - отдельная метрика {prefix}_{поле}"""
+        self._stats.append((prefix, stats, documentation))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for prefix, stats, documentation in self._stats:
+            try:
+                values = stats()
+            except Exception:
+                logger.exception(f"Не удалось получить статистику {prefix}")
+                continue
+            for field, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{field}"
+                lines.append(f"# HELP {name} {documentation}: {field}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+handler_seconds = metrics.histogram(
+    "bot_handler_seconds", "Время работы обработчика", ("event", "handler")
+)
+handler_errors = metrics.counter(
+    "bot_handler_errors_total", "Исключения в обработчиках", ("event", "handler", "error")
+)
+db_query_seconds = metrics.histogram(
+    "bot_db_query_seconds", "Время SQL-запроса вместе с чтением результата", ("query",), DB_BUCKETS
+)
+db_query_errors = metrics.counter(
+    "bot_db_query_errors_total", "Ошибки SQL-запросов", ("query", "error")
+)
+db_slow_queries = metrics.counter(
+    "bot_db_slow_queries_total", "Запросы дольше SLOW_QUERY_MS", ("query",)
+)
+telegram_seconds = metrics.histogram(
+    "bot_telegram_request_seconds", "Время запроса к Telegram Bot API", ("method",)
+)
+telegram_errors = metrics.counter(
+    "bot_telegram_errors_total", "Ошибки запросов к Telegram Bot API", ("method", "error")
+)
+loop_lag_seconds = metrics.histogram(
+    "bot_loop_lag_seconds", "Опоздание пульса цикла событий", (), LAG_BUCKETS
+)
+loop_stalls = metrics.counter(
+    "bot_loop_stalls_total", "Блокировки цикла событий дольше WATCHDOG_STALL_MS", ("handler",)
+)
+
+
+def handler_label(data: dict) -> str:
+    """Имя обработчика для метрик: действие callback-кнопки или имя функции"""
+    route = data.get("callback_route")
+    if route is not None:
+        return route.action
+    handler_object = data.get("handler")
+    return getattr(handler_object.callback, "__name__", "unknown") if handler_object else "unknown"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Время работы обработчиков (внутренний middleware диспетчера)
+
+    Для callback-кнопок меткой служит имя действия из таблицы callback_dispatch,
+    для остальных событий - имя функции обработчика.
+    """
+
+    def __init__(self, event: str):
+        self.event = event
+
+    async def __call__(self, handler, event, data: dict):
+        name = handler_label(data)
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors.inc(event=self.event, handler=name, error=type(e).__name__)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, event=self.event, handler=name)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Время и ошибки запросов к Bot API (middleware сессии бота)"""
+
+    async def __call__(self, make_request, bot, method):
+        name = getattr(method, "__api_method__", type(method).__name__)
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            telegram_errors.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            telegram_seconds.observe(time.perf_counter() - start, method=name)
+
+
+telegram_metrics = TelegramMetricsMiddleware()
+
+
+def instrument_dispatcher(dp):
+    for event in ("message", "callback_query"):
+        dp.observers[event].middleware(HandlerMetricsMiddleware(event))
+
+
+async def _metrics_view(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """HTTP-сервер с /metrics внутри процесса бота; None, если порт не задан
+
+    Возвращает AppRunner: остановка - runner.cleanup().
+    """
+    if not port:
+        return None
+
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_view)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host=host, port=port).start()
+    except OSError as e:
+        logger.error(f"❌ Не удалось открыть порт метрик {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
@@ -1,10 +1,13 @@
 import asyncio
+import logging
 import aiosqlite
 import aiohttp
 from datetime import datetime
 from aiogram import Bot
 from database import db
 
+logger = logging.getLogger(__name__)
+
 
 class NotificationService:
     def __init__(self, bot: Bot):
@@ -74,14 +77,14 @@ class NotificationService:
             return f"Координаты: {latitude:.6f}, {longitude:.6f}"
 
         except Exception as e:
-            print(f"Ошибка получения адреса: {e}")
+            logger.warning(f"Ошибка получения адреса: {e}")
             return f"Координаты: {latitude:.6f}, {longitude:.6f}"
 
     async def notify_session_started(self, session_id: int, session_type: str):
         """Уведомление о начале тренировки/игры"""
         try:
             # Получаем информацию о сессии
-            async with aiosqlite.connect(db.db_path) as conn:
+            async with db.connect() as conn:
                 conn.row_factory = aiosqlite.Row
                 async with conn.execute(
                         """SELECT s.*, g.name as group_name, b.name as branch_name, t.full_name as trainer_name
@@ -138,22 +141,22 @@ class NotificationService:
                     child_message = f"👶 Ребёнок: {child['full_name']}\n\n{message}"
                     await self.bot.send_message(child['parent_telegram_id'], child_message)
                 except Exception as e:
-                    print(f"Ошибка отправки родителю {child['parent_telegram_id']}: {e}")
+                    logger.warning(f"Ошибка отправки родителю {child['parent_telegram_id']}: {e}")
 
             # Отправляем главному тренеру
             for trainer in main_trainers:
                 try:
                     await self.bot.send_message(trainer['telegram_id'], message)
                 except Exception as e:
-                    print(f"Ошибка отправки главному тренеру {trainer['telegram_id']}: {e}")
+                    logger.warning(f"Ошибка отправки главному тренеру {trainer['telegram_id']}: {e}")
 
-        except Exception as e:
-            print(f"Ошибка в notify_session_started: {e}")
+        except Exception:
+            logger.exception("Ошибка в notify_session_started")
 
     async def notify_session_ended(self, session_id: int):
         """Уведомление о завершении тренировки/игры"""
         try:
-            async with aiosqlite.connect(db.db_path) as conn:
+            async with db.connect() as conn:
                 conn.row_factory = aiosqlite.Row
                 async with conn.execute(
                         """SELECT s.*, g.name as group_name, b.name as branch_name, t.full_name as trainer_name
@@ -208,22 +211,22 @@ class NotificationService:
                     child_message = f"👶 Ребёнок: {child['full_name']}\n\n{message}"
                     await self.bot.send_message(child['parent_telegram_id'], child_message)
                 except Exception as e:
-                    print(f"Ошибка отправки родителю: {e}")
+                    logger.warning(f"Ошибка отправки родителю: {e}")
 
             # Отправляем главному тренеру
             for trainer in main_trainers:
                 try:
                     await self.bot.send_message(trainer['telegram_id'], message)
                 except Exception as e:
-                    print(f"Ошибка отправки главному тренеру: {e}")
+                    logger.warning(f"Ошибка отправки главному тренеру: {e}")
 
-        except Exception as e:
-            print(f"Ошибка в notify_session_ended: {e}")
+        except Exception:
+            logger.exception("Ошибка в notify_session_ended")
 
     async def notify_attendance(self, child_id: int, status: str, session_id: int):
         """Уведомление о посещаемости"""
         try:
-            async with aiosqlite.connect(db.db_path) as conn:
+            async with db.connect() as conn:
                 conn.row_factory = aiosqlite.Row
                 async with conn.execute(
                         """SELECT c.*, u.telegram_id as parent_telegram_id, s.type as session_type
@@ -245,13 +248,13 @@ class NotificationService:
 
                 await self.bot.send_message(child_info['parent_telegram_id'], message)
 
-        except Exception as e:
-            print(f"Ошибка в notify_attendance: {e}")
+        except Exception:
+            logger.exception("Ошибка в notify_attendance")
 
     async def notify_payment_received(self, child_id: int, amount: float, month_year: str):
         """Уведомление о получении оплаты"""
         try:
-            async with aiosqlite.connect(db.db_path) as conn:
+            async with db.connect() as conn:
                 conn.row_factory = aiosqlite.Row
                 async with conn.execute(
                         """SELECT c.*, u.telegram_id as parent_telegram_id 
@@ -301,15 +304,15 @@ class NotificationService:
                     try:
                         await self.bot.send_message(trainer['telegram_id'], trainer_message)
                     except Exception as e:
-                        print(f"Ошибка отправки главному тренеру: {e}")
+                        logger.warning(f"Ошибка отправки главному тренеру: {e}")
 
-        except Exception as e:
-            print(f"Ошибка в notify_payment_received: {e}")
+        except Exception:
+            logger.exception("Ошибка в notify_payment_received")
 
     async def notify_money_to_cashbox(self, trainer_id: int, total_amount: float):
         """Уведомление о сдаче денег в кассу"""
         try:
-            async with aiosqlite.connect(db.db_path) as conn:
+            async with db.connect() as conn:
                 conn.row_factory = aiosqlite.Row
                 async with conn.execute(
                         "SELECT full_name FROM trainers WHERE id = ?", (trainer_id,)
@@ -334,7 +337,7 @@ class NotificationService:
                     try:
                         await self.bot.send_message(trainer['telegram_id'], message)
                     except Exception as e:
-                        print(f"Ошибка отправки главному тренеру: {e}")
+                        logger.warning(f"Ошибка отправки главному тренеру: {e}")
 
-        except Exception as e:
-            print(f"Ошибка в notify_money_to_cashbox: {e}")
\ No newline at end of file
+        except Exception:
+            logger.exception("Ошибка в notify_money_to_cashbox")
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter
@@ -11,6 +12,8 @@ from database import db
 from keyboards import get_back_button, get_parent_menu
 from states import ParentStates
 
+logger = logging.getLogger(__name__)
+
 parent_edit_router = Router()
 
 
@@ -55,7 +58,7 @@ async def my_child_info(callback: CallbackQuery):
     user = await db.get_user_by_telegram_id(callback.from_user.id)
 
     # Проверяем, что это действительно ребёнок этого родителя
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT c.full_name, g.name as group_name, b.name as branch_name,
@@ -142,7 +145,7 @@ async def edit_my_child_name_start(callback: CallbackQuery, state: FSMContext):
     user = await db.get_user_by_telegram_id(callback.from_user.id)
 
     # Проверяем права доступа
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT full_name FROM children WHERE id = ? AND parent_id = ?",
@@ -176,7 +179,7 @@ async def process_edit_my_child_name(message: Message, state: FSMContext):
     user = await db.get_user_by_telegram_id(message.from_user.id)
 
     # Обновляем имя ребёнка
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         await conn.execute(
             "UPDATE children SET full_name = ? WHERE id = ? AND parent_id = ?",
             (new_name, data['editing_my_child_id'], user['id'])
@@ -186,7 +189,7 @@ async def process_edit_my_child_name(message: Message, state: FSMContext):
     # Уведомляем администратора об изменении
     from handlers import notification_service
     if notification_service:
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     "SELECT telegram_id FROM users WHERE role = 'main_trainer' AND is_active = TRUE"
@@ -203,7 +206,7 @@ async def process_edit_my_child_name(message: Message, state: FSMContext):
                     f"👶 Новое имя: {new_name}"
                 )
             except Exception as e:
-                print(f"Ошибка отправки уведомления главному тренеру: {e}")
+                logger.warning(f"Ошибка отправки уведомления главному тренеру: {e}")
 
     await message.answer(
         f"✅ Имя ребёнка обновлено!\n\n"
@@ -222,7 +225,7 @@ async def delete_my_child_confirm(callback: CallbackQuery):
     child_id = int(callback.data.split("_")[3])
     user = await db.get_user_by_telegram_id(callback.from_user.id)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT c.full_name, g.name as group_name
@@ -271,7 +274,7 @@ async def confirm_delete_my_child(callback: CallbackQuery):
     child_id = int(callback.data.split("_")[4])
     user = await db.get_user_by_telegram_id(callback.from_user.id)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT full_name FROM children WHERE id = ? AND parent_id = ?",
@@ -286,7 +289,7 @@ async def confirm_delete_my_child(callback: CallbackQuery):
     # Уведомляем администратора об удалении
     from handlers import notification_service
     if notification_service:
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     "SELECT telegram_id FROM users WHERE role = 'main_trainer' AND is_active = TRUE"
@@ -302,7 +305,7 @@ async def confirm_delete_my_child(callback: CallbackQuery):
                     f"👶 Удалён ребёнок: {child['full_name']}"
                 )
             except Exception as e:
-                print(f"Ошибка отправки уведомления главному тренеру: {e}")
+                logger.warning(f"Ошибка отправки уведомления главному тренеру: {e}")
 
     await callback.message.edit_text(
         f"✅ Ребёнок '{child['full_name']}' удален из системы.\n\n"
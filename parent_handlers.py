@@ -1,4 +1,5 @@
-from aiogram import Router, F
+import logging
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
@@ -7,15 +8,22 @@ from aiogram.types import InlineKeyboardButton
 import aiosqlite
 from datetime import date, timedelta, datetime
 
+from callback_data import (
+    ADD_CHILD_REQUEST, ATTENDANCE_HISTORY, BACK_TO_MENU, CHILD_ATTENDANCE, CHILD_PAYMENTS,
+    MY_CHILDREN, PAYMENT_HISTORY
+)
+from callback_dispatch import callbacks
 from config import ROLE_PARENT
 from database import db
 from keyboards import get_back_button, get_parent_menu
 from states import ParentStates
 
+logger = logging.getLogger(__name__)
+
 parent_router = Router()
 
 
-@parent_router.callback_query(F.data == "my_children")
+@callbacks.route(MY_CHILDREN)
 async def my_children_handler(callback: CallbackQuery):
     """Мои дети с кнопкой добавления"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -24,9 +32,9 @@ async def my_children_handler(callback: CallbackQuery):
     if not children:
         keyboard = InlineKeyboardBuilder()
         keyboard.row(
-            InlineKeyboardButton(text="➕ Добавить ребёнка", callback_data="add_child_request")
+            InlineKeyboardButton(text="➕ Добавить ребёнка", callback_data=ADD_CHILD_REQUEST.pack())
         )
-        keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+        keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
         await callback.message.edit_text(
             "У вас нет зарегистрированных детей.\n\n"
@@ -43,14 +51,14 @@ async def my_children_handler(callback: CallbackQuery):
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="➕ Добавить ребёнка", callback_data="add_child_request")
+        InlineKeyboardButton(text="➕ Добавить ребёнка", callback_data=ADD_CHILD_REQUEST.pack())
     )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(text, reply_markup=keyboard.as_markup())
 
 
-@parent_router.callback_query(F.data == "add_child_request")
+@callbacks.route(ADD_CHILD_REQUEST)
 async def add_child_request_handler(callback: CallbackQuery, state: FSMContext):
     """Запрос на добавление ребёнка"""
     await state.set_state(ParentStates.requesting_child_name)
@@ -69,7 +77,7 @@ async def process_child_name_request(message: Message, state: FSMContext):
     user = await db.get_user_by_telegram_id(message.from_user.id)
 
     # Отправляем уведомление администраторам (главным тренерам)
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT telegram_id FROM users WHERE role = 'main_trainer' AND is_active = TRUE"
@@ -93,7 +101,7 @@ async def process_child_name_request(message: Message, state: FSMContext):
             await message.bot.send_message(trainer['telegram_id'], notification)
             sent_count += 1
         except Exception as e:
-            print(f"Ошибка отправки уведомления главному тренеру {trainer['telegram_id']}: {e}")
+            logger.warning(f"Ошибка отправки уведомления главному тренеру {trainer['telegram_id']}: {e}")
 
     if sent_count > 0:
         await message.answer(
@@ -113,7 +121,7 @@ async def process_child_name_request(message: Message, state: FSMContext):
     await state.clear()
 
 
-@parent_router.callback_query(F.data == "attendance_history")
+@callbacks.route(ATTENDANCE_HISTORY)
 async def attendance_history_handler(callback: CallbackQuery):
     """История посещаемости"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -136,10 +144,10 @@ async def attendance_history_handler(callback: CallbackQuery):
             keyboard.row(
                 InlineKeyboardButton(
                     text=f"👶 {child['full_name']}",
-                    callback_data=f"child_attendance_{child['id']}"
+                    callback_data=CHILD_ATTENDANCE.pack(child['id'])
                 )
             )
-        keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+        keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
         await callback.message.edit_text(
             "👶 Выберите ребёнка для просмотра посещаемости:",
@@ -147,13 +155,12 @@ async def attendance_history_handler(callback: CallbackQuery):
         )
 
 
-@parent_router.callback_query(F.data.startswith("child_attendance_"))
-async def child_attendance_handler(callback: CallbackQuery):
+@callbacks.route(CHILD_ATTENDANCE)
+async def child_attendance_handler(callback: CallbackQuery, child_id: int):
     """Показать посещаемость конкретного ребёнка"""
-    child_id = int(callback.data.split("_")[2])
 
     # Получаем информацию о ребёнке
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT full_name FROM children WHERE id = ?", (child_id,)
@@ -168,7 +175,7 @@ async def show_child_attendance(callback: CallbackQuery, child_id: int, child_na
     """Показать посещаемость ребёнка за последний месяц"""
     month_ago = date.today() - timedelta(days=30)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         # Получаем посещаемость за последний месяц
@@ -230,7 +237,7 @@ async def show_child_attendance(callback: CallbackQuery, child_id: int, child_na
     await callback.message.edit_text(text, reply_markup=get_back_button())
 
 
-@parent_router.callback_query(F.data == "payment_history")
+@callbacks.route(PAYMENT_HISTORY)
 async def payment_history_handler(callback: CallbackQuery):
     """История оплат"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -253,10 +260,10 @@ async def payment_history_handler(callback: CallbackQuery):
             keyboard.row(
                 InlineKeyboardButton(
                     text=f"👶 {child['full_name']}",
-                    callback_data=f"child_payments_{child['id']}"
+                    callback_data=CHILD_PAYMENTS.pack(child['id'])
                 )
             )
-        keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+        keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
         await callback.message.edit_text(
             "👶 Выберите ребёнка для просмотра истории оплат:",
@@ -264,13 +271,12 @@ async def payment_history_handler(callback: CallbackQuery):
         )
 
 
-@parent_router.callback_query(F.data.startswith("child_payments_"))
-async def child_payments_handler(callback: CallbackQuery):
+@callbacks.route(CHILD_PAYMENTS)
+async def child_payments_handler(callback: CallbackQuery, child_id: int):
     """Показать оплаты конкретного ребёнка"""
-    child_id = int(callback.data.split("_")[2])
 
     # Получаем информацию о ребёнке
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 "SELECT full_name FROM children WHERE id = ?", (child_id,)
@@ -283,7 +289,7 @@ async def child_payments_handler(callback: CallbackQuery):
 
 async def show_child_payments(callback: CallbackQuery, child_id: int, child_name: str):
     """Показать историю оплат ребёнка"""
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
 
         # Получаем все платежи ребёнка
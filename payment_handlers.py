@@ -1,12 +1,20 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardButton
 import aiosqlite
+import uuid
 from datetime import date
 
+from audit import audit
+from background import background
+from callback_data import (
+    AMOUNT, BACK_TO_MENU, CONFIRM_CASHBOX, CONFIRM_PAYMENT, CUSTOM_AMOUNT, MONTH, PAYMENT,
+    PAYMENT_CHILD, TO_CASHBOX
+)
+from callback_dispatch import callbacks
 from config import ROLE_TRAINER
 from database import db
 from keyboards import get_back_button, get_trainer_menu, get_amount_keyboard, get_month_keyboard
@@ -15,7 +23,7 @@ from states import PaymentStates
 payment_router = Router()
 
 
-@payment_router.callback_query(F.data == "payment")
+@callbacks.route(PAYMENT)
 async def payment_handler(callback: CallbackQuery):
     """Отметка оплаты - исправленная версия"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -29,7 +37,7 @@ async def payment_handler(callback: CallbackQuery):
         return
 
     # Получаем детей всех групп тренера одним запросом с именами групп
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT c.id, c.full_name, c.parent_id, c.group_id, c.created_at,
@@ -55,10 +63,10 @@ async def payment_handler(callback: CallbackQuery):
         keyboard.row(
             InlineKeyboardButton(
                 text=f"👶 {child['full_name']} ({child['group_name']})",
-                callback_data=f"payment_child_{child['id']}"
+                callback_data=PAYMENT_CHILD.pack(child['id'])
             )
         )
-    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data="back_to_menu"))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=BACK_TO_MENU.pack()))
 
     await callback.message.edit_text(
         "💰 Выберите ребёнка для отметки оплаты:",
@@ -66,13 +74,12 @@ async def payment_handler(callback: CallbackQuery):
     )
 
 
-@payment_router.callback_query(F.data.startswith("payment_child_"))
-async def select_child_for_payment(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(PAYMENT_CHILD)
+async def select_child_for_payment(callback: CallbackQuery, child_id: int, state: FSMContext):
     """Выбор ребёнка для оплаты"""
-    child_id = int(callback.data.split("_")[2])
 
     # Получаем информацию о ребёнке
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.connect() as conn:
         conn.row_factory = aiosqlite.Row
         async with conn.execute(
                 """SELECT c.full_name, g.name as group_name 
@@ -97,10 +104,9 @@ async def select_child_for_payment(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@payment_router.callback_query(F.data.startswith("amount_"), StateFilter(PaymentStates.waiting_for_amount))
-async def select_amount(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(AMOUNT, state=PaymentStates.waiting_for_amount)
+async def select_amount(callback: CallbackQuery, amount: int, state: FSMContext):
     """Выбор суммы оплаты"""
-    amount = int(callback.data.split("_")[1])
     data = await state.get_data()
 
     await state.update_data(amount=amount)
@@ -114,7 +120,7 @@ async def select_amount(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@payment_router.callback_query(F.data == "custom_amount", StateFilter(PaymentStates.waiting_for_amount))
+@callbacks.route(CUSTOM_AMOUNT, state=PaymentStates.waiting_for_amount)
 async def custom_amount_handler(callback: CallbackQuery, state: FSMContext):
     """Ввод произвольной суммы"""
     await state.set_state(PaymentStates.waiting_for_custom_amount)
@@ -149,13 +155,14 @@ async def process_custom_amount(message: Message, state: FSMContext):
     )
 
 
-@payment_router.callback_query(F.data.startswith("month_"), StateFilter(PaymentStates.waiting_for_month))
-async def select_month(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(MONTH, state=PaymentStates.waiting_for_month)
+async def select_month(callback: CallbackQuery, month_year: str, state: FSMContext):
     """Выбор месяца оплаты"""
-    month_year = callback.data.split("_")[1]  # Формат: 2025-01
     data = await state.get_data()
 
-    await state.update_data(month_year=month_year)
+    # Ключ оплаты создаётся при показе подтверждения: повторное нажатие
+    # или повтор после сбоя попадут в ту же запись, а не создадут вторую
+    await state.update_data(month_year=month_year, payment_key=uuid.uuid4().hex)
     await state.set_state(PaymentStates.confirming_payment)
 
     # Парсим месяц для читаемого формата
@@ -169,8 +176,8 @@ async def select_month(callback: CallbackQuery, state: FSMContext):
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="✅ Подтвердить", callback_data="confirm_payment"),
-        InlineKeyboardButton(text="❌ Отмена", callback_data="back_to_menu")
+        InlineKeyboardButton(text="✅ Подтвердить", callback_data=CONFIRM_PAYMENT.pack()),
+        InlineKeyboardButton(text="❌ Отмена", callback_data=BACK_TO_MENU.pack())
     )
 
     await callback.message.edit_text(
@@ -184,7 +191,7 @@ async def select_month(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@payment_router.callback_query(F.data == "confirm_payment", StateFilter(PaymentStates.confirming_payment))
+@callbacks.route(CONFIRM_PAYMENT, state=PaymentStates.confirming_payment, answer_first=True)
 async def confirm_payment(callback: CallbackQuery, state: FSMContext):
     """Подтверждение оплаты"""
     data = await state.get_data()
@@ -192,25 +199,19 @@ async def confirm_payment(callback: CallbackQuery, state: FSMContext):
     trainer = await db.get_trainer_by_user_id(user['id'])
 
     # Создаём запись об оплате
-    payment_id = await db.create_payment(
+    payment_id, created = await db.create_payment(
         data['child_id'],
         trainer['id'],
         data['amount'],
-        data['month_year']
+        data['month_year'],
+        idempotency_key=data.get('payment_key')
     )
-
-    # Отправляем уведомления
-    try:
-        from handlers_complete_fixed import notification_service
-        if notification_service:
-            await notification_service.notify_payment_received(
-                data['child_id'],
-                data['amount'],
-                data['month_year']
-            )
-    except ImportError:
-        # Если не удается импортировать, продолжаем без уведомлений
-        pass
+    if created:
+        audit.record(
+            "payment_created",
+            f"Payment: {payment_id}, Child: {data['child_id']}, Amount: {data['amount']:.0f}, Month: {data['month_year']}",
+            user_id=user['id']
+        )
 
     # Парсим месяц для отображения
     year, month = data['month_year'].split('-')
@@ -233,8 +234,20 @@ async def confirm_payment(callback: CallbackQuery, state: FSMContext):
 
     await state.clear()
 
+    # Уведомление родителям - в фоне
+    from handlers import notification_service
+    if notification_service and created:
+        background.spawn(
+            notification_service.notify_payment_received(
+                data['child_id'],
+                data['amount'],
+                data['month_year']
+            ),
+            name=f"notify_payment_received:{payment_id}"
+        )
 
-@payment_router.callback_query(F.data == "to_cashbox")
+
+@callbacks.route(TO_CASHBOX)
 async def to_cashbox_handler(callback: CallbackQuery):
     """Сдать деньги в кассу"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
@@ -258,11 +271,12 @@ async def to_cashbox_handler(callback: CallbackQuery):
         return
 
     total_amount = sum(payment['amount'] for payment in payments)
+    batch_id = await db.create_cashbox_batch(trainer['id'], payments, created_by=user['id'])
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="✅ Сдать в кассу", callback_data="confirm_cashbox"),
-        InlineKeyboardButton(text="❌ Отмена", callback_data="back_to_menu")
+        InlineKeyboardButton(text="✅ Сдать в кассу", callback_data=CONFIRM_CASHBOX.pack(batch_id)),
+        InlineKeyboardButton(text="❌ Отмена", callback_data=BACK_TO_MENU.pack())
     )
 
     text = f"💵 Сдача денег в кассу\n\n"
@@ -279,39 +293,46 @@ async def to_cashbox_handler(callback: CallbackQuery):
     await callback.message.edit_text(text, reply_markup=keyboard.as_markup())
 
 
-@payment_router.callback_query(F.data == "confirm_cashbox")
-async def confirm_cashbox(callback: CallbackQuery):
+@callbacks.route(CONFIRM_CASHBOX, answer_first=True)
+async def confirm_cashbox(callback: CallbackQuery, batch_id: int):
     """Подтверждение сдачи в кассу"""
     user = await db.get_user_by_telegram_id(callback.from_user.id)
     trainer = await db.get_trainer_by_user_id(user['id'])
 
-    # Получаем сумму перед переводом
-    payments = await db.get_payments_with_trainer(trainer['id'])
-    total_amount = sum(payment['amount'] for payment in payments)
+    batch = await db.get_cashbox_batch(batch_id)
+    if not batch or batch['trainer_id'] != trainer['id']:
+        await callback.message.edit_text("Нет денег для сдачи.", reply_markup=get_back_button())
+        return
 
-    if total_amount == 0:
+    # Переводим в кассу ровно те платежи, что были показаны
+    result = await db.confirm_cashbox_batch(batch_id, confirmed_by=user['id'])
+    if result == 'confirmed':
+        audit.record(
+            "cashbox_handover",
+            f"Batch: {batch_id}, Trainer: {trainer['id']}, Amount: {batch['total_amount']:.0f}, "
+            f"Payments: {batch['payment_count']}",
+            user_id=user['id']
+        )
+    if result == 'stale':
         await callback.message.edit_text(
-            "Нет денег для сдачи.",
+            "⚠️ Список платежей изменился. Откройте «Сдать в кассу» ещё раз.",
             reply_markup=get_back_button()
         )
         return
 
-    # Переводим все платежи в кассу
-    await db.move_payments_to_cashbox(trainer['id'])
-
-    # Отправляем уведомление
-    try:
-        from handlers_complete_fixed import notification_service
-        if notification_service:
-            await notification_service.notify_money_to_cashbox(trainer['id'], total_amount)
-    except ImportError:
-        # Если не удается импортировать, продолжаем без уведомлений
-        pass
-
+    total_amount = batch['total_amount']
     await callback.message.edit_text(
         f"✅ Деньги сданы в кассу!\n\n"
         f"💰 Сумма: {total_amount:.0f} сум\n"
         f"📅 Дата: {date.today().strftime('%d.%m.%Y')}\n\n"
         f"Администратор получил уведомление.",
         reply_markup=get_trainer_menu()
-    )
\ No newline at end of file
+    )
+
+    # Уведомление главному тренеру - в фоне, только при первом подтверждении
+    from handlers import notification_service
+    if notification_service and result == 'confirmed':
+        background.spawn(
+            notification_service.notify_money_to_cashbox(trainer['id'], total_amount),
+            name=f"notify_money_to_cashbox:{trainer['id']}"
+        )
\ No newline at end of file
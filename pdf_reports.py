@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# ВНИМАНИЕ: модуль импортируется в дочерних процессах пула,
+# поэтому на верхнем уровне здесь только stdlib и reportlab
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "pdf_cache")
+PDF_CACHE_MAX_FILES = int(os.getenv("PDF_CACHE_MAX_FILES", "200"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+
+# Шрифт с кириллицей: стандартная Helvetica её не содержит
+FONT_CANDIDATES = [
+    os.getenv("PDF_FONT_PATH", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+MONTHS_RU = {
+    '01': 'Январь', '02': 'Февраль', '03': 'Март', '04': 'Апрель',
+    '05': 'Май', '06': 'Июнь', '07': 'Июль', '08': 'Август',
+    '09': 'Сентябрь', '10': 'Октябрь', '11': 'Ноябрь', '12': 'Декабрь'
+}
+
+_executor = None
+# Ключ кэша -> путь к готовому файлу
+_cache_index = {}
+_inflight = {}
+# Файлы, которые сейчас отправляются: путь -> число пользователей. Очистка кэша
+# идёт в потоке и проверяет это под замком прямо перед удалением файла
+_in_use = {}
+_in_use_lock = threading.Lock()
+# Обращения к кэшу: готовый файл, ожидание такого же рендеринга, новый рендеринг
+_cache_stats = {'hits': 0, 'shared': 0, 'misses': 0}
+
+
+# РЕНДЕРИНГ (выполняется в дочернем процессе)
+
+def _register_font():
+    for path in FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            if "ReportFont" not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(TTFont("ReportFont", path))
+            return "ReportFont"
+    return "Helvetica"
+
+
+def _month_title(month: str) -> str:
+    year, month_num = month.split("-")
+    return f"{MONTHS_RU.get(month_num, month_num)} {year}"
+
+
+def _table(rows, font):
+    table = Table(rows, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#DDEBF7")),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+    ]))
+    return table
+
+
+def _bar_chart(title, values, font, bar_color):
+    """Столбчатая диаграмма по дням месяца"""
+    drawing = Drawing(17 * cm, 6 * cm)
+    chart = VerticalBarChart()
+    chart.x = 1 * cm
+    chart.y = 1 * cm
+    chart.width = 15.5 * cm
+    chart.height = 4.2 * cm
+    chart.data = [values or [0]]
+    chart.categoryAxis.categoryNames = [str(day) for day in range(1, len(values) + 1)]
+    chart.categoryAxis.labels.fontName = font
+    chart.categoryAxis.labels.fontSize = 6
+    chart.valueAxis.labels.fontName = font
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.valueMin = 0
+    chart.bars[0].fillColor = bar_color
+    drawing.add(chart)
+    drawing.add(String(1 * cm, 5.5 * cm, title, fontName=font, fontSize=10))
+    return drawing
+
+
+def _branch_story(data, font, styles):
+    story = [
+        Paragraph(f"Отчёт по филиалам: {_month_title(data['month'])}", styles["title"]),
+        Spacer(1, 0.4 * cm),
+    ]
+
+    rows = [["Филиал", "Занятий", "Трен.", "Игр", "Детей", "Посещ., %", "Оплаты, сум"]]
+    for branch in data['branches']:
+        rows.append([
+            branch['name'], branch['sessions'], branch['trainings'], branch['games'],
+            branch['unique_children'], f"{branch['attendance_rate']:.1f}", f"{branch['income']:.0f}",
+        ])
+    story.append(_table(rows, font))
+    story.append(Spacer(1, 0.6 * cm))
+
+    daily_rates = [
+        round(present * 100.0 / marks, 1) if marks else 0
+        for present, marks in zip(data['daily_present'], data['daily_marks'])
+    ]
+    story.append(_bar_chart("Посещаемость по дням, %", daily_rates, font, colors.HexColor("#4472C4")))
+    story.append(Spacer(1, 0.4 * cm))
+    story.append(_bar_chart("Присутствовало детей по дням", data['daily_present'], font,
+                            colors.HexColor("#70AD47")))
+    return story
+
+
+def _trainer_story(data, font, styles):
+    story = [
+        Paragraph(f"Отчёт тренера: {data['trainer_name']}", styles["title"]),
+        Paragraph(f"{data['branch_name']}, {_month_title(data['month'])}", styles["normal"]),
+        Spacer(1, 0.4 * cm),
+    ]
+
+    rows = [["Группа", "Занятий", "Посещ., %"]]
+    for group in data['groups']:
+        rows.append([group['name'], group['sessions'], f"{group['attendance_rate']:.1f}"])
+    story.append(_table(rows, font))
+    story.append(Spacer(1, 0.4 * cm))
+    story.append(Paragraph(
+        f"Принято оплат: {data['payments_count']} на сумму {data['income']:.0f} сум", styles["normal"]
+    ))
+    story.append(Spacer(1, 0.6 * cm))
+    story.append(_bar_chart("Занятий по дням", data['daily_sessions'], font, colors.HexColor("#4472C4")))
+    story.append(Spacer(1, 0.4 * cm))
+    story.append(_bar_chart("Присутствовало детей по дням", data['daily_present'], font,
+                            colors.HexColor("#70AD47")))
+    return story
+
+
+STORY_BUILDERS = {
+    "branches": _branch_story,
+    "trainer": _trainer_story,
+}
+
+
+def render_pdf(report_type: str, data: dict, path: str) -> str:
+    """Рендеринг PDF в файл (CPU-тяжёлая часть, запускается в пуле процессов)"""
+    font = _register_font()
+    base = getSampleStyleSheet()
+    styles = {
+        "title": base["Title"].clone("ReportTitle", fontName=font),
+        "normal": base["Normal"].clone("ReportNormal", fontName=font),
+    }
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    doc = SimpleDocTemplate(tmp_path, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm,
+                            topMargin=1.5 * cm, bottomMargin=1.5 * cm)
+    doc.build(STORY_BUILDERS[report_type](data, font, styles))
+    os.replace(tmp_path, path)
+    return path
+
+
+# КЭШ И ПУЛ ПРОЦЕССОВ (основной процесс)
+
+def data_version(data: dict) -> str:
+    """Версия данных - хэш подготовленных данных: изменились данные - изменился ключ"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: форк процесса с работающим event loop и потоками aiosqlite небезопасен
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _evict_old_files() -> list:
+    """Удаление самых давно использованных файлов сверх PDF_CACHE_MAX_FILES (в потоке);
+    возвращает удалённые пути"""
+    files = [
+        os.path.join(PDF_CACHE_DIR, name)
+        for name in os.listdir(PDF_CACHE_DIR) if name.endswith(".pdf")
+    ]
+    if len(files) <= PDF_CACHE_MAX_FILES:
+        return []
+    mtimes = {}
+    for path in files:
+        try:
+            mtimes[path] = os.path.getmtime(path)
+        except OSError:
+            pass
+    removed = []
+    for path in sorted(mtimes, key=mtimes.get)[:len(mtimes) - PDF_CACHE_MAX_FILES]:
+        with _in_use_lock:
+            if path in _in_use:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        removed.append(path)
+    return removed
+
+
+def _acquire(path: str):
+    with _in_use_lock:
+        _in_use[path] = _in_use.get(path, 0) + 1
+
+
+def _release(path: str):
+    with _in_use_lock:
+        if _in_use[path] > 1:
+            _in_use[path] -= 1
+        else:
+            del _in_use[path]
+
+
+async def _ensure_pdf(key: tuple, path: str, report_type: str, data: dict):
+    if os.path.exists(path):
+        # Готовый файл (в том числе с прошлого запуска бота). Время изменения -
+        # время последнего использования: очистка удаляет давно не нужные файлы
+        _cache_index[key] = path
+        _cache_stats['hits'] += 1
+        os.utime(path)
+        return
+
+    # Одинаковые одновременные запросы ждут один и тот же рендеринг
+    future = _inflight.get(key)
+    if future is None:
+        _cache_stats['misses'] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_executor(), render_pdf, report_type, data, path)
+        _inflight[key] = future
+        try:
+            await future
+        finally:
+            _inflight.pop(key, None)
+        _cache_index[key] = path
+        removed = set(await asyncio.to_thread(_evict_old_files))
+        for old_key in [old_key for old_key, old_path in _cache_index.items() if old_path in removed]:
+            del _cache_index[old_key]
+    else:
+        _cache_stats['shared'] += 1
+        await future
+
+
+@asynccontextmanager
+async def cached_pdf(report_type: str, period: str, data: dict):
+    """Путь к PDF-отчёту: из кэша по (тип, период, версия данных) или свежеотрендеренный
+
+    async with cached_pdf(...) as path: пока блок не завершён, очистка кэша файл не удалит.
+    """
+    key = (report_type, period, data_version(data))
+    path = os.path.join(PDF_CACHE_DIR, "_".join(key).replace("/", "-") + ".pdf")
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    _acquire(path)
+    try:
+        await _ensure_pdf(key, path, report_type, data)
+        yield path
+    finally:
+        _release(path)
+
+
+def cache_stats() -> dict:
+    """Счётчики кэша PDF и число файлов в индексе"""
+    return dict(_cache_stats, files=len(_cache_index))
+
+
+def shutdown_pdf_pool():
+    """Остановка пула процессов рендеринга"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter, Command
 from aiogram.fsm.context import FSMContext
@@ -6,6 +6,10 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardButton
 import aiosqlite
 
+from callback_data import (
+    BACK_TO_REGISTRATION, ROLE
+)
+from callback_dispatch import callbacks
 from config import ROLE_TRAINER, ROLE_PARENT, ROLE_CASHIER
 from database import db
 from keyboards import get_trainer_menu, get_parent_menu, get_cashier_menu, get_back_button
@@ -25,11 +29,11 @@ async def register_start(message: Message, state: FSMContext):
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="👨‍🏫 Тренер", callback_data="role_trainer"),
-        InlineKeyboardButton(text="👤 Родитель", callback_data="role_parent")
+        InlineKeyboardButton(text="👨‍🏫 Тренер", callback_data=ROLE.pack("trainer")),
+        InlineKeyboardButton(text="👤 Родитель", callback_data=ROLE.pack("parent"))
     )
     keyboard.row(
-        InlineKeyboardButton(text="💰 Кассир", callback_data="role_cashier")
+        InlineKeyboardButton(text="💰 Кассир", callback_data=ROLE.pack("cashier"))
     )
 
     await message.answer(
@@ -41,10 +45,9 @@ async def register_start(message: Message, state: FSMContext):
     await state.set_state(RegistrationStates.waiting_for_role)
 
 
-@registration_router.callback_query(F.data.startswith("role_"), StateFilter(RegistrationStates.waiting_for_role))
-async def select_role(callback: CallbackQuery, state: FSMContext):
+@callbacks.route(ROLE, state=RegistrationStates.waiting_for_role)
+async def select_role(callback: CallbackQuery, role: str, state: FSMContext):
     """Выбор роли пользователя"""
-    role = callback.data.split("_")[1]
 
     role_names = {
         "trainer": "Тренер",
@@ -105,7 +108,7 @@ async def process_phone(message: Message, state: FSMContext):
     # Если роль тренера, нужно найти существующего тренера или создать нового
     if data['role'] == ROLE_TRAINER:
         # Ищем существующего тренера с таким именем
-        async with aiosqlite.connect(db.db_path) as conn:
+        async with db.connect() as conn:
             conn.row_factory = aiosqlite.Row
             async with conn.execute(
                     "SELECT t.*, b.name as branch_name FROM trainers t "
@@ -172,18 +175,18 @@ async def process_phone(message: Message, state: FSMContext):
     await state.clear()
 
 
-@registration_router.callback_query(F.data == "back_to_registration", StateFilter(RegistrationStates))
+@callbacks.route(BACK_TO_REGISTRATION, state=RegistrationStates)
 async def back_to_registration(callback: CallbackQuery, state: FSMContext):
     """Возврат к выбору роли"""
     await state.set_state(RegistrationStates.waiting_for_role)
 
     keyboard = InlineKeyboardBuilder()
     keyboard.row(
-        InlineKeyboardButton(text="👨‍🏫 Тренер", callback_data="role_trainer"),
-        InlineKeyboardButton(text="👤 Родитель", callback_data="role_parent")
+        InlineKeyboardButton(text="👨‍🏫 Тренер", callback_data=ROLE.pack("trainer")),
+        InlineKeyboardButton(text="👤 Родитель", callback_data=ROLE.pack("parent"))
     )
     keyboard.row(
-        InlineKeyboardButton(text="💰 Кассир", callback_data="role_cashier")
+        InlineKeyboardButton(text="💰 Кассир", callback_data=ROLE.pack("cashier"))
     )
 
     await callback.message.edit_text(
@@ -0,0 +1,60 @@
+"""Воспроизведение записанных обновлений на локальный вебхук
+
+Пример:
+    python replay_updates.py updates.jsonl --delay 0.2
+
+Файл - по одному JSON-обновлению Telegram на строку (так их пишет WEBHOOK_RECORD_PATH).
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from config import WEBAPP_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+
+
+def load_updates(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+async def replay(path: str, url: str, secret: str, delay: float):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    sent = failed = 0
+    started = time.perf_counter()
+
+    # Файл читается целиком заранее: сервер с WEBHOOK_RECORD_PATH может дописывать в него же
+    updates = list(load_updates(path))
+
+    async with aiohttp.ClientSession() as session:
+        for update in updates:
+            async with session.post(url, json=update, headers=headers) as response:
+                if response.status == 200:
+                    sent += 1
+                else:
+                    failed += 1
+                    print(f"update_id={update.get('update_id')}: HTTP {response.status}")
+            if delay:
+                await asyncio.sleep(delay)
+
+    elapsed = time.perf_counter() - started
+    print(f"Отправлено: {sent}, ошибок: {failed}, за {elapsed:.2f} с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отправка записанных обновлений на вебхук")
+    parser.add_argument("path", help="файл с обновлениями (JSON Lines)")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBAPP_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    parser.add_argument("--delay", type=float, default=0.0, help="пауза между обновлениями, сек")
+    args = parser.parse_args()
+    asyncio.run(replay(args.path, args.url, args.secret, args.delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+import aiosqlite
+from datetime import date, timedelta
+
+from database import db
+from retention import attach_history
+
+
+def month_bounds(month: str):
+    """'2025-03' -> ('2025-03-01', '2025-04-01') для сравнения с ISO-строками в базе"""
+    year, month_num = (int(part) for part in month.split("-"))
+    start = date(year, month_num, 1)
+    end = date(year + 1, 1, 1) if month_num == 12 else date(year, month_num + 1, 1)
+    return start, end
+
+
+# Размер страницы в списке занятий
+SESSIONS_PAGE_SIZE = 10
+
+
+def report_snapshot(start: date, end: date):
+    """Снимок базы для отчёта за [start, end) вместе с архивами этих лет (db.snapshot())"""
+    return db.snapshot(prepare=lambda conn: attach_history(conn, start, end))
+
+
+class ReportFilter:
+    """Фильтр отчёта: вся академия, филиал, тренер или группа"""
+
+    KINDS = ("branch", "trainer", "group")
+
+    def __init__(self, kind: str = None, object_id: int = None):
+        if kind is not None and kind not in self.KINDS:
+            raise ValueError(f"Неизвестный фильтр отчёта: {kind}")
+        self.kind = kind
+        self.object_id = object_id
+
+    def to_dict(self):
+        return {'kind': self.kind, 'id': self.object_id}
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(data.get('kind'), data.get('id'))
+
+    def sessions_clause(self):
+        """Условие для запросов по sessions s JOIN groups_table g"""
+        if self.kind == "branch":
+            return " AND g.branch_id = ?", (self.object_id,)
+        if self.kind == "trainer":
+            return " AND s.trainer_id = ?", (self.object_id,)
+        if self.kind == "group":
+            return " AND s.group_id = ?", (self.object_id,)
+        return "", ()
+
+    def payments_clause(self):
+        """Условие для запросов по payments p JOIN children c JOIN groups_table g"""
+        if self.kind == "branch":
+            return " AND g.branch_id = ?", (self.object_id,)
+        if self.kind == "trainer":
+            return " AND p.trainer_id = ?", (self.object_id,)
+        if self.kind == "group":
+            return " AND c.group_id = ?", (self.object_id,)
+        return "", ()
+
+
+def range_bounds(start: date, end: date):
+    """Период [start, end] включительно -> границы для сравнения с ISO-строками в базе
+
+    Сравнение строк вместо DATE(start_time) позволяет SQLite использовать индексы.
+    """
+    return start.isoformat(), (end + timedelta(days=1)).isoformat()
+
+
+def _days(start: date, end: date):
+    day = start
+    while day < end:
+        yield day
+        day += timedelta(days=1)
+
+
+async def prepare_branch_month(month: str) -> dict:
+    """Данные для месячного отчёта по филиалам
+
+    Возвращает только простые типы, чтобы данные можно было передать в другой процесс.
+    """
+    start, end = month_bounds(month)
+    params = (start.isoformat(), end.isoformat())
+
+    async with report_snapshot(start, end) as conn:
+        conn.row_factory = aiosqlite.Row
+
+        async with conn.execute(
+                """SELECT b.id, b.name,
+                          COUNT(DISTINCT s.id) as sessions_count,
+                          COUNT(DISTINCT CASE WHEN s.type = 'training' THEN s.id END) as trainings,
+                          COUNT(DISTINCT CASE WHEN s.type = 'game' THEN s.id END) as games,
+                          COUNT(DISTINCT a.child_id) as unique_children,
+                          SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present,
+                          COUNT(a.id) as marks
+                   FROM branches b
+                   LEFT JOIN groups_table g ON b.id = g.branch_id
+                   LEFT JOIN sessions s ON g.id = s.group_id AND s.start_time >= ? AND s.start_time < ?
+                   LEFT JOIN attendance a ON s.id = a.session_id
+                   GROUP BY b.id, b.name
+                   ORDER BY b.name""", params
+        ) as cursor:
+            branch_rows = await cursor.fetchall()
+
+        async with conn.execute(
+                """SELECT g.branch_id, COALESCE(SUM(p.amount), 0) as income
+                   FROM payments p
+                   JOIN children c ON p.child_id = c.id
+                   JOIN groups_table g ON c.group_id = g.id
+                   WHERE p.payment_date >= ? AND p.payment_date < ?
+                   GROUP BY g.branch_id""", params
+        ) as cursor:
+            income = {row['branch_id']: row['income'] for row in await cursor.fetchall()}
+
+        async with conn.execute(
+                """SELECT SUBSTR(s.start_time, 1, 10) as day,
+                          SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present,
+                          COUNT(a.id) as marks
+                   FROM sessions s
+                   LEFT JOIN attendance a ON s.id = a.session_id
+                   WHERE s.start_time >= ? AND s.start_time < ?
+                   GROUP BY day""", params
+        ) as cursor:
+            daily = {row['day']: (row['present'] or 0, row['marks']) for row in await cursor.fetchall()}
+
+    branches = []
+    for row in branch_rows:
+        marks = row['marks'] or 0
+        branches.append({
+            'name': row['name'],
+            'sessions': row['sessions_count'],
+            'trainings': row['trainings'],
+            'games': row['games'],
+            'unique_children': row['unique_children'],
+            'attendance_rate': round((row['present'] or 0) * 100.0 / marks, 1) if marks else 0.0,
+            'income': income.get(row['id'], 0),
+        })
+
+    return {
+        'month': month,
+        'branches': branches,
+        'daily_present': [daily.get(day.isoformat(), (0, 0))[0] for day in _days(start, end)],
+        'daily_marks': [daily.get(day.isoformat(), (0, 0))[1] for day in _days(start, end)],
+    }
+
+
+async def prepare_trainer_month(trainer_id: int, month: str) -> dict:
+    """Данные для месячного отчёта по тренеру (None, если тренер не найден)"""
+    start, end = month_bounds(month)
+    params = (trainer_id, start.isoformat(), end.isoformat())
+
+    async with report_snapshot(start, end) as conn:
+        conn.row_factory = aiosqlite.Row
+
+        async with conn.execute(
+                """SELECT t.full_name, b.name as branch_name
+                   FROM trainers t JOIN branches b ON t.branch_id = b.id
+                   WHERE t.id = ?""", (trainer_id,)
+        ) as cursor:
+            trainer = await cursor.fetchone()
+
+        if not trainer:
+            return None
+
+        async with conn.execute(
+                """SELECT g.name,
+                          COUNT(DISTINCT s.id) as sessions_count,
+                          SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present,
+                          COUNT(a.id) as marks
+                   FROM groups_table g
+                   LEFT JOIN sessions s ON g.id = s.group_id AND s.trainer_id = ?
+                                       AND s.start_time >= ? AND s.start_time < ?
+                   LEFT JOIN attendance a ON s.id = a.session_id
+                   WHERE g.trainer_id = ? OR s.id IS NOT NULL
+                   GROUP BY g.id, g.name
+                   ORDER BY g.name""", params + (trainer_id,)
+        ) as cursor:
+            group_rows = await cursor.fetchall()
+
+        async with conn.execute(
+                """SELECT SUBSTR(s.start_time, 1, 10) as day,
+                          COUNT(DISTINCT s.id) as sessions_count,
+                          SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END) as present
+                   FROM sessions s
+                   LEFT JOIN attendance a ON s.id = a.session_id
+                   WHERE s.trainer_id = ? AND s.start_time >= ? AND s.start_time < ?
+                   GROUP BY day""", params
+        ) as cursor:
+            daily = {row['day']: (row['sessions_count'], row['present'] or 0) for row in await cursor.fetchall()}
+
+        async with conn.execute(
+                """SELECT COUNT(*) as payments_count, COALESCE(SUM(amount), 0) as income
+                   FROM payments
+                   WHERE trainer_id = ? AND payment_date >= ? AND payment_date < ?""", params
+        ) as cursor:
+            payments = await cursor.fetchone()
+
+    groups = []
+    for row in group_rows:
+        marks = row['marks'] or 0
+        groups.append({
+            'name': row['name'],
+            'sessions': row['sessions_count'],
+            'attendance_rate': round((row['present'] or 0) * 100.0 / marks, 1) if marks else 0.0,
+        })
+
+    return {
+        'month': month,
+        'trainer_name': trainer['full_name'],
+        'branch_name': trainer['branch_name'],
+        'groups': groups,
+        'payments_count': payments['payments_count'],
+        'income': payments['income'],
+        'daily_sessions': [daily.get(day.isoformat(), (0, 0))[0] for day in _days(start, end)],
+        'daily_present': [daily.get(day.isoformat(), (0, 0))[1] for day in _days(start, end)],
+    }
+
+
+# ДВИЖОК ОТЧЁТОВ ЗА ПРОИЗВОЛЬНЫЙ ПЕРИОД
+
+async def describe_filter(flt: ReportFilter) -> str:
+    """Человекочитаемое название фильтра"""
+    if flt.kind is None:
+        return "Вся академия"
+
+    queries = {
+        "branch": ("SELECT name FROM branches WHERE id = ?", "🏢"),
+        "trainer": ("SELECT full_name FROM trainers WHERE id = ?", "👨‍🏫"),
+        "group": ("SELECT name FROM groups_table WHERE id = ?", "👥"),
+    }
+    sql, emoji = queries[flt.kind]
+    async with db.snapshot() as conn:
+        async with conn.execute(sql, (flt.object_id,)) as cursor:
+            row = await cursor.fetchone()
+    return f"{emoji} {row[0]}" if row else "Удалённый объект"
+
+
+async def get_report_totals(start: date, end: date, flt: ReportFilter = None) -> dict:
+    """Итоги за период, посчитанные целиком в SQL"""
+    flt = flt or ReportFilter()
+    low, high = range_bounds(start, end)
+    session_clause, session_params = flt.sessions_clause()
+    payment_clause, payment_params = flt.payments_clause()
+
+    async with report_snapshot(start, end + timedelta(days=1)) as conn:
+        async with conn.execute(
+                f"""SELECT COUNT(*),
+                           COALESCE(SUM(CASE WHEN s.type = 'training' THEN 1 ELSE 0 END), 0),
+                           COALESCE(SUM(CASE WHEN s.type = 'game' THEN 1 ELSE 0 END), 0)
+                    FROM sessions s
+                    JOIN groups_table g ON s.group_id = g.id
+                    WHERE s.start_time >= ? AND s.start_time < ?{session_clause}""",
+                (low, high) + session_params
+        ) as cursor:
+            total_sessions, trainings, games = await cursor.fetchone()
+
+        async with conn.execute(
+                f"""SELECT COALESCE(SUM(CASE WHEN a.status = 'present' THEN 1 ELSE 0 END), 0), COUNT(a.id)
+                    FROM attendance a
+                    JOIN sessions s ON a.session_id = s.id
+                    JOIN groups_table g ON s.group_id = g.id
+                    WHERE s.start_time >= ? AND s.start_time < ?{session_clause}""",
+                (low, high) + session_params
+        ) as cursor:
+            present, marks = await cursor.fetchone()
+
+        async with conn.execute(
+                f"""SELECT COUNT(p.id), COALESCE(SUM(p.amount), 0)
+                    FROM payments p
+                    JOIN children c ON p.child_id = c.id
+                    JOIN groups_table g ON c.group_id = g.id
+                    WHERE p.payment_date >= ? AND p.payment_date < ?{payment_clause}""",
+                (low, high) + payment_params
+        ) as cursor:
+            payments_count, income = await cursor.fetchone()
+
+    return {
+        'total_sessions': total_sessions,
+        'trainings': trainings,
+        'games': games,
+        'avg_attendance': round(present * 100.0 / marks, 1) if marks else 0,
+        'payments_count': payments_count,
+        'income': income,
+    }
+
+
+async def get_branch_breakdown(start: date, end: date, flt: ReportFilter = None):
+    """Занятия и посещаемость по филиалам за период"""
+    flt = flt or ReportFilter()
+    low, high = range_bounds(start, end)
+    session_clause, session_params = flt.sessions_clause()
+
+    async with report_snapshot(start, end + timedelta(days=1)) as conn:
+        conn.row_factory = aiosqlite.Row
+        async with conn.execute(
+                f"""SELECT b.name as branch_name,
+                           COUNT(DISTINCT s.id) as sessions_count,
+                           COUNT(DISTINCT a.child_id) as unique_children,
+                           ROUND(AVG(CASE WHEN a.status = 'present' THEN 100.0
+                                          WHEN a.status = 'absent' THEN 0.0 END), 1) as attendance_rate
+                    FROM sessions s
+                    JOIN groups_table g ON s.group_id = g.id
+                    JOIN branches b ON g.branch_id = b.id
+                    LEFT JOIN attendance a ON s.id = a.session_id
+                    WHERE s.start_time >= ? AND s.start_time < ?{session_clause}
+                    GROUP BY b.id, b.name
+                    ORDER BY sessions_count DESC""",
+                (low, high) + session_params
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def get_top_trainers(start: date, end: date, flt: ReportFilter = None, limit: int = 5):
+    """Тренеры с наибольшим числом занятий за период"""
+    flt = flt or ReportFilter()
+    low, high = range_bounds(start, end)
+    session_clause, session_params = flt.sessions_clause()
+
+    async with report_snapshot(start, end + timedelta(days=1)) as conn:
+        conn.row_factory = aiosqlite.Row
+        async with conn.execute(
+                f"""SELECT t.full_name, COUNT(s.id) as sessions_count
+                    FROM sessions s
+                    JOIN groups_table g ON s.group_id = g.id
+                    JOIN trainers t ON s.trainer_id = t.id
+                    WHERE s.start_time >= ? AND s.start_time < ?{session_clause}
+                    GROUP BY t.id, t.full_name
+                    ORDER BY sessions_count DESC
+                    LIMIT ?""",
+                (low, high) + session_params + (limit,)
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def get_sessions_page(start: date, end: date, flt: ReportFilter = None,
+                            after: list = None, limit: int = SESSIONS_PAGE_SIZE):
+    """Страница списка занятий (новые сверху) с keyset-пагинацией
+
+    after - курсор [start_time, id] последнего занятия предыдущей страницы.
+    Возвращает (занятия, курсор следующей страницы или None).
+    """
+    flt = flt or ReportFilter()
+    low, high = range_bounds(start, end)
+    session_clause, session_params = flt.sessions_clause()
+
+    keyset_clause, keyset_params = "", ()
+    if after:
+        keyset_clause = " AND (s.start_time < ? OR (s.start_time = ? AND s.id < ?))"
+        keyset_params = (after[0], after[0], after[1])
+
+    async with report_snapshot(start, end + timedelta(days=1)) as conn:
+        conn.row_factory = aiosqlite.Row
+        async with conn.execute(
+                f"""SELECT s.id, s.type, s.start_time, s.status,
+                           g.name as group_name, b.name as branch_name, t.full_name as trainer_name
+                    FROM sessions s
+                    JOIN groups_table g ON s.group_id = g.id
+                    JOIN branches b ON g.branch_id = b.id
+                    JOIN trainers t ON s.trainer_id = t.id
+                    WHERE s.start_time >= ? AND s.start_time < ?{session_clause}{keyset_clause}
+                    ORDER BY s.start_time DESC, s.id DESC
+                    LIMIT ?""",
+                (low, high) + session_params + keyset_params + (limit + 1,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+    # Лишняя строка показывает, есть ли следующая страница
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = [rows[-1]['start_time'], rows[-1]['id']] if has_more else None
+    return rows, next_cursor
@@ -1,173 +1,309 @@
-from aiogram import Router, F
-from aiogram.types import CallbackQuery
+import os
+from aiogram import Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, FSInputFile, Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.types import InlineKeyboardButton
 import aiosqlite
 from datetime import date, timedelta, datetime
 
+from analytics import analytics
+from callback_data import (
+    EXPORT, MT_REPORTS, PDF_BRANCHES, PDF_MONTH, PDF_TRAINER, REPORT_ANALYTICS, REPORT_EXPORT,
+    REPORT_FINANCE, REPORT_MONTH, REPORT_PAGE_NEXT, REPORT_PAGE_PREV, REPORT_PDF, REPORT_RANGE,
+    REPORT_WEEK, RFILTER, RFILTER_ALL, RFILTER_MENU, RFLIST
+)
+from callback_dispatch import callbacks
+from config import ROLE_MAIN_TRAINER, get_current_time
 from database import db
+from excel_export import EXPORTS, export_report
 from keyboards import get_back_button
+from pdf_reports import MONTHS_RU, cached_pdf
+from reports import (
+    ReportFilter, describe_filter, get_branch_breakdown, get_report_totals, get_sessions_page,
+    get_top_trainers, prepare_branch_month, prepare_trainer_month, report_snapshot
+)
+from states import ReportStates
 
 reports_router = Router()
 
 
-@reports_router.callback_query(F.data == "report_week")
-async def report_week(callback: CallbackQuery):
-    """Отчёт за неделю"""
-    today = date.today()
-    week_ago = today - timedelta(days=7)
-
-    async with aiosqlite.connect(db.db_path) as conn:
-        conn.row_factory = aiosqlite.Row
+def _session_line(session):
+    start_time = session['start_time']
+    if isinstance(start_time, str):
+        start_time = datetime.fromisoformat(start_time)
+
+    session_type = "🏃" if session['type'] == 'training' else "⚽"
+    return f"{session_type} {start_time.strftime('%d.%m %H:%M')} - {session['group_name']} ({session['trainer_name']})\n"
+
+
+async def _render_period_report(context: dict):
+    """Текст и клавиатура отчёта за период по сохранённому в FSM контексту"""
+    start = date.fromisoformat(context['start'])
+    end = date.fromisoformat(context['end'])
+    flt = ReportFilter.from_dict(context['filter'])
+    page = context['page']
+
+    branch_stats = top_trainers = None
+    # Все числа отчёта - из одного снимка базы
+    async with report_snapshot(start, end + timedelta(days=1)):
+        totals = await get_report_totals(start, end, flt)
+        sessions, next_cursor = await get_sessions_page(start, end, flt, after=context['cursors'][page])
+        filter_name = await describe_filter(flt) if flt.kind is not None else None
+        if context.get('extended') and page == 0 and totals['total_sessions']:
+            branch_stats = await get_branch_breakdown(start, end, flt)
+            top_trainers = await get_top_trainers(start, end, flt)
+
+    text = f"📊 {context['title']} ({start.strftime('%d.%m')} - {end.strftime('%d.%m.%Y')})\n"
+    if filter_name is not None:
+        text += f"{filter_name}\n"
+    text += "\n"
+
+    if totals['total_sessions'] == 0:
+        text += "❌ За период занятий не было."
+        return text, get_back_button(), None
+
+    text += f"📈 Общая статистика:\n"
+    text += f"   Всего занятий: {totals['total_sessions']}\n"
+    text += f"   🏃 Тренировки: {totals['trainings']}\n"
+    text += f"   ⚽ Игры: {totals['games']}\n"
+    text += f"   💰 Получено денег: {totals['income']:.0f} сум\n"
+    text += f"   📈 Средняя посещаемость: {totals['avg_attendance']}%\n\n"
+
+    if branch_stats is not None:
+        text += "🏢 Статистика по филиалам:\n"
+        for branch in branch_stats:
+            attendance = branch['attendance_rate'] if branch['attendance_rate'] else 0
+            text += f"   📍 {branch['branch_name']}: {branch['sessions_count']} занятий, посещаемость {attendance:.1f}%\n"
 
-        # Занятия за неделю
-        async with conn.execute(
-                """SELECT s.*, g.name as group_name, b.name as branch_name, t.full_name as trainer_name
-                   FROM sessions s 
-                   JOIN groups_table g ON s.group_id = g.id 
-                   JOIN branches b ON g.branch_id = b.id 
-                   JOIN trainers t ON s.trainer_id = t.id 
-                   WHERE DATE(s.start_time) >= ? 
-                   ORDER BY s.start_time DESC
-                   LIMIT 20""", (week_ago.isoformat(),)
-        ) as cursor:
-            sessions = await cursor.fetchall()
+        text += "\n🏆 Топ тренеры по активности:\n"
+        for i, trainer in enumerate(top_trainers, 1):
+            text += f"   {i}. {trainer['full_name']}: {trainer['sessions_count']} занятий\n"
+        text += "\n"
 
-        # Статистика за неделю
-        async with conn.execute(
-                "SELECT COUNT(*) FROM sessions WHERE DATE(start_time) >= ?", (week_ago.isoformat(),)
-        ) as cursor:
-            total_sessions = (await cursor.fetchone())[0]
+    text += f"📋 Занятия (страница {page + 1}):\n"
+    for session in sessions:
+        text += _session_line(session)
+
+    keyboard = InlineKeyboardBuilder()
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton(text="⬅ Новее", callback_data=REPORT_PAGE_PREV.pack()))
+    if next_cursor:
+        nav.append(InlineKeyboardButton(text="Старше ➡", callback_data=REPORT_PAGE_NEXT.pack()))
+    if nav:
+        keyboard.row(*nav)
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_REPORTS.pack()))
+
+    return text, keyboard.as_markup(), next_cursor
+
+
+async def _show_period_report(callback: CallbackQuery, state: FSMContext, context: dict):
+    text, markup, next_cursor = await _render_period_report(context)
+
+    # Курсоры страниц хранятся в FSM: cursors[i] - начало i-й страницы
+    cursors = context['cursors'][:context['page'] + 1]
+    if next_cursor:
+        cursors.append(next_cursor)
+    context['cursors'] = cursors
+    await state.update_data(report_context=context)
+
+    await callback.message.edit_text(text, reply_markup=markup)
+
+
+def _new_context(title: str, start: date, end: date, flt: ReportFilter = None, extended: bool = False):
+    return {
+        'title': title,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'filter': (flt or ReportFilter()).to_dict(),
+        'extended': extended,
+        'page': 0,
+        'cursors': [None],
+    }
 
-        # Оплаты за неделю
-        async with conn.execute(
-                "SELECT COALESCE(SUM(amount), 0) FROM payments WHERE DATE(payment_date) >= ?", (week_ago.isoformat(),)
-        ) as cursor:
-            week_payments = (await cursor.fetchone())[0]
 
-        # Средняя посещаемость за неделю
-        async with conn.execute(
-                """SELECT ROUND(AVG(CASE WHEN a.status = 'present' THEN 100.0 ELSE 0.0 END), 1)
-                   FROM attendance a 
-                   JOIN sessions s ON a.session_id = s.id 
-                   WHERE DATE(s.start_time) >= ?""", (week_ago.isoformat(),)
-        ) as cursor:
-            result = await cursor.fetchone()
-            avg_attendance = result[0] if result[0] is not None else 0
+@callbacks.route(REPORT_WEEK)
+async def report_week(callback: CallbackQuery, state: FSMContext):
+    """Отчёт за неделю"""
+    today = get_current_time().date()
+    context = _new_context("Отчёт за неделю", today - timedelta(days=7), today)
+    await _show_period_report(callback, state, context)
 
-    text = f"📊 Отчёт за неделю ({week_ago.strftime('%d.%m')} - {today.strftime('%d.%m.%Y')})\n\n"
 
-    if total_sessions == 0:
-        text += "❌ За неделю занятий не было."
+@callbacks.route(REPORT_MONTH)
+async def report_month(callback: CallbackQuery, state: FSMContext):
+    """Отчёт за месяц"""
+    today = get_current_time().date()
+    context = _new_context("Отчёт за месяц", today - timedelta(days=30), today, extended=True)
+    await _show_period_report(callback, state, context)
+
+
+@callbacks.route(REPORT_PAGE_NEXT)
+@callbacks.route(REPORT_PAGE_PREV)
+async def report_page(callback: CallbackQuery, state: FSMContext, action: str):
+    """Листание списка занятий в отчёте за период"""
+    data = await state.get_data()
+    context = data.get('report_context')
+    if not context:
+        await callback.answer("Отчёт устарел, откройте его заново", show_alert=True)
+        return
+
+    if action == "report_page_next":
+        if context['page'] + 1 >= len(context['cursors']):
+            await callback.answer()
+            return
+        context['page'] += 1
     else:
-        training_count = sum(1 for s in sessions if s['type'] == 'training')
-        game_count = sum(1 for s in sessions if s['type'] == 'game')
+        context['page'] = max(context['page'] - 1, 0)
+
+    await _show_period_report(callback, state, context)
+
+
+# ОТЧЁТ ЗА ПРОИЗВОЛЬНЫЙ ПЕРИОД
+
+@callbacks.route(REPORT_RANGE)
+async def report_range_start(callback: CallbackQuery, state: FSMContext):
+    """Запрос произвольного периода"""
+    await state.set_state(ReportStates.waiting_for_period)
+    await callback.message.edit_text(
+        "🗓 Введите период в формате:\n"
+        "ДД.ММ.ГГГГ - ДД.ММ.ГГГГ\n\n"
+        "Например: 01.09.2025 - 30.09.2025",
+        reply_markup=get_back_button()
+    )
+
+
+@reports_router.message(StateFilter(ReportStates.waiting_for_period))
+async def report_range_input(message: Message, state: FSMContext):
+    """Разбор введённого периода и выбор фильтра"""
+    try:
+        start_text, end_text = (part.strip() for part in message.text.split("-", 1))
+        start = datetime.strptime(start_text, "%d.%m.%Y").date()
+        end = datetime.strptime(end_text, "%d.%m.%Y").date()
+    except (AttributeError, ValueError):
+        await message.answer("❌ Неверный формат. Введите период как ДД.ММ.ГГГГ - ДД.ММ.ГГГГ")
+        return
+
+    if start > end:
+        start, end = end, start
+
+    await state.set_state(None)
+    await state.update_data(report_range=[start.isoformat(), end.isoformat()])
+    await message.answer(
+        f"🗓 Период: {start.strftime('%d.%m.%Y')} - {end.strftime('%d.%m.%Y')}\n\nВыберите, по кому построить отчёт:",
+        reply_markup=_filter_menu()
+    )
+
+
+def _filter_menu():
+    keyboard = InlineKeyboardBuilder()
+    keyboard.row(InlineKeyboardButton(text="🌐 Вся академия", callback_data=RFILTER_ALL.pack()))
+    keyboard.row(
+        InlineKeyboardButton(text="🏢 Филиал", callback_data=RFLIST.pack("branch")),
+        InlineKeyboardButton(text="👨‍🏫 Тренер", callback_data=RFLIST.pack("trainer")),
+        InlineKeyboardButton(text="👥 Группа", callback_data=RFLIST.pack("group"))
+    )
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_REPORTS.pack()))
+    return keyboard.as_markup()
+
+
+@callbacks.route(RFLIST)
+async def report_filter_list(callback: CallbackQuery, kind: str):
+    """Список филиалов/тренеров/групп для фильтра отчёта"""
+    queries = {
+        "branch": ("SELECT id, name FROM branches ORDER BY name", "Выберите филиал:"),
+        "trainer": ("SELECT id, full_name FROM trainers ORDER BY full_name", "Выберите тренера:"),
+        "group": ("SELECT id, name FROM groups_table ORDER BY name", "Выберите группу:"),
+    }
+    if kind not in queries:
+        # Кнопка "Назад" старого формата (rflist_back) разбирается как rflist с kind="back"
+        await report_filter_back(callback)
+        return
+    sql, prompt = queries[kind]
 
-        text += f"📈 Общая статистика:\n"
-        text += f"   Всего занятий: {total_sessions}\n"
-        text += f"   🏃 Тренировки: {training_count}\n"
-        text += f"   ⚽ Игры: {game_count}\n"
-        text += f"   💰 Получено денег: {week_payments:.0f} сум\n"
-        text += f"   📈 Средняя посещаемость: {avg_attendance}%\n\n"
+    async with db.snapshot() as conn:
+        async with conn.execute(sql) as cursor:
+            items = await cursor.fetchall()
 
-        text += "📋 Последние занятия:\n"
-        for session in sessions[:10]:  # Показываем только последние 10
-            start_time = session['start_time']
-            if isinstance(start_time, str):
-                start_time = datetime.fromisoformat(start_time)
+    if not items:
+        await callback.answer("Список пуст", show_alert=True)
+        return
 
-            session_type = "🏃" if session['type'] == 'training' else "⚽"
-            text += f"{session_type} {start_time.strftime('%d.%m %H:%M')} - {session['group_name']} ({session['trainer_name']})\n"
+    keyboard = InlineKeyboardBuilder()
+    for object_id, name in items:
+        keyboard.row(InlineKeyboardButton(text=name, callback_data=RFILTER.pack(kind, object_id)))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=RFILTER_MENU.pack()))
 
-    await callback.message.edit_text(text, reply_markup=get_back_button())
+    await callback.message.edit_text(prompt, reply_markup=keyboard.as_markup())
 
 
-@reports_router.callback_query(F.data == "report_month")
-async def report_month(callback: CallbackQuery):
-    """Отчёт за месяц"""
-    today = date.today()
-    month_ago = today - timedelta(days=30)
+@callbacks.route(RFILTER_MENU)
+async def report_filter_back(callback: CallbackQuery):
+    await callback.message.edit_text("Выберите, по кому построить отчёт:", reply_markup=_filter_menu())
 
-    async with aiosqlite.connect(db.db_path) as conn:
-        conn.row_factory = aiosqlite.Row
 
-        # Статистика за месяц
-        async with conn.execute(
-                "SELECT COUNT(*) FROM sessions WHERE DATE(start_time) >= ?", (month_ago.isoformat(),)
-        ) as cursor:
-            total_sessions = (await cursor.fetchone())[0]
+@callbacks.route(RFILTER_ALL)
+@callbacks.route(RFILTER)
+async def report_filter_apply(callback: CallbackQuery, state: FSMContext, kind: str = None, object_id: int = None):
+    """Построение отчёта за выбранный период с фильтром"""
+    data = await state.get_data()
+    report_range = data.get('report_range')
+    if not report_range:
+        await callback.answer("Период не выбран, начните заново", show_alert=True)
+        return
 
-        # Статистика по типам занятий
-        async with conn.execute(
-                "SELECT type, COUNT(*) FROM sessions WHERE DATE(start_time) >= ? GROUP BY type",
-                (month_ago.isoformat(),)
-        ) as cursor:
-            session_types = await cursor.fetchall()
+    flt = ReportFilter(kind, object_id)
 
-        # Статистика по филиалам
-        async with conn.execute(
-                """SELECT b.name as branch_name, COUNT(s.id) as sessions_count,
-                          COUNT(DISTINCT a.child_id) as unique_children,
-                          ROUND(AVG(CASE WHEN a.status = 'present' THEN 100.0 ELSE 0.0 END), 1) as attendance_rate
-                   FROM branches b
-                   LEFT JOIN groups_table g ON b.id = g.branch_id
-                   LEFT JOIN sessions s ON g.id = s.group_id AND DATE(s.start_time) >= ?
-                   LEFT JOIN attendance a ON s.id = a.session_id
-                   GROUP BY b.id, b.name
-                   ORDER BY sessions_count DESC""", (month_ago.isoformat(),)
-        ) as cursor:
-            branch_stats = await cursor.fetchall()
+    context = _new_context(
+        "Отчёт за период",
+        date.fromisoformat(report_range[0]),
+        date.fromisoformat(report_range[1]),
+        flt,
+        extended=flt.kind in (None, "branch")
+    )
+    await _show_period_report(callback, state, context)
 
-        # Финансовая статистика за месяц
-        async with conn.execute(
-                "SELECT COALESCE(SUM(amount), 0) FROM payments WHERE DATE(payment_date) >= ?", (month_ago.isoformat(),)
-        ) as cursor:
-            month_income = (await cursor.fetchone())[0]
-
-        # Топ тренеры по количеству занятий
-        async with conn.execute(
-                """SELECT t.full_name, COUNT(s.id) as sessions_count
-                   FROM trainers t
-                   LEFT JOIN sessions s ON t.id = s.trainer_id AND DATE(s.start_time) >= ?
-                   GROUP BY t.id, t.full_name
-                   HAVING sessions_count > 0
-                   ORDER BY sessions_count DESC
-                   LIMIT 5""", (month_ago.isoformat(),)
-        ) as cursor:
-            top_trainers = await cursor.fetchall()
 
-    text = f"📊 Отчёт за месяц ({month_ago.strftime('%d.%m')} - {today.strftime('%d.%m.%Y')})\n\n"
+@callbacks.route(REPORT_ANALYTICS)
+async def report_analytics(callback: CallbackQuery):
+    """Аналитика по снимку данных в памяти: филиалы, тренеры, динамика по месяцам"""
+    await analytics.refresh()
 
-    if total_sessions == 0:
-        text += "❌ За месяц занятий не было."
-    else:
-        text += f"📈 Общая статистика:\n"
-        text += f"   Всего занятий: {total_sessions}\n"
+    today = get_current_time().date()
+    month_ago = today - timedelta(days=30)
+    half_year_ago = (today.replace(day=1) - timedelta(days=150)).replace(day=1)
 
-        for session_type in session_types:
-            type_name = "🏃 Тренировки" if session_type['type'] == 'training' else "⚽ Игры"
-            text += f"   {type_name}: {session_type[1]}\n"
+    text = f"🧮 Аналитика ({month_ago.strftime('%d.%m')} - {today.strftime('%d.%m.%Y')})\n\n"
 
-        text += f"   💰 Доходы: {month_income:.0f} сум\n\n"
+    text += "🏢 Сравнение филиалов:\n"
+    for branch in analytics.branch_comparison(month_ago, today):
+        text += (f"   📍 {branch['name']}: {branch['sessions']} занятий, "
+                 f"посещаемость {branch['attendance_rate']:.1f}%, оплаты {branch['income']:.0f} сум\n")
 
-        text += "🏢 Статистика по филиалам:\n"
-        for branch in branch_stats:
-            if branch['sessions_count'] and branch['sessions_count'] > 0:
-                attendance = branch['attendance_rate'] if branch['attendance_rate'] else 0
-                text += f"   📍 {branch['branch_name']}: {branch['sessions_count']} занятий, посещаемость {attendance:.1f}%\n"
+    text += "\n👨‍🏫 Загрузка тренеров:\n"
+    for trainer in analytics.trainer_utilization(month_ago, today):
+        text += (f"   {trainer['name']}: {trainer['sessions']} занятий "
+                 f"(🏃 {trainer['trainings']} / ⚽ {trainer['games']}), "
+                 f"рабочих дней {trainer['active_days']}, посещаемость {trainer['attendance_rate']:.1f}%\n")
 
-        text += "\n🏆 Топ тренеры по активности:\n"
-        for i, trainer in enumerate(top_trainers, 1):
-            text += f"   {i}. {trainer['full_name']}: {trainer['sessions_count']} занятий\n"
+    text += "\n📈 Динамика по месяцам:\n"
+    for row in analytics.monthly_trend(half_year_ago, today):
+        year, month_num = row['month'].split("-")
+        text += (f"   {MONTHS_RU.get(month_num, month_num)} {year}: {row['sessions']} занятий, "
+                 f"посещаемость {row['attendance_rate']:.1f}%, {row['income']:.0f} сум\n")
 
     await callback.message.edit_text(text, reply_markup=get_back_button())
 
 
-@reports_router.callback_query(F.data == "report_finance")
+@callbacks.route(REPORT_FINANCE)
 async def report_finance(callback: CallbackQuery):
     """Подробный финансовый отчёт"""
     today = date.today()
     month_ago = today - timedelta(days=30)
 
-    async with aiosqlite.connect(db.db_path) as conn:
+    async with db.snapshot() as conn:
         conn.row_factory = aiosqlite.Row
 
         # Общие финансы
@@ -253,4 +389,115 @@ async def report_finance(callback: CallbackQuery):
         for i, payer in enumerate(top_payers[:5], 1):
             text += f"   {i}. {payer['full_name']}: {payer['total_paid']:.0f} сум\n"
 
-    await callback.message.edit_text(text, reply_markup=get_back_button())
\ No newline at end of file
+    await callback.message.edit_text(text, reply_markup=get_back_button())
+
+
+# ВЫГРУЗКА ОТЧЁТОВ В EXCEL (ТОЛЬКО ДЛЯ ГЛАВНОГО ТРЕНЕРА)
+
+@callbacks.route(REPORT_EXPORT)
+async def report_export_menu(callback: CallbackQuery):
+    """Меню выгрузки отчётов в Excel"""
+    keyboard = InlineKeyboardBuilder()
+    for kind, (title, _) in EXPORTS.items():
+        keyboard.row(InlineKeyboardButton(text=f"📥 {title}", callback_data=EXPORT.pack(kind)))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_REPORTS.pack()))
+
+    await callback.message.edit_text(
+        "📥 Выгрузка в Excel\n\n"
+        "Выберите отчёт - файл придёт отдельным сообщением:",
+        reply_markup=keyboard.as_markup()
+    )
+
+
+@callbacks.route(EXPORT)
+async def report_export(callback: CallbackQuery, kind: str):
+    """Формирование и отправка .xlsx файла"""
+    user = await db.get_user_by_telegram_id(callback.from_user.id)
+    if not user or user['role'] != ROLE_MAIN_TRAINER:
+        await callback.answer("❌ Выгрузка доступна только главному тренеру", show_alert=True)
+        return
+
+    if kind not in EXPORTS:
+        await callback.answer("❌ Неизвестный отчёт", show_alert=True)
+        return
+
+    title, _ = EXPORTS[kind]
+    await callback.answer("⏳ Формирую файл...")
+
+    path, filename = await export_report(kind)
+    try:
+        await callback.message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"📥 {title}"
+        )
+    finally:
+        os.remove(path)
+
+
+# PDF-ОТЧЁТЫ ЗА МЕСЯЦ (ТОЛЬКО ДЛЯ ГЛАВНОГО ТРЕНЕРА)
+
+@callbacks.route(REPORT_PDF)
+async def report_pdf_menu(callback: CallbackQuery):
+    """Выбор месяца для PDF-отчёта"""
+    current = get_current_time().date().replace(day=1)
+
+    keyboard = InlineKeyboardBuilder()
+    for _ in range(6):
+        month = current.strftime('%Y-%m')
+        keyboard.row(InlineKeyboardButton(
+            text=f"📄 {MONTHS_RU[current.strftime('%m')]} {current.year}",
+            callback_data=PDF_MONTH.pack(month)
+        ))
+        current = (current - timedelta(days=1)).replace(day=1)
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=MT_REPORTS.pack()))
+
+    await callback.message.edit_text("📄 PDF-отчёт\n\nВыберите месяц:", reply_markup=keyboard.as_markup())
+
+
+@callbacks.route(PDF_MONTH)
+async def report_pdf_month(callback: CallbackQuery, month: str):
+    """Выбор вида PDF-отчёта: по филиалам или по тренеру"""
+    trainers = await db.get_all_trainers()
+
+    keyboard = InlineKeyboardBuilder()
+    keyboard.row(InlineKeyboardButton(text="🏢 Все филиалы", callback_data=PDF_BRANCHES.pack(month)))
+    for trainer in trainers:
+        keyboard.row(InlineKeyboardButton(
+            text=f"👨‍🏫 {trainer['full_name']}",
+            callback_data=PDF_TRAINER.pack(trainer['id'], month)
+        ))
+    keyboard.row(InlineKeyboardButton(text="⬅ Назад", callback_data=REPORT_PDF.pack()))
+
+    year, month_num = month.split("-")
+    await callback.message.edit_text(
+        f"📄 PDF-отчёт за {MONTHS_RU.get(month_num, month_num)} {year}\n\nВыберите отчёт:",
+        reply_markup=keyboard.as_markup()
+    )
+
+
+@callbacks.route(PDF_BRANCHES)
+@callbacks.route(PDF_TRAINER)
+async def report_pdf_send(callback: CallbackQuery, month: str, trainer_id: int = None):
+    """Формирование и отправка PDF-отчёта"""
+    user = await db.get_user_by_telegram_id(callback.from_user.id)
+    if not user or user['role'] != ROLE_MAIN_TRAINER:
+        await callback.answer("❌ PDF-отчёты доступны только главному тренеру", show_alert=True)
+        return
+
+
+    if trainer_id is None:
+        data = await prepare_branch_month(month)
+        report_type, period = "branches", month
+        filename = f"branches_{month}.pdf"
+    else:
+        data = await prepare_trainer_month(trainer_id, month)
+        if not data:
+            await callback.answer("❌ Тренер не найден", show_alert=True)
+            return
+        report_type, period = "trainer", f"{trainer_id}-{month}"
+        filename = f"trainer_{trainer_id}_{month}.pdf"
+
+    await callback.answer("⏳ Формирую PDF...")
+
+    async with cached_pdf(report_type, period, data) as path:
+        await callback.message.answer_document(FSInputFile(path, filename=filename), caption="📄 PDF-отчёт")
@@ -0,0 +1,286 @@
+"""Перенос старой истории в архивные базы по годам и постепенное сжатие рабочей базы
+
+Пример:
+    python retention.py                               # перенос сейчас (как ночная задача)
+    python retention.py --dry-run                     # только показать, что будет перенесено
+    python retention.py --enable-incremental-vacuum   # один раз для базы, созданной до этой версии
+
+Занятия (с их посещаемостью) старше HISTORY_RETENTION_DAYS и журнал действий старше
+LOG_RETENTION_DAYS переносятся в ARCHIVE_DIR/<база>_<год>.db небольшими транзакциями.
+Рабочая база остаётся маленькой и целиком помещается в кэш. Освободившиеся страницы
+возвращаются через PRAGMA incremental_vacuum по VACUUM_STEP_PAGES за шаг.
+
+Отчёты за давние периоды читают архивы через attach_history: нужные годы подключаются
+только для чтения, а временные представления sessions, attendance и logs объединяют их
+с рабочей базой - запросы отчётов не меняются.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import urllib.request
+from datetime import date, datetime, timedelta
+
+from config import (
+    ARCHIVE_DIR, HISTORY_RETENTION_DAYS, LOG_RETENTION_DAYS, RETENTION_BATCH_SIZE, RETENTION_CRON,
+    VACUUM_STEP_PAGES, get_current_time
+)
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Архивируемые таблицы и их индексы в архиве
+ARCHIVE_INDEXES = {
+    "sessions": ("start_time, id", "trainer_id, start_time", "group_id, start_time"),
+    "attendance": ("session_id", "child_id"),
+    "logs": ("created_at", "user_id, created_at"),
+}
+# SQLite подключает не больше 10 баз: рабочая и до 9 лет архива
+MAX_ATTACHED_YEARS = 9
+
+
+def archive_path(year: int, db_path: str = None) -> str:
+    stem = os.path.splitext(os.path.basename(db_path or db.db_path))[0]
+    return os.path.join(ARCHIVE_DIR, f"{stem}_{year}.db")
+
+
+def archive_years(db_path: str = None) -> list:
+    """Годы, для которых есть архивные файлы"""
+    stem = os.path.splitext(os.path.basename(db_path or db.db_path))[0]
+    years = []
+    for path in glob.glob(os.path.join(glob.escape(ARCHIVE_DIR), f"{glob.escape(stem)}_*.db")):
+        match = re.fullmatch(re.escape(stem) + r"_(\d{4})\.db", os.path.basename(path))
+        if match:
+            years.append(int(match.group(1)))
+    return sorted(years)
+
+
+def _read_only_uri(path: str) -> str:
+    return "file:" + urllib.request.pathname2url(os.path.abspath(path)) + "?mode=ro"
+
+
+async def _columns(conn, schema: str, table: str) -> list:
+    async with conn.execute(f"PRAGMA {schema}.table_info({table})") as cursor:
+        return [(row[1], row[2], row[5]) for row in await cursor.fetchall()]
+
+
+# ЧТЕНИЕ ИСТОРИИ
+
+async def attach_history(conn, start: date, end: date = None) -> list:
+    """Подключить архивы лет периода [start, end) к соединению отчёта
+
+    Архивы подключаются только для чтения, временные представления sessions, attendance
+    и logs (объединение рабочей базы и архивов) заслоняют одноимённые таблицы в запросах
+    этого соединения. Строка, оставшаяся после сбоя переноса и в рабочей базе, и в архиве
+    (см. _move_batch), берётся только из рабочей базы. Возвращает подключённые годы;
+    если архивов за период нет - ничего.
+    """
+    last_year = (end - timedelta(days=1)).year if end else get_current_time().year
+    years = [year for year in archive_years() if start.year <= year <= last_year][-MAX_ATTACHED_YEARS:]
+    if not years:
+        return []
+
+    for year in years:
+        await conn.execute(f"ATTACH DATABASE ? AS archive_{year}", (_read_only_uri(archive_path(year)),))
+    for table in ARCHIVE_INDEXES:
+        columns = ", ".join(name for name, _, _ in await _columns(conn, "main", table))
+        parts = [f"SELECT {columns} FROM main.{table}"]
+        for year in years:
+            # Архив года мог не получить эту таблицу (например, только журнал)
+            if await _columns(conn, f"archive_{year}", table):
+                parts.append(f"SELECT {columns} FROM archive_{year}.{table} "
+                             f"WHERE id NOT IN (SELECT id FROM main.{table})")
+        await conn.execute(f"CREATE TEMP VIEW {table} AS " + " UNION ALL ".join(parts))
+    return years
+
+
+# ПЕРЕНОС
+
+async def _prepare_archive(conn, table: str):
+    """Таблица в подключённом архиве: те же столбцы, что в рабочей базе, без внешних ключей"""
+    main_columns = await _columns(conn, "main", table)
+    archive_columns = {name for name, _, _ in await _columns(conn, "archive", table)}
+    if not archive_columns:
+        definition = ", ".join(f"{name} {type_} PRIMARY KEY" if pk else f"{name} {type_}"
+                               for name, type_, pk in main_columns)
+        await conn.execute(f"CREATE TABLE archive.{table} ({definition})")
+        for number, index_columns in enumerate(ARCHIVE_INDEXES[table], 1):
+            await conn.execute(f"CREATE INDEX archive.idx_{table}_{number} ON {table}({index_columns})")
+    else:
+        # Столбцы, добавленные в рабочую базу после создания архива
+        for name, type_, _ in main_columns:
+            if name not in archive_columns:
+                await conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {type_}")
+    return ", ".join(name for name, _, _ in main_columns)
+
+
+async def _move_batch(year: int, table: str, time_column: str, cutoff: str, batch_size: int) -> int:
+    """Перенос до batch_size строк одного года в архив одной транзакцией; возвращает число строк
+
+    Сначала строки пишутся в архив (INSERT OR IGNORE), потом удаляются из рабочей базы.
+    В режиме WAL транзакция атомарна для каждой базы по отдельности: после сбоя строка может
+    оказаться в обеих базах, и следующий запуск просто удалит её из рабочей. До этого
+    attach_history показывает её один раз.
+    """
+    # Полные даты: у столбцов TIMESTAMP числовое сродство, и строка "2025" сравнивалась бы как число
+    low, high = date(year, 1, 1).isoformat(), date(year + 1, 1, 1).isoformat()
+    condition = f"{time_column} < ? AND {time_column} >= ? AND {time_column} < ?"
+    if table == "sessions":
+        # Незавершённое занятие не трогаем
+        condition += " AND status != 'started'"
+
+    async with db.connect() as conn:
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        await conn.execute("ATTACH DATABASE ? AS archive", (archive_path(year),))
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            columns = await _prepare_archive(conn, table)
+            async with conn.execute(
+                    f"SELECT id FROM main.{table} WHERE {condition} ORDER BY id LIMIT ?",
+                    (cutoff, low, high, batch_size)
+            ) as cursor:
+                ids = json.dumps([row[0] for row in await cursor.fetchall()])
+            selected = "SELECT value FROM json_each(?)"
+
+            if table == "sessions":
+                attendance_columns = await _prepare_archive(conn, "attendance")
+                await conn.execute(
+                    f"""INSERT OR IGNORE INTO archive.attendance ({attendance_columns})
+                        SELECT {attendance_columns} FROM main.attendance WHERE session_id IN ({selected})""", (ids,)
+                )
+            cursor = await conn.execute(
+                f"INSERT OR IGNORE INTO archive.{table} ({columns}) "
+                f"SELECT {columns} FROM main.{table} WHERE id IN ({selected})", (ids,)
+            )
+            await cursor.close()
+            if table == "sessions":
+                await conn.execute(f"DELETE FROM main.attendance WHERE session_id IN ({selected})", (ids,))
+            cursor = await conn.execute(f"DELETE FROM main.{table} WHERE id IN ({selected})", (ids,))
+            moved = cursor.rowcount
+            await cursor.close()
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+        finally:
+            await conn.execute("DETACH DATABASE archive")
+    return moved
+
+
+async def _years_to_move(table: str, time_column: str, cutoff: str) -> list:
+    async with db.connect() as conn:
+        async with conn.execute(
+                f"SELECT DISTINCT CAST(substr({time_column}, 1, 4) AS INTEGER) FROM {table} WHERE {time_column} < ?",
+                (cutoff,)
+        ) as cursor:
+            return sorted(row[0] for row in await cursor.fetchall() if row[0])
+
+
+async def _count_to_move(table: str, time_column: str, cutoff: str) -> int:
+    async with db.connect() as conn:
+        async with conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {time_column} < ?", (cutoff,)) as cursor:
+            return (await cursor.fetchone())[0]
+
+
+def _cutoff(days: int) -> str:
+    return (get_current_time() - timedelta(days=days)).date().isoformat()
+
+
+async def archive_old_rows(batch_size: int = RETENTION_BATCH_SIZE, dry_run: bool = False) -> dict:
+    """Перенос старых занятий с посещаемостью и журнала действий; возвращает число строк по таблицам"""
+    plan = []
+    if HISTORY_RETENTION_DAYS > 0:
+        plan.append(("sessions", "start_time", _cutoff(HISTORY_RETENTION_DAYS)))
+    if LOG_RETENTION_DAYS > 0:
+        plan.append(("logs", "created_at", _cutoff(LOG_RETENTION_DAYS)))
+
+    moved = {}
+    for table, time_column, cutoff in plan:
+        if dry_run:
+            moved[table] = await _count_to_move(table, time_column, cutoff)
+            continue
+        moved[table] = 0
+        for year in await _years_to_move(table, time_column, cutoff):
+            while True:
+                count = await _move_batch(year, table, time_column, cutoff, batch_size)
+                moved[table] += count
+                if count < batch_size:
+                    break
+                # Между транзакциями - обработчики обновлений
+                await asyncio.sleep(0)
+        if moved[table]:
+            logger.info(f"Архив: перенесено {table} старше {cutoff}: {moved[table]}")
+    return moved
+
+
+# СЖАТИЕ
+
+async def incremental_vacuum(step_pages: int = VACUUM_STEP_PAGES) -> int:
+    """Вернуть свободные страницы файлу по step_pages за шаг; возвращает число страниц"""
+    async with db.connect() as conn:
+        async with conn.execute("PRAGMA auto_vacuum") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode != 2:
+            logger.warning("Архив: у базы нет auto_vacuum=INCREMENTAL, место не возвращается. "
+                           "Один раз: python retention.py --enable-incremental-vacuum")
+            return 0
+
+        released = 0
+        while True:
+            async with conn.execute("PRAGMA freelist_count") as cursor:
+                free = (await cursor.fetchone())[0]
+            if not free:
+                break
+            async with conn.execute(f"PRAGMA incremental_vacuum({min(free, step_pages)})") as cursor:
+                await cursor.fetchall()
+            released += min(free, step_pages)
+            await asyncio.sleep(0)
+    if released:
+        logger.info(f"Архив: возвращено страниц: {released}")
+    return released
+
+
+async def enable_incremental_vacuum():
+    """Перевод существующей базы на auto_vacuum=INCREMENTAL (полный VACUUM, бот лучше остановить)"""
+    async with db.connect() as conn:
+        await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.execute("VACUUM")
+
+
+async def run_retention(dry_run: bool = False) -> dict:
+    moved = await archive_old_rows(dry_run=dry_run)
+    if not dry_run and any(moved.values()):
+        await incremental_vacuum()
+    return moved
+
+
+def setup_retention(scheduler):
+    """Ночной перенос истории в архивы (RETENTION_CRON, по умолчанию 03:30 по Ташкенту)"""
+
+    async def job(scheduled_at: datetime):
+        await run_retention()
+
+    scheduler.add_job("retention", RETENTION_CRON, job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос старой истории в архивы по годам")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать строки к переносу")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="перевести базу на auto_vacuum=INCREMENTAL (полный VACUUM)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.enable_incremental_vacuum:
+        asyncio.run(enable_incremental_vacuum())
+        print("auto_vacuum = INCREMENTAL")
+        return
+    moved = asyncio.run(run_retention(dry_run=args.dry_run))
+    print(", ".join(f"{table}: {count}" for table, count in moved.items()) or "Хранение истории отключено")
+
+
+if __name__ == "__main__":
+    main()
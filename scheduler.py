@@ -0,0 +1,241 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from config import TIMEZONE
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Максимальный интервал сна: после него время пересчитывается заново,
+# чтобы корректно пережить перевод системных часов
+MAX_SLEEP_SECONDS = 3600
+
+
+class CronSpec:
+    """Расписание в формате cron: 'минута час день месяц день_недели'
+
+    Поддерживаются '*', списки '1,15', диапазоны '1-5' и шаги '*/10'.
+    День недели: 0-6, где 0 - воскресенье (7 тоже воскресенье).
+    """
+
+    FIELDS = (
+        ("minute", 0, 59),
+        ("hour", 0, 23),
+        ("day", 1, 31),
+        ("month", 1, 12),
+        ("weekday", 0, 7),
+    )
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Неверное cron-выражение: {expression!r}")
+
+        self.expression = expression
+        values = {}
+        for (name, low, high), part in zip(self.FIELDS, parts):
+            values[name] = self._parse_field(part, low, high)
+
+        self.minutes = sorted(values["minute"])
+        self.hours = sorted(values["hour"])
+        self.days = values["day"]
+        self.months = values["month"]
+        self.weekdays = {d % 7 for d in values["weekday"]}
+        # Как в классическом cron: если ограничены и день месяца, и день недели,
+        # достаточно совпадения любого из них
+        self._day_any = parts[2] == "*"
+        self._weekday_any = parts[4] == "*"
+
+    @staticmethod
+    def _parse_field(part: str, low: int, high: int) -> set:
+        result = set()
+        for item in part.split(","):
+            step = 1
+            if "/" in item:
+                item, step_text = item.split("/", 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Неверный шаг в cron-поле: {part!r}")
+
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start_text, end_text = item.split("-", 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = end = int(item)
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Значение вне диапазона в cron-поле: {part!r}")
+            result.update(range(start, end + 1, step))
+        return result
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        # isoweekday: 1 - понедельник ... 7 - воскресенье
+        day_ok = day.day in self.days
+        weekday_ok = day.isoweekday() % 7 in self.weekdays
+        if self._day_any and self._weekday_any:
+            return True
+        if self._day_any:
+            return weekday_ok
+        if self._weekday_any:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Ближайшее время запуска строго после moment (в часовом поясе TIMEZONE)"""
+        local = moment.astimezone(TIMEZONE).replace(tzinfo=None)
+        local = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = local.replace(hour=0, minute=0)
+
+        # Не более 5 лет вперёд - защита от выражений вроде '0 0 31 2 *'
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= local:
+                            return TIMEZONE.localize(candidate)
+            day += timedelta(days=1)
+            local = max(local, day)
+
+        raise ValueError(f"Cron-выражение никогда не срабатывает: {self.expression!r}")
+
+    def previous_at_or_before(self, moment: datetime) -> datetime:
+        """Последнее время запуска не позже moment"""
+        local = moment.astimezone(TIMEZONE).replace(tzinfo=None, second=0, microsecond=0)
+        day = local.replace(hour=0, minute=0)
+
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in reversed(self.hours):
+                    for minute in reversed(self.minutes):
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate <= local:
+                            return TIMEZONE.localize(candidate)
+            day -= timedelta(days=1)
+
+        raise ValueError(f"Cron-выражение никогда не срабатывает: {self.expression!r}")
+
+
+class Job:
+    def __init__(self, name: str, spec: CronSpec, func, catch_up: bool = True):
+        self.name = name
+        self.spec = spec
+        self.func = func
+        self.catch_up = catch_up
+        self.last_run = None
+        self.next_run = None
+
+
+class Scheduler:
+    """Планировщик задач на asyncio
+
+    Спит ровно до ближайшего запуска в часовом поясе TIMEZONE,
+    после перезапуска догоняет пропущенные запуски и хранит время
+    последнего запуска каждой задачи в таблице scheduler_state.
+    Задача получает время, на которое был запланирован запуск.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def add_job(self, name: str, cron: str, func, catch_up: bool = True):
+        """Добавление задачи по cron-выражению"""
+        if name in self.jobs:
+            raise ValueError(f"Задача {name!r} уже зарегистрирована")
+        self.jobs[name] = Job(name, CronSpec(cron), func, catch_up)
+        self._wakeup.set()
+
+    def cron(self, name: str, cron: str, catch_up: bool = True):
+        """Декоратор для регистрации задачи"""
+        def decorator(func):
+            self.add_job(name, cron, func, catch_up)
+            return func
+        return decorator
+
+    def stop(self):
+        """Остановка после текущей задачи (начатый отчёт дорабатывает до конца)"""
+        self._stopping = True
+        self._wakeup.set()
+
+    async def _load_state(self):
+        async with db.connect() as conn:
+            async with conn.execute("SELECT job_name, last_run FROM scheduler_state") as cursor:
+                rows = await cursor.fetchall()
+
+        for job_name, last_run in rows:
+            job = self.jobs.get(job_name)
+            if job and last_run:
+                job.last_run = datetime.fromisoformat(last_run)
+
+    async def _save_state(self, job: Job):
+        async with db.connect() as conn:
+            await conn.execute(
+                """INSERT INTO scheduler_state (job_name, last_run) VALUES (?, ?)
+                   ON CONFLICT(job_name) DO UPDATE SET last_run = excluded.last_run""",
+                (job.name, job.last_run.isoformat())
+            )
+            await conn.commit()
+
+    async def _run_job(self, job: Job, scheduled_at: datetime):
+        logger.info(f"⏰ Запуск задачи {job.name} (запланирована на {scheduled_at.isoformat()})")
+        try:
+            await job.func(scheduled_at)
+        except Exception:
+            logger.exception(f"Ошибка в задаче {job.name}")
+        finally:
+            # Запуск считается выполненным даже при ошибке, иначе задача
+            # будет бесконечно повторяться при каждом перезапуске
+            job.last_run = scheduled_at
+            job.next_run = job.spec.next_after(scheduled_at)
+            await self._save_state(job)
+
+    async def _catch_up(self, now: datetime):
+        for job in self.jobs.values():
+            due = job.spec.previous_at_or_before(now)
+            if job.last_run is None:
+                # Первый запуск задачи: начинаем отсчёт с текущего момента
+                job.last_run = due
+                await self._save_state(job)
+            elif job.last_run < due and job.catch_up:
+                # Несколько пропущенных запусков схлопываются в один
+                await self._run_job(job, due)
+            job.next_run = job.spec.next_after(max(job.last_run, due))
+
+    async def run(self):
+        """Основной цикл планировщика"""
+        await self._load_state()
+        await self._catch_up(datetime.now(TIMEZONE))
+
+        while not self._stopping:
+            self._wakeup.clear()
+            now = datetime.now(TIMEZONE)
+
+            for job in self.jobs.values():
+                if job.next_run is None:
+                    job.next_run = job.spec.next_after(now)
+
+            due_jobs = [job for job in self.jobs.values() if job.next_run <= now]
+            for job in due_jobs:
+                if self._stopping:
+                    break
+                await self._run_job(job, job.next_run)
+            if due_jobs:
+                continue
+
+            if not self.jobs:
+                await self._wakeup.wait()
+                continue
+
+            next_run = min(job.next_run for job in self.jobs.values())
+            delay = min((next_run - now).total_seconds(), MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,137 @@
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import urllib.request
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from config import SLOW_QUERY_BACKUP_COUNT, SLOW_QUERY_LOG, SLOW_QUERY_MAX_BYTES, SLOW_QUERY_MS
+from logging_setup import LoopQueueHandler
+from metrics import db_slow_queries
+
+logger = logging.getLogger(__name__)
+
+# Служебные команды: планов у них нет
+_NO_PLAN = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE", "ALTER", "DROP", "VACUUM", "ATTACH", "DETACH")
+
+
+def params_shape(parameters) -> str:
+    """Типы параметров без значений: (int, str, NoneType), {id: int} или many"""
+    if parameters is None:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return "many"
+
+
+def _explain(db_path: str, sql: str, parameters) -> list:
+    """EXPLAIN QUERY PLAN на отдельном соединении только для чтения"""
+    uri = "file:" + urllib.request.pathname2url(os.path.abspath(db_path)) + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    finally:
+        conn.close()
+    # (id, parent, notused, detail): вложенность по parent
+    depth = {0: 0}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class SlowQueryLog:
+    """Журнал медленных запросов
+
+    Запросы дольше SLOW_QUERY_MS пишутся в SLOW_QUERY_LOG (с ротацией) с нормализованным
+    текстом, типами параметров, временем и числом строк. Для каждого вида запроса один
+    раз снимается EXPLAIN QUERY PLAN: полный просмотр таблицы (SCAN), например фильтр
+    по DATE(start_time), виден сразу. Значения параметров в журнал не попадают.
+    Запись в файл и ротацию делает поток QueueListener, как у основного журнала.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, path: str = SLOW_QUERY_LOG):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self._logger = None
+        self._listener = None
+        # Виды запросов, для которых план уже снят или снимается
+        self._explained = set()
+        self._tasks = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0 and bool(self.path)
+
+    def _get_logger(self) -> logging.Logger:
+        # Файл создаётся только при первом медленном запросе
+        if self._logger is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(
+                self.path, maxBytes=SLOW_QUERY_MAX_BYTES, backupCount=SLOW_QUERY_BACKUP_COUNT, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            log_queue = queue.SimpleQueue()
+            self._listener = QueueListener(log_queue, handler)
+            self._listener.start()
+            atexit.register(self.close)
+            self._logger = logging.getLogger("slow_queries.file")
+            self._logger.addHandler(LoopQueueHandler(log_queue))
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+        return self._logger
+
+    def close(self):
+        """Дописать очередь и закрыть файл журнала"""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+            for handler in list(self._logger.handlers):
+                self._logger.removeHandler(handler)
+            self._logger = None
+
+    def observe(self, shape: str, label: str, elapsed: float, parameters=None, rows: int = None,
+                db_path: str = None, sql: str = None):
+        if not self.enabled or elapsed < self.threshold:
+            return
+
+        db_slow_queries.inc(query=label)
+        self._get_logger().info(
+            f"{elapsed * 1000:.1f} ms rows={rows if rows is not None else '-'} "
+            f"params={params_shape(parameters)} | {shape}"
+        )
+
+        if shape in self._explained or not db_path or not sql or shape.upper().startswith(_NO_PLAN):
+            return
+        self._explained.add(shape)
+        if isinstance(parameters, (list, tuple, dict)) or parameters is None:
+            task = asyncio.get_running_loop().create_task(self._log_plan(shape, db_path, sql, parameters or ()))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _log_plan(self, shape: str, db_path: str, sql: str, parameters):
+        try:
+            plan = await asyncio.to_thread(_explain, db_path, sql, parameters)
+        except Exception as e:
+            # Например, запрос к временной таблице своего соединения
+            self._get_logger().info(f"PLAN недоступен ({e}) | {shape}")
+            return
+
+        scans = [line.strip() for line in plan if line.strip().startswith("SCAN")
+                 and "COVERING INDEX" not in line and "CONSTANT ROW" not in line]
+        marker = " [полный просмотр: " + "; ".join(scans) + "]" if scans else ""
+        self._get_logger().info(f"PLAN{marker} | {shape}\n" + "\n".join(plan))
+        if scans:
+            logger.warning(f"Медленный запрос с полным просмотром таблицы: {'; '.join(scans)} | {shape[:200]}")
+
+
+slow_queries = SlowQueryLog()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import FSM_FLUSH_INTERVAL, FSM_STATE_TTL_HOURS
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    # Компактный JSON: без пробелов и без экранирования кириллицы
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище в SQLite с кэшем в памяти
+
+    Все состояния загружаются в память при старте, поэтому чтение не обращается к диску.
+    Изменения помечаются как «грязные» и раз в FSM_FLUSH_INTERVAL секунд
+    записываются одной пачкой (write-behind). Состояния, которые не менялись
+    дольше FSM_STATE_TTL_HOURS, считаются брошенными и удаляются.
+    """
+
+    def __init__(self, db_path: str = None, flush_interval: float = FSM_FLUSH_INTERVAL,
+                 ttl_hours: float = FSM_STATE_TTL_HOURS, key_filter=None):
+        self.db_path = db_path
+        # В многопроцессном режиме каждый воркер загружает только ключи своих чатов,
+        # иначе он удалил бы по TTL чужие состояния по своей устаревшей копии
+        self.key_filter = key_filter
+        self.flush_interval = flush_interval
+        self.ttl_seconds = ttl_hours * 3600
+        # ключ -> [состояние, данные, время последнего изменения]
+        self._records = {}
+        self._dirty = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+
+    @staticmethod
+    def chat_id_of(storage_key: str) -> int:
+        return int(storage_key.split(":")[1])
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        thread_id = key.thread_id if key.thread_id is not None else ""
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{thread_id}:{key.destiny}"
+
+    def _touch(self, key: StorageKey) -> list:
+        storage_key = self._key(key)
+        record = self._records.get(storage_key)
+        if record is None:
+            record = self._records[storage_key] = [None, {}, 0.0]
+        record[2] = time.time()
+        self._dirty.add(storage_key)
+        return record
+
+    async def start(self):
+        """Загрузка сохранённых состояний и запуск фоновой записи"""
+        cutoff = time.time() - self.ttl_seconds
+        async with db.connect(self.db_path) as conn:
+            await conn.execute("DELETE FROM fsm_storage WHERE updated_at < ?", (cutoff,))
+            await conn.commit()
+            async with conn.execute("SELECT key, state, data, updated_at FROM fsm_storage") as cursor:
+                async for storage_key, state, data, updated_at in cursor:
+                    if self.key_filter and not self.key_filter(storage_key):
+                        continue
+                    self._records[storage_key] = [state, json.loads(data) if data else {}, updated_at]
+
+        logger.info(f"FSM: загружено состояний: {len(self._records)}")
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    # ИНТЕРФЕЙС BaseStorage
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._touch(key)[0] = state.state if isinstance(state, State) else state
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._records.get(self._key(key))
+        return record[0] if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        self._touch(key)[1] = data.copy()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._records.get(self._key(key))
+        return record[1].copy() if record else {}
+
+    def stats(self) -> dict:
+        return {'states': len(self._records), 'dirty': len(self._dirty)}
+
+    async def close(self) -> None:
+        # Вызывается дважды: диспетчером при остановке приёма обновлений и в конце
+        # остановки бота. Изменения между вызовами остаются в памяти и пишутся вторым
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    # ЗАПИСЬ НА ДИСК
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [storage_key for storage_key, record in self._records.items() if record[2] < cutoff]
+        for storage_key in expired:
+            del self._records[storage_key]
+            self._dirty.add(storage_key)
+        if expired:
+            logger.info(f"FSM: удалено брошенных состояний: {len(expired)}")
+
+    async def flush(self):
+        """Запись всех изменённых состояний одной транзакцией"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+
+            upserts, deletes = [], []
+            for storage_key in dirty:
+                record = self._records.get(storage_key)
+                if record is None or (record[0] is None and not record[1]):
+                    # Пустое состояние не храним ни в памяти, ни в базе
+                    self._records.pop(storage_key, None)
+                    deletes.append((storage_key,))
+                else:
+                    upserts.append((storage_key, record[0], _dumps(record[1]), record[2]))
+
+            try:
+                async with db.connect(self.db_path) as conn:
+                    if upserts:
+                        await conn.executemany(
+                            """INSERT INTO fsm_storage (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                               ON CONFLICT(key) DO UPDATE SET
+                                   state = excluded.state, data = excluded.data, updated_at = excluded.updated_at""",
+                            upserts
+                        )
+                    if deletes:
+                        await conn.executemany("DELETE FROM fsm_storage WHERE key = ?", deletes)
+                    await conn.commit()
+            except Exception:
+                # Не потерять изменения: повторим при следующей записи
+                self._dirty |= dirty
+                raise
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self._expire()
+                await self.flush()
+            except Exception:
+                logger.exception("FSM: ошибка записи состояний")
@@ -61,6 +61,10 @@ class AdminStates(StatesGroup):
     editing_child_group = State()
 
 
+class ReportStates(StatesGroup):
+    waiting_for_period = State()
+
+
 class CashierStates(StatesGroup):
     confirming_payment_receipt = State()
 
@@ -0,0 +1,31 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from database import db
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Пустая база бота во временном каталоге; путь к файлу"""
+    previous, db.db_path = db.db_path, str(tmp_path / "academy.db")
+    asyncio.run(db.init_db())
+    try:
+        yield db.db_path
+    finally:
+        db.db_path = previous
+
+
+@pytest.fixture
+def academy(database):
+    """База с одним филиалом, тренером (id 1), группой и ребёнком (id 1)"""
+    conn = sqlite3.connect(database)
+    with conn:
+        conn.execute("INSERT INTO branches (id, name) VALUES (1, 'Центр')")
+        conn.execute("INSERT INTO users (id, telegram_id, role) VALUES (1, 100, 'trainer'), (2, 200, 'parent')")
+        conn.execute("INSERT INTO trainers (id, user_id, branch_id, full_name) VALUES (1, 1, 1, 'Тренер')")
+        conn.execute("INSERT INTO groups_table (id, name, branch_id, trainer_id) VALUES (1, 'U10', 1, 1)")
+        conn.execute("INSERT INTO children (id, full_name, parent_id, group_id) VALUES (1, 'Ребёнок', 2, 1)")
+    conn.close()
+    return database
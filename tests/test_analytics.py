@@ -0,0 +1,29 @@
+import asyncio
+import sqlite3
+
+from analytics import AnalyticsSnapshot
+
+
+def test_orphan_attendance_keeps_previous_snapshot(academy):
+    """Отметка удалённого занятия: обе попытки загрузки не сходятся, прежний снимок остаётся"""
+    conn = sqlite3.connect(academy)
+    with conn:
+        conn.execute("INSERT INTO sessions (id, type, trainer_id, group_id, start_time, status) "
+                     "VALUES (1, 'training', 1, 1, '2026-10-01T10:00:00+05:00', 'completed')")
+        conn.execute("INSERT INTO attendance (session_id, child_id, status) VALUES (1, 1, 'present')")
+    conn.close()
+
+    snapshot = AnalyticsSnapshot(academy)
+    asyncio.run(snapshot.refresh())
+    assert snapshot.loaded and len(snapshot.att_id) == 1
+
+    conn = sqlite3.connect(academy)
+    with conn:
+        # foreign_keys выключены на обычных соединениях - такая строка возможна
+        conn.execute("INSERT INTO attendance (session_id, child_id, status) VALUES (999, 1, 'present')")
+    conn.close()
+
+    asyncio.run(snapshot.refresh())
+    assert snapshot.loaded
+    assert snapshot.session_id.tolist() == [1]
+    assert len(snapshot.att_id) == 1
@@ -0,0 +1,21 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import reports_handlers  # noqa: F401 - регистрирует маршруты отчётов
+from callback_dispatch import callbacks
+
+
+def test_old_report_filter_back_button_returns_to_filter_menu():
+    """rflist_back из старых сообщений не должен падать с KeyError: 'back'"""
+    callback = MagicMock(data="rflist_back")
+    callback.message.edit_text = AsyncMock()
+
+    async def run():
+        route, kwargs = await callbacks.resolve(callback)
+        await route.handler.call(callback, **kwargs)
+        return route, kwargs
+
+    route, kwargs = asyncio.run(run())
+    assert route.action == "rflist" and kwargs == {"kind": "back"}
+    text = callback.message.edit_text.call_args.args[0]
+    assert text == "Выберите, по кому построить отчёт:"
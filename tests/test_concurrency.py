@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, Update, User
+
+from concurrency import ChatConcurrencyMiddleware
+
+CHAT_ID = 1001
+
+
+class Flow(StatesGroup):
+    confirm = State()
+
+
+def _update(update_id: int, text: str) -> Update:
+    user = User(id=CHAT_ID, is_bot=False, first_name="Test")
+    message = Message(message_id=update_id, date=datetime.now(), text=text,
+                      chat=Chat(id=CHAT_ID, type="private"), from_user=user)
+    return Update(update_id=update_id, message=message)
+
+
+def test_second_update_of_chat_sees_state_set_by_first():
+    """Два обновления одного чата подряд: второе маршрутизируется по состоянию, которое задало первое"""
+    handled = []
+    router = Router()
+
+    @router.message(F.text == "start")
+    async def start(message: Message, state: FSMContext):
+        # Пока первое обновление работает, второе уже прошло FSMContextMiddleware
+        await asyncio.sleep(0.05)
+        await state.set_state(Flow.confirm)
+        handled.append("start")
+
+    @router.message(StateFilter(Flow.confirm), F.text == "yes")
+    async def confirm(message: Message, state: FSMContext):
+        await state.clear()
+        handled.append("confirm")
+
+    @router.message()
+    async def fallback(message: Message):
+        handled.append("fallback")
+
+    async def run():
+        dp = Dispatcher(storage=MemoryStorage())
+        dp.update.outer_middleware(ChatConcurrencyMiddleware())
+        dp.include_router(router)
+        bot = Bot(token="42:TEST")
+        try:
+            await asyncio.gather(dp.feed_update(bot, _update(1, "start")), dp.feed_update(bot, _update(2, "yes")))
+        finally:
+            await bot.session.close()
+
+    asyncio.run(run())
+    assert handled == ["start", "confirm"]
@@ -0,0 +1,51 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from database import db
+
+
+def _create_payment(key=None, amount=350000):
+    return asyncio.run(db.create_payment(1, 1, amount, "2026-10", idempotency_key=key))
+
+
+def _with_trainer():
+    return [dict(row) for row in asyncio.run(db.get_payments_with_trainer(1))]
+
+
+def test_repeated_payment_key_creates_one_payment(academy):
+    first = _create_payment("tap-1")
+    second = _create_payment("tap-1")
+    assert first[1] is True
+    assert second == (first[0], False)
+    assert len(_with_trainer()) == 1
+
+
+def test_payments_without_key_are_not_merged(academy):
+    assert _create_payment()[1] and _create_payment()[1]
+    assert len(_with_trainer()) == 2
+
+
+def test_payment_constraint_error_is_not_hidden_by_key(academy):
+    with pytest.raises(sqlite3.IntegrityError):
+        _create_payment("tap-2", amount=None)
+
+
+def test_repeated_batch_confirmation_is_duplicate(academy):
+    _create_payment("tap-1")
+    batch_id = asyncio.run(db.create_cashbox_batch(1, _with_trainer()))
+    assert asyncio.run(db.confirm_cashbox_batch(batch_id)) == 'confirmed'
+    assert asyncio.run(db.confirm_cashbox_batch(batch_id)) == 'duplicate'
+    assert _with_trainer() == []
+
+
+def test_batch_with_payment_sent_by_other_batch_is_stale(academy):
+    _create_payment("tap-1")
+    payments = _with_trainer()
+    first = asyncio.run(db.create_cashbox_batch(1, payments))
+    second = asyncio.run(db.create_cashbox_batch(1, payments))
+    assert asyncio.run(db.confirm_cashbox_batch(first)) == 'confirmed'
+    assert asyncio.run(db.confirm_cashbox_batch(second)) == 'stale'
+    assert asyncio.run(db.confirm_cashbox_batch(second)) == 'stale'
+    assert asyncio.run(db.confirm_cashbox_batch(999)) == 'missing'
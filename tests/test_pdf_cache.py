@@ -0,0 +1,47 @@
+import asyncio
+import os
+
+import pdf_reports
+
+
+def _files(directory, *names):
+    paths = []
+    for age, name in enumerate(names):
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(b"%PDF")
+        # Первый файл - самый старый
+        os.utime(path, (1000 + age, 1000 + age))
+        paths.append(path)
+    return paths
+
+
+def test_eviction_skips_file_being_sent(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_reports, "PDF_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf_reports, "PDF_CACHE_MAX_FILES", 1)
+    oldest, middle, newest = _files(str(tmp_path), "a.pdf", "b.pdf", "c.pdf")
+
+    pdf_reports._acquire(oldest)
+    try:
+        removed = pdf_reports._evict_old_files()
+    finally:
+        pdf_reports._release(oldest)
+
+    assert removed == [middle]
+    assert os.path.exists(oldest) and os.path.exists(newest)
+
+
+def test_cache_hit_marks_file_as_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_reports, "PDF_CACHE_DIR", str(tmp_path))
+    data = {"month": "2026-10"}
+    name = "_".join(("branches", "2026-10", pdf_reports.data_version(data))) + ".pdf"
+    (path,) = _files(str(tmp_path), name)
+
+    async def send():
+        async with pdf_reports.cached_pdf("branches", "2026-10", data) as cached:
+            assert cached == path
+            assert cached in pdf_reports._in_use
+
+    asyncio.run(send())
+    assert os.path.getmtime(path) > 1000
+    assert path not in pdf_reports._in_use
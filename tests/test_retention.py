@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+import retention
+from database import db
+
+OLD = "2024-03-01T10:00:00+05:00"
+RECENT = "2026-10-01T10:00:00+05:00"
+
+
+@pytest.fixture
+def history(academy, tmp_path, monkeypatch):
+    """Два завершённых старых занятия с отметками, незавершённое старое и свежее"""
+    monkeypatch.setattr(retention, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(retention, "HISTORY_RETENTION_DAYS", 365)
+    monkeypatch.setattr(retention, "LOG_RETENTION_DAYS", 0)
+    conn = sqlite3.connect(academy)
+    with conn:
+        conn.executemany(
+            "INSERT INTO sessions (id, type, trainer_id, group_id, start_time, status) VALUES (?, 'training', 1, 1, ?, ?)",
+            [(1, OLD, "completed"), (2, OLD, "completed"), (3, OLD, "started"), (4, RECENT, "completed")]
+        )
+        conn.executemany(
+            "INSERT INTO attendance (session_id, child_id, status) VALUES (?, 1, 'present')", [(1,), (2,), (4,)]
+        )
+    conn.close()
+    return academy
+
+
+def _ids(path: str, table: str) -> list:
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute(f"SELECT id FROM {table} ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _report_counts() -> tuple:
+    async def count():
+        async with db.snapshot(prepare=lambda conn: retention.attach_history(conn, date(2024, 1, 1))) as conn:
+            async with conn.execute("SELECT (SELECT COUNT(*) FROM sessions), (SELECT COUNT(*) FROM attendance)") as cursor:
+                return tuple(await cursor.fetchone())
+    return asyncio.run(count())
+
+
+def test_old_sessions_move_in_batches_and_started_stays(history):
+    moved = asyncio.run(retention.archive_old_rows(batch_size=1))
+
+    assert moved == {"sessions": 2}
+    assert _ids(history, "sessions") == [3, 4]
+    assert _ids(history, "attendance") == [3]
+    archive = retention.archive_path(2024)
+    assert os.path.exists(archive)
+    assert _ids(archive, "sessions") == [1, 2]
+    assert len(_ids(archive, "attendance")) == 2
+
+
+def test_report_reads_archive_through_attach_history(history):
+    asyncio.run(retention.archive_old_rows())
+    assert _report_counts() == (4, 3)
+
+
+def test_row_left_in_both_databases_is_counted_once(history):
+    asyncio.run(retention.archive_old_rows())
+    # Сбой после записи в архив, но до удаления из рабочей базы
+    conn = sqlite3.connect(history)
+    with conn:
+        conn.execute("ATTACH DATABASE ? AS archive", (retention.archive_path(2024),))
+        conn.execute("INSERT INTO main.sessions SELECT * FROM archive.sessions WHERE id = 1")
+        conn.execute("INSERT INTO main.attendance SELECT * FROM archive.attendance WHERE session_id = 1")
+    conn.close()
+
+    assert _report_counts() == (4, 3)
@@ -0,0 +1,194 @@
+import logging
+import time
+from collections import deque
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from callback_dispatch import callbacks
+from config import FLOOD_LIMIT, FLOOD_WINDOW, THROTTLE_BURST, THROTTLE_DUPLICATE_WINDOW, THROTTLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Действия со своим лимитом: (запас нажатий, пополнение в секунду).
+# Их ограничивает только своё ведро: в окно флуда они не считаются, иначе быстрая
+# перекличка большой группы упиралась бы в FLOOD_LIMIT раньше, чем в свой запас
+ACTION_LIMITS = {
+    # Перекличка: тренер отмечает всю группу подряд
+    "present": (40, 5),
+    "absent": (40, 5),
+}
+
+# Одна и та же кнопка законно нажимается несколько раз подряд - склеиваются
+# только нажатия, пришедшие пока предыдущее ещё обрабатывается
+REPEATABLE_ACTIONS = {"report_page_next", "report_page_prev"}
+
+# Период очистки устаревших записей, сек
+SWEEP_INTERVAL = 60
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, capacity: float, rate: float, now: float) -> bool:
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class SlidingWindow:
+    """Число событий по ключу за последние window секунд"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._events = {}
+
+    def hit(self, key, now: float) -> int:
+        events = self._events.setdefault(key, deque())
+        events.append(now)
+        cutoff = now - self.window
+        while events[0] <= cutoff:
+            events.popleft()
+        return len(events)
+
+    def sweep(self, now: float):
+        cutoff = now - self.window
+        for key in [key for key, events in self._events.items() if events[-1] <= cutoff]:
+            del self._events[key]
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Защита от повторных нажатий и флуда (до очереди чата и до базы)
+
+    - Повтор той же кнопки, пока первое нажатие обрабатывается или в течение
+      THROTTLE_DUPLICATE_WINDOW после него, склеивается с первым: ответ на нажатие
+      без запуска обработчика. Двойной тап по «Подтвердить» не создаёт вторую оплату.
+    - Ведро токенов на пользователя и действие ограничивает частые нажатия разных кнопок.
+    - Больше FLOOD_LIMIT обновлений за FLOOD_WINDOW секунд от одного пользователя
+      отбрасываются сразу, с одним предупреждением на окно. Нажатия действий из
+      ACTION_LIMITS в окно не считаются - их ограничивает своё ведро.
+
+    Всё хранится в памяти процесса: в многопроцессном режиме пользователь всегда
+    попадает в один и тот же воркер.
+    """
+
+    def __init__(self, duplicate_window: float = THROTTLE_DUPLICATE_WINDOW,
+                 burst: int = THROTTLE_BURST, rate: float = THROTTLE_RATE,
+                 flood_limit: int = FLOOD_LIMIT, flood_window: float = FLOOD_WINDOW):
+        self.duplicate_window = duplicate_window
+        self.burst = burst
+        self.rate = rate
+        self.flood_limit = flood_limit
+        self._flood = SlidingWindow(flood_window)
+        # (user_id, действие) -> TokenBucket
+        self._buckets = {}
+        # (user_id, callback_data) -> время завершения обработки
+        self._recent = {}
+        self._in_progress = set()
+        # user_id -> время последнего предупреждения о флуде
+        self._warned = {}
+        self._last_sweep = time.monotonic()
+        self.coalesced = 0
+        self.throttled = 0
+        self.flooded = 0
+
+    async def __call__(self, handler, event: Update, data: dict):
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        if now - self._last_sweep > SWEEP_INTERVAL:
+            self._sweep(now)
+
+        callback = event.callback_query
+        action = None
+        if callback is not None and callback.data:
+            action = callbacks.action_of(callback.data) or callback.data
+
+        if action not in ACTION_LIMITS and self._flood.hit(user.id, now) > self.flood_limit:
+            self.flooded += 1
+            await self._reject_flood(event, user.id, now)
+            return None
+
+        if action is None:
+            return await handler(event, data)
+
+        key = (user.id, callback.data)
+        window = 0 if action in REPEATABLE_ACTIONS else self.duplicate_window
+        if key in self._in_progress or now - self._recent.get(key, float("-inf")) < window:
+            self.coalesced += 1
+            await self._answer(callback)
+            return None
+
+        capacity, rate = self._limits(action)
+        bucket = self._buckets.get((user.id, action))
+        if bucket is None:
+            bucket = self._buckets[(user.id, action)] = TokenBucket(capacity, now)
+        if not bucket.take(capacity, rate, now):
+            self.throttled += 1
+            await self._answer(callback, "⏳ Слишком часто, подождите немного")
+            return None
+
+        self._in_progress.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_progress.discard(key)
+            self._recent[key] = time.monotonic()
+
+    def _limits(self, action: str):
+        return ACTION_LIMITS.get(action, (self.burst, self.rate))
+
+    @staticmethod
+    async def _answer(callback, text: str = None):
+        try:
+            await callback.answer(text)
+        except Exception as e:
+            logger.debug(f"Не удалось ответить на callback: {e}")
+
+    async def _reject_flood(self, event: Update, user_id: int, now: float):
+        if now - self._warned.get(user_id, float("-inf")) < self._flood.window:
+            return
+        self._warned[user_id] = now
+        logger.warning(f"Флуд от пользователя {user_id}: обновления отбрасываются")
+        text = "⏳ Слишком много запросов. Подождите несколько секунд."
+        try:
+            if event.callback_query:
+                await event.callback_query.answer(text, show_alert=True)
+            elif event.message:
+                await event.message.answer(text)
+        except Exception as e:
+            logger.debug(f"Не удалось предупредить о флуде: {e}")
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        self._flood.sweep(now)
+        self._recent = {key: at for key, at in self._recent.items() if now - at < self.duplicate_window}
+        self._warned = {key: at for key, at in self._warned.items() if now - at < self._flood.window}
+        # Полное ведро ничем не отличается от нового
+        full = []
+        for key, bucket in self._buckets.items():
+            capacity, rate = self._limits(key[1])
+            if bucket.tokens + (now - bucket.updated) * rate >= capacity:
+                full.append(key)
+        for key in full:
+            del self._buckets[key]
+
+    def stats(self) -> dict:
+        return {
+            'coalesced': self.coalesced,
+            'throttled': self.throttled,
+            'flooded': self.flooded,
+            'buckets': len(self._buckets),
+        }
+
+
+throttling = ThrottlingMiddleware()
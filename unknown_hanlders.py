@@ -3,13 +3,13 @@ from aiogram.types import Message
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 
-from states import AdminStates, RegistrationStates, SessionStates, PaymentStates
+from states import AdminStates, RegistrationStates, SessionStates, PaymentStates, ReportStates
 
 unknown_router = Router()
 
 
 @unknown_router.message(~StateFilter(
-    AdminStates, RegistrationStates, SessionStates, PaymentStates
+    AdminStates, RegistrationStates, SessionStates, PaymentStates, ReportStates
 ))
 async def unknown_message(message: Message, state: FSMContext):
     """Обработка неизвестных сообщений (только когда не в стейте)"""
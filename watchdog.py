@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from aiogram import BaseMiddleware
+
+from config import WATCHDOG_INTERVAL, WATCHDOG_STALL_MS
+from metrics import handler_label, loop_lag_seconds, loop_stalls
+
+logger = logging.getLogger(__name__)
+
+# Глубина стека в логе: внешние кадры (цикл событий, aiogram) неинтересны
+STACK_LIMIT = 30
+
+
+class LoopWatchdog:
+    """Сторож цикла событий
+
+    Пульс в цикле событий каждые interval секунд измеряет, насколько он опоздал
+    (bot_loop_lag_seconds). Отдельный поток следит за пульсом: если цикл не отвечает
+    дольше threshold, поток снимает стек потока цикла (sys._current_frames) и пишет
+    в лог, что именно его держит: синхронный вызов, обработчик и задачу. После
+    блокировки пульс сообщает её полную длительность и считает её в bot_loop_stalls_total.
+
+    Накладные расходы - одно пробуждение цикла и потока за interval, поэтому сторож
+    можно держать включённым в продакшене (WATCHDOG_STALL_MS > 0).
+    """
+
+    def __init__(self, threshold_ms: float = WATCHDOG_STALL_MS, interval: float = WATCHDOG_INTERVAL):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._loop = None
+        self._loop_thread_id = None
+        self._beat = 0.0
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+        # Задача -> обработчик, который она сейчас выполняет
+        self._handlers = {}
+        # Блокировка, замеченная потоком: (обработчик, задача); пульс забирает её после разблокировки
+        self._stall = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0 and self.interval > 0
+
+    def instrument(self, dp):
+        """Имена обработчиков для отчёта и запуск вместе с диспетчером"""
+        for event in ("message", "callback_query"):
+            dp.observers[event].middleware(WatchdogMiddleware(self))
+        dp.startup.register(self.start)
+        dp.shutdown.register(self.stop)
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="watchdog")
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Сторож цикла событий: пульс {self.interval} с, порог {self.threshold * 1000:.0f} ms")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    # ЦИКЛ СОБЫТИЙ
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            lag = max(self._beat - expected, 0.0)
+            loop_lag_seconds.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            if lag >= self.threshold:
+                stall, self._stall = self._stall, None
+                handler, task = stall or ("unknown", "unknown")
+                self.stalls += 1
+                loop_stalls.inc(handler=handler)
+                logger.warning(f"Цикл событий был заблокирован {lag * 1000:.0f} ms: обработчик {handler}, задача {task}")
+
+    def track(self, name: str):
+        task = asyncio.current_task()
+        if task is not None:
+            self._handlers[task] = name
+        return task
+
+    def untrack(self, task):
+        if task is not None:
+            self._handlers.pop(task, None)
+
+    # ПОТОК СТОРОЖА
+
+    def _monitor(self):
+        reported_beat = None
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            # Об одной блокировке - одно сообщение со стеком
+            if blocked < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            try:
+                self._report(blocked)
+            except Exception:
+                logger.exception("Сторож цикла событий: не удалось снять стек")
+
+    def _report(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame is not None else ""
+        # Чтение без блокировок: данные нужны только для диагностики
+        task = asyncio.current_task(self._loop)
+        handler = self._handlers.get(task, "unknown") if task is not None else "вне задачи"
+        task_name = task.get_name() if task is not None else "-"
+        self._stall = (handler, task_name)
+        logger.warning(
+            f"Цикл событий заблокирован уже {blocked * 1000:.0f} ms: обработчик {handler}, задача {task_name}\n{stack}"
+        )
+
+    def stats(self) -> dict:
+        return {'stalls': self.stalls, 'max_lag_ms': round(self.max_lag * 1000, 1)}
+
+
+class WatchdogMiddleware(BaseMiddleware):
+    """Запоминает, какой обработчик выполняет текущая задача"""
+
+    def __init__(self, watchdog: LoopWatchdog):
+        self.watchdog = watchdog
+
+    async def __call__(self, handler, event, data: dict):
+        if not self.watchdog.enabled:
+            return await handler(event, data)
+        task = self.watchdog.track(handler_label(data))
+        try:
+            return await handler(event, data)
+        finally:
+            self.watchdog.untrack(task)
+
+
+watchdog = LoopWatchdog()
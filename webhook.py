@@ -0,0 +1,122 @@
+import asyncio
+import atexit
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import (
+    WEBAPP_HOST, WEBAPP_PORT, WEBHOOK_PATH, WEBHOOK_RECORD_PATH, WEBHOOK_SECRET, WEBHOOK_URL
+)
+from logging_setup import LoopQueueHandler
+
+logger = logging.getLogger(__name__)
+
+_record_logger = None
+_record_listener = None
+
+
+class WebhookSetupError(Exception):
+    """Telegram не принял адрес вебхука - нужно переходить на polling"""
+
+
+def _get_record_logger() -> logging.Logger:
+    """Запись в WEBHOOK_RECORD_PATH через очередь: файл дописывает поток QueueListener"""
+    global _record_logger, _record_listener
+    if _record_logger is None:
+        handler = logging.FileHandler(WEBHOOK_RECORD_PATH, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log_queue = queue.SimpleQueue()
+        _record_listener = QueueListener(log_queue, handler)
+        _record_listener.start()
+        atexit.register(stop_recording)
+        _record_logger = logging.getLogger("webhook.record")
+        _record_logger.addHandler(LoopQueueHandler(log_queue))
+        _record_logger.setLevel(logging.INFO)
+        _record_logger.propagate = False
+    return _record_logger
+
+
+def stop_recording():
+    """Дописать очередь записи обновлений и закрыть файл"""
+    global _record_logger, _record_listener
+    if _record_listener is not None:
+        _record_listener.stop()
+        for handler in _record_listener.handlers:
+            handler.close()
+        _record_listener = None
+        for handler in list(_record_logger.handlers):
+            _record_logger.removeHandler(handler)
+        _record_logger = None
+
+
+@web.middleware
+async def record_updates(request: web.Request, handler):
+    """Запись входящих обновлений в файл (по строке JSON) для последующего воспроизведения"""
+    response = await handler(request)
+    # Пишутся только принятые обновления (запросы с неверным секретом отклоняются с 401)
+    if request.method == "POST" and request.path == WEBHOOK_PATH and response.status == 200:
+        body = await request.text()
+        _get_record_logger().info(body.replace("\n", ""))
+    return response
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """aiohttp-приложение, принимающее обновления от Telegram
+
+    Ответ 200 отдаётся сразу, а обработка обновления идёт в фоновой задаче,
+    поэтому Telegram не ждёт медленные обработчики. Запросы без правильного
+    заголовка X-Telegram-Bot-Api-Secret-Token отклоняются с 401.
+    """
+    middlewares = [record_updates] if WEBHOOK_RECORD_PATH else []
+    app = web.Application(middlewares=middlewares)
+
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET,
+        handle_in_background=True,
+    ).register(app, path=WEBHOOK_PATH)
+    app.router.add_get("/health", lambda request: web.Response(text="ok"))
+
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def set_webhook(bot: Bot, dp: Dispatcher):
+    """Регистрация адреса вебхука в Telegram"""
+    if not WEBHOOK_URL:
+        # Локальный запуск: обновления присылаются вручную (replay_updates.py)
+        logger.warning("WEBHOOK_URL не задан - вебхук в Telegram не регистрируется")
+        return
+
+    try:
+        await bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    except Exception as e:
+        raise WebhookSetupError(str(e)) from e
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """Запуск HTTP-сервера вебхука до остановки процесса"""
+    if not WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET не задан - запросы к вебхуку не проверяются")
+
+    await set_webhook(bot, dp)
+
+    runner = web.AppRunner(build_webhook_app(dp, bot))
+    await runner.setup()
+    site = web.TCPSite(runner, host=WEBAPP_HOST, port=WEBAPP_PORT)
+    await site.start()
+    logger.info(f"🌐 Вебхук слушает {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,246 @@
+import asyncio
+import bisect
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from config import BOT_MODE, BOT_TOKEN, METRICS_PORT, SHUTDOWN_TIMEOUT, WEBAPP_HOST, WEBAPP_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+from logging_setup import setup_logging
+from webhook import WebhookSetupError, set_webhook
+
+logger = logging.getLogger(__name__)
+
+# Сколько точек на кольце приходится на один воркер
+HASH_RING_REPLICAS = 100
+# Сколько ждать завершения воркеров при остановке, сек
+WORKER_STOP_TIMEOUT = 30
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Консистентное хэширование chat_id -> номер воркера
+
+    Все обновления одного чата всегда попадают в один воркер, поэтому их порядок
+    сохраняется. При изменении числа воркеров переезжает только часть чатов.
+    """
+
+    def __init__(self, nodes: int, replicas: int = HASH_RING_REPLICAS):
+        points = sorted(
+            (_hash(f"worker-{node}-{replica}"), node)
+            for node in range(nodes) for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key) -> int:
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._nodes[index]
+
+
+def update_chat_id(update: dict) -> int:
+    """chat_id из «сырого» обновления Telegram (для обновлений без чата - id пользователя)"""
+    for field in ("message", "edited_message", "channel_post", "edited_channel_post",
+                  "my_chat_member", "chat_member", "chat_join_request"):
+        if field in update:
+            return update[field]["chat"]["id"]
+
+    callback = update.get("callback_query")
+    if callback:
+        message = callback.get("message")
+        return message["chat"]["id"] if message else callback["from"]["id"]
+
+    for field in ("inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query", "poll_answer"):
+        if field in update:
+            payload = update[field]
+            user = payload.get("from") or payload.get("user") or {}
+            return user.get("id", 0)
+    return 0
+
+
+# ВОРКЕР (отдельный процесс)
+
+async def _process_update(dp: Dispatcher, bot: Bot, update: dict):
+    # Порядок обновлений одного чата соблюдает ChatConcurrencyMiddleware диспетчера
+    try:
+        await dp.feed_raw_update(bot, update)
+    except Exception:
+        logger.exception(f"Ошибка обработки обновления {update.get('update_id')}")
+
+
+async def _worker_loop(index: int, size: int, queue):
+    # Импорт здесь: main импортирует этот модуль
+    from audit import audit
+    from background import background
+    from database import db
+    from handlers import set_notification_service
+    from main import build_dispatcher
+    from metrics import start_server as start_metrics_server, telegram_metrics
+    from notifications import NotificationService
+    from sqlite_storage import SQLiteStorage
+
+    ring = HashRing(size)
+    bot = Bot(token=BOT_TOKEN)
+    bot.session.middleware(telegram_metrics)
+    storage = SQLiteStorage(
+        key_filter=lambda key: ring.node_for(SQLiteStorage.chat_id_of(key)) == index
+    )
+    dp = build_dispatcher(storage)
+    await db.init_db()
+    await storage.start()
+    set_notification_service(NotificationService(bot))
+    await dp.emit_startup(bot=bot)
+    metrics_runner = await start_metrics_server(METRICS_PORT + 1 + index) if METRICS_PORT else None
+    logger.info(f"👷 Воркер {index} запущен")
+
+    tasks = set()
+    try:
+        while True:
+            update = await asyncio.to_thread(queue.get)
+            if update is None:
+                break
+            task = asyncio.create_task(_process_update(dp, bot, update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await background.drain(SHUTDOWN_TIMEOUT)
+    finally:
+        await dp.emit_shutdown()
+        await audit.close()
+        await bot.session.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        logger.info(f"👷 Воркер {index} остановлен")
+
+
+def worker_main(index: int, size: int, queue):
+    """Точка входа процесса-воркера"""
+    # Сигналы остановки получает фронт и присылает воркеру None после всех обновлений;
+    # иначе Ctrl+C или SIGTERM группе процессов оборвали бы воркер посреди очереди
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    setup_logging(
+        static_fields={"worker": index},
+        text_format=f'%(asctime)s - worker{index} - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(_worker_loop(index, size, queue))
+    except KeyboardInterrupt:
+        pass
+
+
+# ФРОНТ (основной процесс)
+
+class WorkerPool:
+    """Процессы-воркеры, каждому своя очередь обновлений"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ring = HashRing(size)
+        # spawn: форк процесса с работающим event loop небезопасен
+        self._context = multiprocessing.get_context("spawn")
+        self.queues = [self._context.Queue() for _ in range(size)]
+        self.processes = [None] * size
+
+    def _start_worker(self, index: int):
+        process = self._context.Process(
+            target=worker_main, args=(index, self.size, self.queues[index]),
+            name=f"worker-{index}", daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(self.size):
+            self._start_worker(index)
+        logger.info(f"Запущено воркеров: {self.size}")
+
+    def dispatch(self, update: dict):
+        index = self.ring.node_for(update_chat_id(update))
+        if not self.processes[index].is_alive():
+            # Очередь сохраняется, поэтому накопившиеся обновления не теряются
+            logger.error(f"Воркер {index} упал (код {self.processes[index].exitcode}), перезапуск")
+            self._start_worker(index)
+        self.queues[index].put(update)
+
+    def stop(self, timeout: float = WORKER_STOP_TIMEOUT):
+        """Воркеры дорабатывают очередь и завершаются"""
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} не завершился за {timeout} с, принудительная остановка")
+                process.terminate()
+
+
+async def _front_polling(bot: Bot, pool: WorkerPool, allowed_updates):
+    await bot.delete_webhook()
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+        except Exception:
+            logger.exception("Ошибка получения обновлений")
+            await asyncio.sleep(5)
+            continue
+
+        for update in updates:
+            pool.dispatch(update.model_dump(mode="json", exclude_none=True))
+            offset = update.update_id + 1
+
+
+async def _front_webhook(bot: Bot, dp: Dispatcher, pool: WorkerPool):
+    async def handle(request: web.Request):
+        if WEBHOOK_SECRET and not hmac.compare_digest(
+                request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), WEBHOOK_SECRET):
+            return web.Response(status=401)
+        # Фронт не разбирает обновление - только определяет воркер и сразу отвечает 200
+        pool.dispatch(await request.json())
+        return web.Response()
+
+    await set_webhook(bot, dp)
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle)
+    app.router.add_get("/health", lambda request: web.Response(text="ok"))
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=WEBAPP_HOST, port=WEBAPP_PORT).start()
+    logger.info(f"🌐 Фронт слушает {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_workers(bot: Bot, dp: Dispatcher, size: int):
+    """Приём обновлений во фронте и обработка в size процессах-воркерах
+
+    dp во фронте нужен только для списка используемых типов обновлений:
+    роутеры выполняются в воркерах без изменений.
+    """
+    pool = WorkerPool(size)
+    pool.start()
+    try:
+        if BOT_MODE == "webhook":
+            try:
+                await _front_webhook(bot, dp, pool)
+                return
+            except WebhookSetupError as e:
+                logger.error(f"❌ Не удалось установить вебхук: {e}. Переходим на polling")
+        await _front_polling(bot, pool, dp.resolve_used_update_types())
+    finally:
+        await asyncio.to_thread(pool.stop)